@@ -14,6 +14,10 @@ def create_app():
     with app.app_context():
         from app import models
         db.create_all()
+
+        # Particiones mensuales de attendance para el mes actual y los siguientes
+        from app.services.attendance_partition_service import attendance_partitions
+        attendance_partitions.ensure_upcoming()
         
         # register blueprints
         from app.routes.user_routes import user_bp
@@ -26,6 +30,17 @@ def create_app():
         app.register_blueprint(assessment_bp, url_prefix='/api')
         from app.routes.evaluation_routes import evaluation_bp
         app.register_blueprint(evaluation_bp, url_prefix='/api')
+
+    from app.cli import register_commands
+    register_commands(app)
+
+    # Descarta las cachés en memoria de catálogos modificados por otros workers
+    from app.services.cache_version_service import cache_versions
+
+    @app.before_request
+    def sync_cache_versions():
+        cache_versions.sync()
+
     @app.teardown_appcontext
     def shutdown_session(exception=None):
         db.session.remove()
@@ -0,0 +1,189 @@
+"""
+Comandos de mantenimiento (flask --app index <grupo> <comando>).
+"""
+from datetime import date
+import click
+from flask.cli import AppGroup
+
+schema_cli = AppGroup("schema", help="Mantenimiento del esquema de base de datos.")
+
+attendance_stats_cli = AppGroup(
+    "attendance-stats", help="Contadores de asistencia por participante."
+)
+
+attendance_rollups_cli = AppGroup(
+    "attendance-rollups", help="Totales de asistencia por semana y mes."
+)
+
+attendance_streaks_cli = AppGroup(
+    "attendance-streaks", help="Rachas de presencia y ausencia por participante."
+)
+
+participants_cli = AppGroup("participants", help="Gestión masiva de participantes.")
+
+attendance_partitions_cli = AppGroup(
+    "attendance-partitions", help="Particiones mensuales de la tabla attendance."
+)
+
+
+@schema_cli.command("upgrade")
+def upgrade_schema():
+    """Aplica los parches de esquema pendientes y recalcula los datos derivados."""
+    from app.services.attendance_rollup_service import attendance_rollups
+    from app.services.attendance_stats_service import attendance_stats
+    from app.services.attendance_streak_service import attendance_streaks
+    from app.utils.schema_patches import apply_schema_patches
+
+    for name in apply_schema_patches():
+        click.echo(f"Parche aplicado: {name}")
+
+    total = attendance_stats.rebuild()
+    click.echo(f"Contadores reconstruidos: {total} participantes")
+
+    total = attendance_rollups.rebuild()
+    click.echo(f"Totales por periodo reconstruidos: {total} filas")
+
+    total = attendance_streaks.rebuild()
+    click.echo(f"Rachas reconstruidas: {total} participantes")
+
+
+@attendance_stats_cli.command("rebuild")
+def rebuild_attendance_stats():
+    """Recalcula desde cero la tabla participant_attendance_stats."""
+    from app.services.attendance_stats_service import attendance_stats
+
+    total = attendance_stats.rebuild()
+    click.echo(f"Contadores reconstruidos: {total} participantes")
+
+
+@attendance_stats_cli.command("check")
+@click.option("--fix", is_flag=True, help="Reconstruye los contadores si hay diferencias.")
+def check_attendance_stats(fix):
+    """Detecta diferencias entre los contadores y la tabla attendance."""
+    from app.services.attendance_stats_service import attendance_stats
+
+    drift = attendance_stats.check_consistency()
+    if not drift:
+        click.echo("Contadores consistentes")
+        return
+
+    for row in drift:
+        click.echo(
+            f"participant_id={row['participant_id']}: "
+            f"guardado {row['stored_present']}/{row['stored_total']}, "
+            f"real {row['actual_present']}/{row['actual_total']}"
+        )
+    click.echo(f"{len(drift)} participantes con diferencias")
+
+    if fix:
+        total = attendance_stats.rebuild()
+        click.echo(f"Contadores reconstruidos: {total} participantes")
+    else:
+        raise SystemExit(1)
+
+
+@attendance_rollups_cli.command("rebuild")
+def rebuild_attendance_rollups():
+    """Recalcula desde cero la tabla attendance_rollup."""
+    from app.services.attendance_rollup_service import attendance_rollups
+
+    total = attendance_rollups.rebuild()
+    click.echo(f"Totales por periodo reconstruidos: {total} filas")
+
+
+@attendance_streaks_cli.command("rebuild")
+def rebuild_attendance_streaks():
+    """Recalcula desde cero la tabla participant_attendance_streak."""
+    from app.services.attendance_streak_service import attendance_streaks
+
+    total = attendance_streaks.rebuild()
+    click.echo(f"Rachas reconstruidas: {total} participantes")
+
+
+@attendance_partitions_cli.command("list")
+def list_attendance_partitions():
+    """Lista las particiones vigentes con su número estimado de filas."""
+    from app.services.attendance_partition_service import attendance_partitions
+
+    for partition in attendance_partitions.partitions():
+        click.echo(f"{partition['name']}: ~{partition['rows']} filas")
+
+
+@attendance_partitions_cli.command("ensure")
+@click.option("--from", "date_from", help="Primer mes (YYYY-MM-DD); por defecto el actual.")
+@click.option("--months", default=2, show_default=True, help="Meses siguientes a crear.")
+def ensure_attendance_partitions(date_from, months):
+    """Crea las particiones que falten desde un mes dado."""
+    from app.services.attendance_partition_service import attendance_partitions
+    from app.utils.validations.attendance_validation import parse_attendance_date
+
+    desde, error = parse_attendance_date(date_from)
+    if error:
+        raise click.BadParameter(error, param_hint="--from")
+    desde = attendance_partitions.month_start(desde or date.today())
+    hasta = desde
+    for _ in range(months):
+        hasta = attendance_partitions.next_month(hasta)
+    try:
+        attendance_partitions.ensure_range(desde, hasta)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Particiones garantizadas de {desde} a {hasta}")
+
+
+@attendance_partitions_cli.command("archive")
+@click.option("--before", required=True, help="Archiva los meses anteriores a esta fecha (YYYY-MM-DD).")
+def archive_attendance_partitions(before):
+    """Mueve los meses cerrados al esquema attendance_archive y recalcula los contadores."""
+    from app.services.attendance_partition_service import attendance_partitions
+    from app.services.attendance_stats_service import attendance_stats
+    from app.services.attendance_streak_service import attendance_streaks
+    from app.utils.validations.attendance_validation import parse_attendance_date
+
+    fecha, error = parse_attendance_date(before)
+    if error or not fecha:
+        raise click.BadParameter(error or "Fecha requerida", param_hint="--before")
+
+    archived = attendance_partitions.archive(fecha)
+    for name in archived:
+        click.echo(f"Archivada: {name}")
+    if archived:
+        # Los porcentajes por participante pasan a cubrir solo los meses vigentes;
+        # attendance_rollup conserva los totales de los meses archivados
+        total = attendance_stats.rebuild()
+        click.echo(f"Contadores reconstruidos: {total} participantes")
+        total = attendance_streaks.rebuild()
+        click.echo(f"Rachas reconstruidas: {total} participantes")
+    else:
+        click.echo("No hay particiones para archivar")
+
+
+@participants_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Solo valida el archivo, sin guardar.")
+def import_participants(path, dry_run):
+    """Importa participantes desde un archivo CSV o XLSX."""
+    from app.controllers.usercontroller import UserController
+
+    with open(path, "rb") as stream:
+        result = UserController().import_participants(stream, path, dry_run=dry_run)
+    if result.get("code", 200) >= 400:
+        raise click.ClickException(f"{result['msg']}: {result.get('data')}")
+
+    report = result["data"]
+    for error in report["errors"]:
+        detail = "; ".join(f"{field}: {msg}" for field, msg in error["errors"].items())
+        click.echo(f"Fila {error['row']}: {detail}")
+    click.echo(
+        f"{report['total']} filas, {report['valid']} válidas, {report['created']} creadas, "
+        f"{len(report['errors'])} con errores"
+    )
+
+
+def register_commands(app):
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(attendance_stats_cli)
+    app.cli.add_command(attendance_rollups_cli)
+    app.cli.add_command(attendance_streaks_cli)
+    app.cli.add_command(attendance_partitions_cli)
+    app.cli.add_command(participants_cli)
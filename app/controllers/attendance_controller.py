@@ -1,23 +1,115 @@
-from datetime import date, datetime
+import base64
+import csv
+import io
+import json
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.attendance import Attendance
+from app.models.deletedAttendance import DeletedAttendance
 from app.models.participant import Participant
 from app.models.schedule import Schedule
+from app.models.scheduleOccurrence import ScheduleOccurrence
+from app.models.syncBatch import SyncBatch
+from app.services.attendance_partition_service import (
+    ARCHIVED_MONTH_ERROR,
+    attendance_partitions,
+)
+from app.services.attendance_rollup_service import GROUP_BY, PERIODS, attendance_rollups
+from app.services.attendance_stats_service import AttendanceChange, attendance_stats
+from app.services.attendance_streak_service import AT_RISK_MIN_ABSENCES, attendance_streaks
+from app.services.cache_version_service import PARTICIPANTS, SCHEDULES, cache_versions
+from app.services.expected_roster_service import expected_rosters
+from app.services.participant_search_service import participant_search
+from app.services.schedule_conflict_service import schedule_conflicts
+from app.services.session_capacity_service import session_capacity
+from app.services.schedule_occurrence_service import (
+    MAX_RANGE_DAYS,
+    schedule_occurrences,
+)
+from app.utils.cache import TTLCache
 from app.utils.responses import error_response, success_response
+from app.utils.validations.attendance_validation import (
+    client_write_time,
+    parse_attendance_date,
+    parse_client_timestamp,
+    parse_date_filters,
+    parse_month,
+)
 from app import db
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+HISTORY_STREAM_BATCH = 500
+HISTORY_EXPORT_CHUNK = 64 * 1024
+HISTORY_EXPORT_FORMATS = ("csv", "xlsx")
+HISTORY_EXPORT_COLUMNS = [
+    "Fecha",
+    "Sesión",
+    "Día",
+    "Hora inicio",
+    "Hora fin",
+    "Programa",
+    "DNI",
+    "Nombres",
+    "Apellidos",
+    "Estado",
+]
+TODAY_SESSIONS_TTL = 30
+SESSION_DETAIL_TTL = 300
+SYNC_MAX_BATCHES = 100
+# Modos de eliminación de una sesión; el primero es el predeterminado
+DELETE_MODES = ("hard", "soft")
+# Columnas que se mueven entre attendance y deleted_attendance
+ATTENDANCE_ROW_COLUMNS = (
+    "id",
+    "external_id",
+    "date",
+    "status",
+    "participant_id",
+    "schedule_id",
+    "client_updated_at",
+)
+# Código de cada celda de la matriz de asistencia (posición en la lista = código)
+MATRIX_STATUS_CODES = [None, Attendance.Status.PRESENT, Attendance.Status.ABSENT]
+# Estados que se pueden registrar (se aceptan sin distinguir mayúsculas)
+ATTENDANCE_STATUSES = (Attendance.Status.PRESENT, Attendance.Status.ABSENT)
+
+# Vista "sesiones de hoy" por fecha. Se invalida al registrar o eliminar asistencias de esa
+# fecha en este proceso; en otros procesos expira a los TODAY_SESSIONS_TTL segundos.
+today_sessions_cache = TTLCache(ttl=TODAY_SESSIONS_TTL, maxsize=4)
+
+# Detalle de sesión por (horario, fecha, versión): una nueva versión nunca reutiliza una
+# entrada anterior; los cambios de datos del participante (nombre, email) la descartan
+# mediante la versión de participantes, con el TTL como respaldo.
+session_detail_cache = TTLCache(ttl=SESSION_DETAIL_TTL, maxsize=256)
+
+# Catálogo de horarios activos por versión de horarios (cache_version): cualquier worker que
+# modifique horarios incrementa la versión y los demás descartan su copia al detectarla.
+schedule_catalog = TTLCache(ttl=None, maxsize=2)
+
+cache_versions.subscribe(SCHEDULES, today_sessions_cache.clear)
+cache_versions.subscribe(SCHEDULES, schedule_catalog.clear)
+cache_versions.subscribe(PARTICIPANTS, session_detail_cache.clear)
+
 
 class AttendanceController:
 
-    def get_participants(self, program=None):
-        # Lista participantes activos con porcentaje de asistencia calculado
+    def get_participants(self, program=None, date_from=None, date_to=None):
+        # Lista participantes con porcentaje de asistencia calculado en una sola consulta agrupada
         try:
-            query = Participant.query
-            if program:
-                query = query.filter_by(program=program)
+            dates, errors = parse_date_filters(date_from=date_from, date_to=date_to)
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
 
-            participants = query.all()
+            rows = attendance_stats.participants_with_stats(
+                program, dates["date_from"], dates["date_to"]
+            )
             result = []
-            for p in participants:
+            for p, stats in rows:
                 result.append(
                     {
                         "external_id": p.external_id,
@@ -28,9 +120,7 @@ class AttendanceController:
                         "phone": getattr(p, "phone", None),
                         "status": getattr(p, "status", "active"),
                         "program": getattr(p, "program", None),
-                        "attendance_percentage": self._calculate_attendance_percentage(
-                            p.id
-                        ),
+                        "attendance_percentage": stats["percentage"],
                     }
                 )
             return success_response(
@@ -39,180 +129,92 @@ class AttendanceController:
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
-    def get_schedules(self):
-        # Retorna horarios/sesiones activas del sistema
+    def get_schedules(self, if_none_match=None, if_modified_since=None):
+        """
+        Retorna horarios/sesiones activas del sistema desde el catálogo en memoria.
+        Retorna (resultado, etag, last_modified) según la versión de horarios; si el cliente
+        ya tiene esa versión (If-None-Match o If-Modified-Since) el resultado es None (304).
+        """
         try:
-            schedules = Schedule.query.filter_by(status="active").all()
-            result = []
-            for s in schedules:
-                result.append(
-                    {
-                        "external_id": s.external_id,
-                        "name": s.name,
-                        "day_of_week": s.dayOfWeek,
-                        "start_time": s.startTime,
-                        "end_time": s.endTime,
-                        "max_slots": s.maxSlots,
-                        "program": s.program,
-                        "specific_date": s.specificDate,
-                        "start_date": s.startDate,
-                        "end_date": s.endDate,
-                        "is_recurring": s.isRecurring,
-                        "location": s.location,
-                        "description": s.description,
-                    }
-                )
-            return success_response(msg="Horarios obtenidos correctamente", data=result)
+            cache_versions.sync()
+            version, modified_at = cache_versions.current(SCHEDULES)
+            etag = f"schedules-{version}"
+            last_modified = modified_at.replace(microsecond=0) if modified_at else None
+
+            if if_none_match:
+                if if_none_match.contains(etag):
+                    return None, etag, last_modified
+            elif (
+                if_modified_since is not None
+                and last_modified is not None
+                and last_modified <= if_modified_since.replace(tzinfo=None)
+            ):
+                return None, etag, last_modified
+
+            result = schedule_catalog.get_or_set(version, self._load_schedule_catalog)
+            return (
+                success_response(msg="Horarios obtenidos correctamente", data=result),
+                etag,
+                last_modified,
+            )
         except Exception as e:
-            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+            return error_response(msg="Error interno", code=500, data={"error": str(e)}), None, None
+
+    def _load_schedule_catalog(self):
+        schedules = Schedule.query.filter_by(status="active").all()
+        result = []
+        for s in schedules:
+            result.append(
+                {
+                    "external_id": s.external_id,
+                    "name": s.name,
+                    "day_of_week": s.dayOfWeek,
+                    "start_time": s.startTime,
+                    "end_time": s.endTime,
+                    "max_slots": s.maxSlots,
+                    "program": s.program,
+                    "specific_date": s.specificDate,
+                    "start_date": s.startDate,
+                    "end_date": s.endDate,
+                    "is_recurring": s.isRecurring,
+                    "location": s.location,
+                    "description": s.description,
+                }
+            )
+        return result
 
     def create_schedule(self, data):
         # Crea nueva sesión con validaciones de horario, capacidad y solapamiento
         try:
-            errors = {}
-
-            # Mapeo de campos del frontend (camelCase -> snake_case)
-            name = data.get("name")
-            day_of_week = data.get("day_of_week") or data.get("dayOfWeek")
-            start_time = data.get("start_time") or data.get("startTime")
-            end_time = data.get("end_time") or data.get("endTime")
-            max_slots = data.get("max_slots") or data.get("maxSlots")
-            program = data.get("program")
-
-            # Campos para sesiones específicas o recurrentes
-            specific_date = data.get("specific_date") or data.get("specificDate")
-            start_date = data.get("start_date") or data.get("startDate")
-            end_date = data.get("end_date") or data.get("endDate")
-            is_recurring = (
-                data.get("is_recurring")
-                if data.get("is_recurring") is not None
-                else data.get("isRecurring")
-            )
-            location = data.get("location")
-            description = data.get("description")
-
-            # Validación de campos obligatorios
-            if not name:
-                errors["name"] = "Nombre requerido"
-            if not start_time:
-                errors["start_time"] = "Hora de inicio es requerida"
-            if not end_time:
-                errors["end_time"] = "Hora de fin es requerida"
-            if not max_slots:
-                errors["max_slots"] = "Número de cupos es requerido"
-            if not program:
-                errors["program"] = "Programa requerido"
-
-            # Validar que tenga dayOfWeek O specificDate (al menos uno)
-            if not day_of_week and not specific_date:
-                errors["day_of_week"] = (
-                    "Debe seleccionar un día de la semana o una fecha específica"
-                )
-
-            # Validar programa
-            valid_programs = ["INICIACION", "FUNCIONAL"]
-            if program and program not in valid_programs:
-                errors["program"] = (
-                    f"Programa inválido. Use: {', '.join(valid_programs)}"
-                )
-
-            # Validar día de la semana
-            valid_days = [
-                "MONDAY",
-                "TUESDAY",
-                "WEDNESDAY",
-                "THURSDAY",
-                "FRIDAY",
-                "SATURDAY",
-                "SUNDAY",
-            ]
-            if day_of_week and day_of_week.upper() not in valid_days:
-                errors["day_of_week"] = f"Día inválido. Use: {', '.join(valid_days)}"
-
-            # Validar formato de horas
-            import re
-
-            time_pattern = r"^([01]\d|2[0-3]):([0-5]\d)$"
-            if start_time and not re.match(time_pattern, start_time):
-                errors["start_time"] = "Formato de hora inválido. Use HH:MM (24h)"
-            if end_time and not re.match(time_pattern, end_time):
-                errors["end_time"] = "Formato de hora inválido. Use HH:MM (24h)"
-
-            # Validar que hora de inicio sea menor a hora de fin
-            if start_time and end_time:
-                if start_time == end_time:
-                    errors["start_time"] = "La hora de inicio y fin no pueden ser iguales"
-                    errors["end_time"] = "La hora de inicio y fin no pueden ser iguales"
-                elif start_time > end_time:
-                    errors["start_time"] = "La hora de inicio debe ser menor a la hora de fin"
-                    errors["end_time"] = "La hora de fin debe ser mayor a la hora de inicio"
-
-            # Validar cupos
-            if max_slots:
-                try:
-                    if int(max_slots) <= 0:
-                        errors["max_slots"] = "El número de cupos debe ser mayor a 0"
-                except (ValueError, TypeError):
-                    errors["max_slots"] = "El número de cupos debe ser numérico"
-
-            # Validar fechas
-            from datetime import date as date_class
-
-            hoy = date_class.today().isoformat()
-
-            if specific_date and specific_date < hoy:
-                errors["specific_date"] = "No se puede crear sesión con fecha pasada"
-
-            if start_date and start_date < hoy:
-                errors["start_date"] = "La fecha de inicio no puede ser anterior a hoy"
-
-            if end_date and start_date and end_date < start_date:
-                errors["end_date"] = (
-                    "La fecha de fin debe ser posterior a la fecha de inicio"
-                )
+            fields, errors = self._validate_schedule_data(data)
 
             # Retornar si hay errores de validación
             if errors:
                 return error_response(msg="Error de validación", data=errors, code=400)
 
-            # Validación de solapamiento de horarios para sesiones recurrentes
-            if day_of_week:
-                overlaps = Schedule.query.filter(
-                    Schedule.dayOfWeek == day_of_week.upper(),
-                    Schedule.program == program,
-                    Schedule.startTime < end_time,
-                    Schedule.endTime > start_time,
-                ).first()
-
-                if overlaps:
-                    return error_response(
-                        msg="Error de validación",
-                        data={
-                            "schedule": f"El horario se solapa con otro existente: {overlaps.name}"
-                        },
-                        code=400,
-                    )
+            # Validación de solapamiento contra el índice de intervalos de horarios activos
+            overlap = self._schedule_overlap_error(fields)
+            if overlap:
+                return overlap
 
             nuevo_schedule = Schedule(
-                name=name,
-                dayOfWeek=day_of_week.upper() if day_of_week else None,
-                startTime=start_time,
-                endTime=end_time,
-                maxSlots=max_slots,
-                program=program,
-                specificDate=specific_date,
-                startDate=start_date,
-                endDate=end_date,
-                isRecurring=(
-                    is_recurring
-                    if is_recurring is not None
-                    else (specific_date is None)
-                ),
-                location=location,
-                description=description,
+                name=fields["name"],
+                dayOfWeek=fields["day_of_week"],
+                startTime=fields["start_time"],
+                endTime=fields["end_time"],
+                maxSlots=fields["max_slots"],
+                program=fields["program"],
+                specificDate=fields["specific_date"],
+                startDate=fields["start_date"],
+                endDate=fields["end_date"],
+                isRecurring=fields["is_recurring"],
+                location=fields["location"],
+                description=fields["description"],
             )
             db.session.add(nuevo_schedule)
+            cache_versions.bump(SCHEDULES)
             db.session.commit()
+            self._invalidate_schedule_caches()
 
             return success_response(
                 msg="Horario creado exitosamente",
@@ -227,6 +229,254 @@ class AttendanceController:
                 msg="Error creando horario", code=500, data={"error": str(e)}
             )
 
+    def _validate_schedule_data(self, data):
+        # Valida los datos de un horario; retorna (campos normalizados, errores)
+        errors = {}
+
+        # Mapeo de campos del frontend (camelCase -> snake_case)
+        name = data.get("name")
+        day_of_week = data.get("day_of_week") or data.get("dayOfWeek")
+        start_time = data.get("start_time") or data.get("startTime")
+        end_time = data.get("end_time") or data.get("endTime")
+        max_slots = data.get("max_slots") or data.get("maxSlots")
+        program = data.get("program")
+
+        # Campos para sesiones específicas o recurrentes
+        specific_date = data.get("specific_date") or data.get("specificDate")
+        start_date = data.get("start_date") or data.get("startDate")
+        end_date = data.get("end_date") or data.get("endDate")
+        is_recurring = (
+            data.get("is_recurring")
+            if data.get("is_recurring") is not None
+            else data.get("isRecurring")
+        )
+        location = data.get("location")
+        description = data.get("description")
+
+        # Validación de campos obligatorios
+        if not name:
+            errors["name"] = "Nombre requerido"
+        if not start_time:
+            errors["start_time"] = "Hora de inicio es requerida"
+        if not end_time:
+            errors["end_time"] = "Hora de fin es requerida"
+        if not max_slots:
+            errors["max_slots"] = "Número de cupos es requerido"
+        if not program:
+            errors["program"] = "Programa requerido"
+
+        # Validar que tenga dayOfWeek O specificDate (al menos uno)
+        if not day_of_week and not specific_date:
+            errors["day_of_week"] = (
+                "Debe seleccionar un día de la semana o una fecha específica"
+            )
+
+        # Validar programa
+        valid_programs = ["INICIACION", "FUNCIONAL"]
+        if program and program not in valid_programs:
+            errors["program"] = (
+                f"Programa inválido. Use: {', '.join(valid_programs)}"
+            )
+
+        # Validar día de la semana
+        valid_days = [
+            "MONDAY",
+            "TUESDAY",
+            "WEDNESDAY",
+            "THURSDAY",
+            "FRIDAY",
+            "SATURDAY",
+            "SUNDAY",
+        ]
+        if day_of_week and day_of_week.upper() not in valid_days:
+            errors["day_of_week"] = f"Día inválido. Use: {', '.join(valid_days)}"
+
+        # Validar formato de horas
+        import re
+
+        time_pattern = r"^([01]\d|2[0-3]):([0-5]\d)$"
+        if start_time and not re.match(time_pattern, start_time):
+            errors["start_time"] = "Formato de hora inválido. Use HH:MM (24h)"
+        if end_time and not re.match(time_pattern, end_time):
+            errors["end_time"] = "Formato de hora inválido. Use HH:MM (24h)"
+
+        # Validar que hora de inicio sea menor a hora de fin
+        if start_time and end_time:
+            if start_time == end_time:
+                errors["start_time"] = "La hora de inicio y fin no pueden ser iguales"
+                errors["end_time"] = "La hora de inicio y fin no pueden ser iguales"
+            elif start_time > end_time:
+                errors["start_time"] = "La hora de inicio debe ser menor a la hora de fin"
+                errors["end_time"] = "La hora de fin debe ser mayor a la hora de inicio"
+
+        # Validar cupos
+        if max_slots:
+            try:
+                if int(max_slots) <= 0:
+                    errors["max_slots"] = "El número de cupos debe ser mayor a 0"
+            except (ValueError, TypeError):
+                errors["max_slots"] = "El número de cupos debe ser numérico"
+
+        # Validar fechas
+        from datetime import date as date_class
+
+        hoy = date_class.today().isoformat()
+
+        if specific_date and specific_date < hoy:
+            errors["specific_date"] = "No se puede crear sesión con fecha pasada"
+
+        if start_date and start_date < hoy:
+            errors["start_date"] = "La fecha de inicio no puede ser anterior a hoy"
+
+        if end_date and start_date and end_date < start_date:
+            errors["end_date"] = (
+                "La fecha de fin debe ser posterior a la fecha de inicio"
+            )
+
+        fields = {
+            "name": name,
+            "day_of_week": day_of_week.upper() if day_of_week else None,
+            "start_time": start_time,
+            "end_time": end_time,
+            "max_slots": max_slots,
+            "program": program,
+            "specific_date": specific_date,
+            "start_date": start_date,
+            "end_date": end_date,
+            "is_recurring": (
+                is_recurring if is_recurring is not None else (specific_date is None)
+            ),
+            "location": location,
+            "description": description,
+        }
+        return fields, errors
+
+    def _schedule_slot(self, fields, key=None):
+        return schedule_conflicts.to_slot(
+            key,
+            fields.get("name"),
+            fields.get("program"),
+            fields.get("start_time"),
+            fields.get("end_time"),
+            fields.get("day_of_week"),
+            fields.get("specific_date"),
+            fields.get("start_date"),
+            fields.get("end_date"),
+            fields.get("is_recurring"),
+        )
+
+    def _schedule_overlap_error(self, fields, exclude_key=None):
+        # Retorna la respuesta 400 si el horario se solapa con otro activo, o None.
+        # Con campos ya validados, un horario que no se puede ubicar tiene fecha inválida
+        slot = self._schedule_slot(fields, exclude_key)
+        if not slot:
+            return error_response(
+                msg="Error de validación",
+                data={"specific_date": "Fecha inválida. Use YYYY-MM-DD"},
+                code=400,
+            )
+        conflicts = schedule_conflicts.find_conflicts(slot, exclude_key)
+        if not conflicts:
+            return None
+        return error_response(
+            msg="Error de validación",
+            data={
+                "schedule": f"El horario se solapa con otro existente: {conflicts[0].name}",
+                "conflicts": [self._serialize_slot(c) for c in conflicts],
+            },
+            code=400,
+        )
+
+    def _serialize_slot(self, slot):
+        # Los horarios nuevos de un lote usan la clave "#<posición>" y no tienen external_id
+        planned = isinstance(slot.key, str) and slot.key.startswith("#")
+        return {
+            "external_id": None if planned else slot.key,
+            "index": int(slot.key[1:]) if planned else None,
+            "name": slot.name,
+            "program": slot.program,
+            "start_time": "%02d:%02d" % divmod(slot.start, 60),
+            "end_time": "%02d:%02d" % divmod(slot.end, 60),
+            "specific_date": slot.specific_date.isoformat() if slot.specific_date else None,
+        }
+
+    def _invalidate_schedule_caches(self):
+        # Tras escribir horarios: ocurrencias, índice de solapamientos, sesiones de hoy y
+        # catálogo de este proceso; la lectura forzada registra la nueva versión de horarios
+        schedule_occurrences.invalidate()
+        schedule_conflicts.invalidate()
+        today_sessions_cache.clear()
+        schedule_catalog.clear()
+        cache_versions.sync(force=True)
+
+    def validate_schedules(self, data):
+        """
+        Valida un horario completo (planificación de periodo) sin guardarlo.
+        Cada elemento se valida con las reglas de create_schedule y se comprueba contra
+        los horarios activos y contra los demás elementos del lote. Un elemento con
+        external_id reemplaza a ese horario existente, que deja de contar como conflicto.
+        """
+        try:
+            items = (data or {}).get("schedules")
+            if not isinstance(items, list) or not items:
+                return error_response(
+                    msg="Error de validación",
+                    data={"schedules": "Debe enviar una lista de horarios"},
+                    code=400,
+                )
+
+            errors = []
+            slots = []
+            positions = []
+            replaced = set()
+            for position, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors.append({"index": position, "errors": {"schedule": "Formato inválido"}})
+                    continue
+                fields, item_errors = self._validate_schedule_data(item)
+                if item_errors:
+                    errors.append({"index": position, "errors": item_errors})
+                    continue
+                external_id = item.get("external_id")
+                slot = self._schedule_slot(fields, external_id or f"#{position}")
+                if not slot:
+                    errors.append(
+                        {
+                            "index": position,
+                            "errors": {"specific_date": "Fecha inválida. Use YYYY-MM-DD"},
+                        }
+                    )
+                    continue
+                if external_id:
+                    replaced.add(external_id)
+                slots.append(slot)
+                positions.append(position)
+
+            conflicts = [
+                {
+                    "index": positions[slot_position],
+                    "name": slots[slot_position].name,
+                    "conflicts": [self._serialize_slot(c) for c in found],
+                }
+                for slot_position, found in schedule_conflicts.validate_timetable(
+                    slots, replaced
+                )
+            ]
+
+            return success_response(
+                msg="Validación de horarios completada",
+                data={
+                    "valid": not errors and not conflicts,
+                    "total": len(items),
+                    "errors": errors,
+                    "conflicts": conflicts,
+                },
+            )
+        except Exception as e:
+            return error_response(
+                msg="Error validando horarios", code=500, data={"error": str(e)}
+            )
+
     def update_schedule(self, schedule_id, data):
         # Actualiza campos de sesión existente
         try:
@@ -235,6 +485,10 @@ class AttendanceController:
             schedule = Schedule.query.filter_by(external_id=schedule_id).first()
             if not schedule:
                 return error_response(msg="Horario no encontrado", data={}, code=404)
+            stored_dates = {
+                "specific_date": schedule.specificDate,
+                "start_date": schedule.startDate,
+            }
 
             # Actualizar nombre
             if "name" in data:
@@ -297,7 +551,39 @@ class AttendanceController:
             if description is not None:
                 schedule.description = description
 
+            # El horario resultante se valida completo, con las mismas reglas que al crearlo;
+            # las fechas ya guardadas que quedaron en el pasado no se vuelven a rechazar
+            fields, errors = self._validate_schedule_data(
+                {
+                    "name": schedule.name,
+                    "day_of_week": schedule.dayOfWeek,
+                    "start_time": schedule.startTime,
+                    "end_time": schedule.endTime,
+                    "max_slots": schedule.maxSlots,
+                    "program": schedule.program,
+                    "specific_date": schedule.specificDate,
+                    "start_date": schedule.startDate,
+                    "end_date": schedule.endDate,
+                    "is_recurring": schedule.isRecurring,
+                }
+            )
+            for field, stored in stored_dates.items():
+                if field in errors and fields[field] == stored:
+                    errors.pop(field)
+            if errors:
+                db.session.rollback()
+                return error_response(msg="Error de validación", data=errors, code=400)
+
+            # El horario resultante no debe solaparse con otro activo (excepto consigo mismo)
+            if schedule.status == "active":
+                overlap = self._schedule_overlap_error(fields, exclude_key=schedule.external_id)
+                if overlap:
+                    db.session.rollback()
+                    return overlap
+
+            cache_versions.bump(SCHEDULES)
             db.session.commit()
+            self._invalidate_schedule_caches()
             print(f"DEBUG - Schedule actualizado correctamente: specificDate={schedule.specificDate}, dayOfWeek={schedule.dayOfWeek}")
             
             return success_response(
@@ -321,7 +607,9 @@ class AttendanceController:
                     data={"schedule_external_id": schedule_id},
                 )
             schedule.status = "inactive"
+            cache_versions.bump(SCHEDULES)
             db.session.commit()
+            self._invalidate_schedule_caches()
             return success_response(msg="Horario eliminado correctamente (Soft Delete)")
         except Exception as e:
             db.session.rollback()
@@ -330,217 +618,731 @@ class AttendanceController:
             )
 
     def get_today_sessions(self):
-        # Obtiene sesiones programadas para hoy: recurrentes + fecha específica
+        # Obtiene sesiones programadas para hoy: recurrentes + fecha específica.
+        # Se cachea unos segundos porque todas las tabletas consultan esta vista al iniciar clase.
         try:
-            from datetime import date as date_class
-
-            # Mapeo de días: 0=Lunes, 1=Martes, ... 6=Domingo
-            dias_semana = [
-                "Lunes",
-                "Martes",
-                "Miércoles",
-                "Jueves",
-                "Viernes",
-                "Sábado",
-                "Domingo",
+            hoy = date.today()
+            result = today_sessions_cache.get(hoy)
+            if result is None:
+                result = self._build_today_sessions(hoy)
+                today_sessions_cache.set(hoy, result)
+
+            return success_response(
+                msg=f"Sesiones de hoy obtenidas correctamente", data=result
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def _build_today_sessions(self, hoy):
+        occurrences = schedule_occurrences.occurrences_on(hoy)
+        schedule_ids = [o["schedule_id"] for o in occurrences]
+
+        # Conteo de asistencias registradas hoy por sesión en una sola consulta agrupada
+        counts = {}
+        if schedule_ids:
+            counts = dict(
+                db.session.query(Schedule.id, func.count(Attendance.id))
+                .outerjoin(
+                    Attendance,
+                    db.and_(Attendance.schedule_id == Schedule.id, Attendance.date == hoy),
+                )
+                .filter(Schedule.id.in_(schedule_ids))
+                .group_by(Schedule.id)
+                .all()
+            )
+
+        result = []
+        for occurrence in occurrences:
+            # Determinar estado: completada si ya tiene asistencias registradas
+            attendances_count = counts.get(occurrence["schedule_id"], 0)
+            status = "completada" if attendances_count > 0 else "pendiente"
+
+            result.append(
+                {
+                    "external_id": occurrence["schedule_external_id"],
+                    "name": occurrence["name"],
+                    "day_of_week": occurrence["day_of_week"],
+                    "start_time": occurrence["start_time"],
+                    "end_time": occurrence["end_time"],
+                    "program": occurrence["program"],
+                    "specific_date": occurrence["specific_date"],
+                    "is_recurring": occurrence["is_recurring"],
+                    "location": occurrence["location"],
+                    "status": status,
+                    "attendances_registered": attendances_count,
+                    "has_attendances": attendances_count > 0,
+                }
+            )
+        return result
+
+    def get_schedule_occurrences(self, date_from=None, date_to=None, program=None):
+        # Calendario de sesiones concretas (fecha + horario) para un rango, por defecto la semana actual
+        try:
+            dates, errors = parse_date_filters(date_from=date_from, date_to=date_to)
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
+
+            desde = dates["date_from"] or date.today()
+            hasta = dates["date_to"] or desde + timedelta(days=6)
+            if hasta < desde:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"to": "La fecha final debe ser posterior a la inicial"},
+                )
+            if (hasta - desde).days >= MAX_RANGE_DAYS:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"to": f"El rango no puede superar {MAX_RANGE_DAYS} días"},
+                )
+
+            result = [
+                {
+                    "schedule_external_id": o["schedule_external_id"],
+                    "date": o["date"].isoformat(),
+                    "name": o["name"],
+                    "start_time": o["start_time"],
+                    "end_time": o["end_time"],
+                    "program": o["program"],
+                    "max_slots": o["max_slots"],
+                    "location": o["location"],
+                    "is_recurring": o["is_recurring"],
+                }
+                for o in schedule_occurrences.occurrences(desde, hasta, program)
             ]
-            hoy_date = date_class.today().isoformat()
-            hoy_dia = dias_semana[datetime.now().weekday()]
+            return success_response(msg="Ocurrencias obtenidas correctamente", data=result)
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def get_attendance_report(
+        self,
+        period=None,
+        date_from=None,
+        date_to=None,
+        group_by=None,
+        program=None,
+        schedule_id=None,
+    ):
+        # Reporte de asistencia semanal o mensual por horario o programa (tabla attendance_rollup)
+        try:
+            period = period or PERIODS[0]
+            group_by = group_by or GROUP_BY[0]
+            dates, errors = parse_date_filters(date_from=date_from, date_to=date_to)
+            if period not in PERIODS:
+                errors["period"] = f"Periodo inválido. Use: {', '.join(PERIODS)}"
+            if group_by not in GROUP_BY:
+                errors["group_by"] = f"Agrupación inválida. Use: {', '.join(GROUP_BY)}"
+            if (
+                dates.get("date_from")
+                and dates.get("date_to")
+                and dates["date_to"] < dates["date_from"]
+            ):
+                errors["to"] = "La fecha final debe ser posterior a la inicial"
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
+
+            result = attendance_rollups.report(
+                period,
+                dates["date_from"],
+                dates["date_to"],
+                group_by,
+                program,
+                schedule_id,
+            )
+            return success_response(msg="Reporte de asistencia obtenido", data=result)
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def get_at_risk_participants(self, min_absences=None, program=None):
+        """
+        Participantes activos con min_absences o más ausencias consecutivas (racha actual),
+        leídos de participant_attendance_streak.
+        """
+        try:
+            if min_absences in (None, ""):
+                minimo = AT_RISK_MIN_ABSENCES
+            else:
+                try:
+                    minimo = int(min_absences)
+                except (TypeError, ValueError):
+                    minimo = 0
+                if minimo < 1:
+                    return error_response(
+                        msg="Error de validación",
+                        code=400,
+                        data={"min_absences": "Debe ser un entero mayor o igual a 1"},
+                    )
+
+            result = attendance_streaks.at_risk(minimo, program)
+            return success_response(
+                msg="Participantes en riesgo obtenidos",
+                data={"min_absences": minimo, "total": len(result), "participants": result},
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def get_attendance_matrix(self, schedule_id, month=None):
+        """
+        Matriz participante × fecha de un horario para un mes, en una sola consulta.
+        Filas: participantes activos del programa del horario y cualquiera con registros
+        en el mes. Columnas: ocurrencias del horario en el mes y fechas con registros.
+        statuses es un arreglo plano por filas (len(participants) × len(dates)) con los
+        códigos de status_codes (0 = sin registro).
+        """
+        try:
+            mes, month_error = parse_month(month)
+            if month_error:
+                return error_response(msg="Error de validación", code=400, data={"month": month_error})
+            desde = mes or date.today().replace(day=1)
+            hasta = attendance_partitions.next_month(desde) - timedelta(days=1)
+
+            schedule = Schedule.query.filter_by(external_id=schedule_id).first()
+            if not schedule:
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": schedule_id},
+                )
 
-            # Consulta: sesiones recurrentes del día + sesiones específicas de hoy
-            schedules = (
-                Schedule.query.filter(Schedule.status == "active")
+            rows = (
+                db.session.query(
+                    Participant.id,
+                    Participant.external_id,
+                    Participant.firstName,
+                    Participant.lastName,
+                    Attendance.date,
+                    Attendance.status,
+                )
+                .outerjoin(
+                    Attendance,
+                    db.and_(
+                        Attendance.participant_id == Participant.id,
+                        Attendance.schedule_id == schedule.id,
+                        Attendance.date.between(desde, hasta),
+                    ),
+                )
                 .filter(
                     db.or_(
-                        Schedule.dayOfWeek == hoy_dia, Schedule.specificDate == hoy_date
+                        db.and_(
+                            Participant.program == schedule.program,
+                            Participant.status == "ACTIVO",
+                        ),
+                        Attendance.id.isnot(None),
                     )
                 )
+                .order_by(Participant.lastName, Participant.firstName, Participant.id)
                 .all()
             )
 
-            result = []
-            for s in schedules:
-                # Determinar estado: completada si ya tiene asistencias registradas
-                attendances_count = Attendance.query.filter_by(
-                    schedule_id=s.id, date=hoy_date
-                ).count()
-
-                status = "completada" if attendances_count > 0 else "pendiente"
-
-                result.append(
+            codes = {status: code for code, status in enumerate(MATRIX_STATUS_CODES)}
+            participants, cells = {}, {}
+            for row in rows:
+                participants.setdefault(
+                    row.id,
                     {
-                        "external_id": s.external_id,
-                        "name": s.name,
-                        "day_of_week": s.dayOfWeek,
-                        "start_time": s.startTime,
-                        "end_time": s.endTime,
-                        "program": s.program,
-                        "specific_date": s.specificDate,
-                        "is_recurring": s.isRecurring,
-                        "location": s.location,
-                        "status": status,
-                        "attendances_registered": attendances_count,
-                        "has_attendances": attendances_count > 0,
-                    }
+                        "external_id": row.external_id,
+                        "first_name": row.firstName,
+                        "last_name": row.lastName,
+                    },
                 )
+                if row.date:
+                    cells[(row.id, row.date)] = codes.get(row.status, 0)
+
+            fechas = {o["date"] for o in schedule_occurrences.expand([schedule], desde, hasta)}
+            fechas.update(fecha for _, fecha in cells)
+            fechas = sorted(fechas)
+
+            statuses = [
+                cells.get((participant_id, fecha), 0)
+                for participant_id in participants
+                for fecha in fechas
+            ]
             return success_response(
-                msg=f"Sesiones de hoy obtenidas correctamente", data=result
+                msg="Matriz de asistencia obtenida",
+                data={
+                    "schedule_external_id": schedule.external_id,
+                    "month": desde.strftime("%Y-%m"),
+                    "participants": list(participants.values()),
+                    "dates": [fecha.isoformat() for fecha in fechas],
+                    "status_codes": MATRIX_STATUS_CODES,
+                    "statuses": statuses,
+                },
             )
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
     def get_history(
         self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
-        search_dni=None, search_name=None, participant_id=None
+        search_dni=None, search_name=None, participant_id=None, cursor=None, limit=None
     ):
-        # Historial de asistencias con filtros de fecha, sesión, día y búsqueda por participante
+        # Historial de asistencias con filtros de fecha, sesión, día y búsqueda por participante.
+        # Con cursor o limit se pagina por (date, id) descendente.
         try:
-            print(f"DEBUG - Filtros recibidos: date_from={date_from}, date_to={date_to}, schedule_id={schedule_id}, day_filter={day_filter}")
-            print(f"DEBUG - Búsqueda: dni={search_dni}, name={search_name}, participant_id={participant_id}")
-            
-            from sqlalchemy import func, or_
-            
-            query = Attendance.query.join(Schedule).join(Participant)
-            
-            # Filtro por DNI del participante (búsqueda exacta o parcial)
-            if search_dni:
-                query = query.filter(Participant.dni.ilike(f"%{search_dni}%"))
-                print(f"DEBUG - Aplicando filtro DNI: {search_dni}")
-            
-            # Filtro por nombre del participante (búsqueda parcial en nombre y apellido)
-            if search_name:
-                search_term = f"%{search_name}%"
-                query = query.filter(
-                    or_(
-                        Participant.firstName.ilike(search_term),
-                        Participant.lastName.ilike(search_term),
-                        func.concat(Participant.firstName, ' ', Participant.lastName).ilike(search_term)
+            dates, errors = parse_date_filters(date_from=date_from, date_to=date_to)
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
+
+            query = self._history_query(
+                dates["date_from"], dates["date_to"], schedule_id, day_filter,
+                search_dni, search_name, participant_id,
+            )
+
+            if cursor is None and limit is None:
+                attendances = query.order_by(
+                    Attendance.date.desc(), Attendance.id.desc()
+                ).all()
+                result = [self._serialize_history_row(a) for a in attendances]
+                return success_response(msg="Historial obtenido correctamente", data=result)
+
+            try:
+                limit = min(int(limit or HISTORY_PAGE_SIZE), HISTORY_MAX_PAGE_SIZE)
+                if limit <= 0:
+                    raise ValueError
+            except (ValueError, TypeError):
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"limit": f"Debe ser un número entre 1 y {HISTORY_MAX_PAGE_SIZE}"},
+                )
+
+            if cursor:
+                position = self._decode_history_cursor(cursor)
+                if not position:
+                    return error_response(
+                        msg="Error de validación", code=400, data={"cursor": "Cursor inválido"}
                     )
+                # La condición simple sobre date permite descartar particiones posteriores
+                query = query.filter(
+                    Attendance.date <= position[0],
+                    tuple_(Attendance.date, Attendance.id) < tuple_(*position),
                 )
-                print(f"DEBUG - Aplicando filtro nombre: {search_name}")
-            
-            # Filtro por ID del participante (para ver historial individual)
-            if participant_id:
-                participant = Participant.query.filter_by(external_id=participant_id).first()
-                if participant:
-                    query = query.filter(Attendance.participant_id == participant.id)
-                    print(f"DEBUG - Aplicando filtro participant_id: {participant_id}")
-
-            if date_from:
-                query = query.filter(Attendance.date >= date_from)
-                print(f"DEBUG - Aplicando filtro date_from: {date_from}")
-                
-            if date_to:
-                query = query.filter(Attendance.date <= date_to)
-                print(f"DEBUG - Aplicando filtro date_to: {date_to}")
-
-            if schedule_id:
-                schedule = Schedule.query.filter_by(external_id=schedule_id).first()
-                if schedule:
-                    query = query.filter(Attendance.schedule_id == schedule.id)
-                    print(f"DEBUG - Aplicando filtro schedule_id: {schedule_id}")
-
-            if day_filter:
-                print(f"DEBUG - Aplicando filtro day_of_week: '{day_filter}'")
-                # Convertir a mayúsculas para comparación case-insensitive
-                day_filter_upper = day_filter.upper()
-                print(f"DEBUG - day_filter convertido a mayúsculas: '{day_filter_upper}'")
-                
-                # Mapear nombre del día a número de día de la semana (PostgreSQL: 0=Sunday, 1=Monday, etc.)
-                day_mapping = {
-                    'DOMINGO': 0,
-                    'LUNES': 1,
-                    'MARTES': 2,
-                    'MIERCOLES': 3,
-                    'MIÉRCOLES': 3,
-                    'JUEVES': 4,
-                    'VIERNES': 5,
-                    'SABADO': 6,
-                    'SÁBADO': 6
-                }
-                
-                day_number = day_mapping.get(day_filter_upper)
-                print(f"DEBUG - Día mapeado a número: {day_number}")
-                
-                if day_number is not None:
-                    from sqlalchemy import func, cast, Date
-                    # Filtrar por el día de la semana de la fecha de asistencia
-                    # En PostgreSQL, EXTRACT(DOW FROM date) devuelve 0=Sunday, 1=Monday, etc.
-                    query = query.filter(func.extract('dow', cast(Attendance.date, Date)) == day_number)
-                    print(f"DEBUG - Filtrando asistencias del día {day_filter_upper} (dow={day_number})")
-
-            attendances = query.order_by(Attendance.date.desc()).all()
-            print(f"DEBUG - Total asistencias encontradas después de filtros: {len(attendances)}")
-            
-            result = []
-            for a in attendances:
-                print(f"DEBUG - Procesando asistencia: fecha={a.date}, sesión='{a.schedule.name}', día='{a.schedule.dayOfWeek}'")
-                result.append(
-                    {
-                        "external_id": a.external_id,
-                        "date": a.date,
-                        "status": a.status,
-                        "participant": {
-                            "external_id": a.participant.external_id,
-                            "first_name": a.participant.firstName,
-                            "last_name": a.participant.lastName,
-                            "dni": a.participant.dni,
-                        },
-                        "schedule": {
-                            "external_id": a.schedule.external_id,
-                            "name": a.schedule.name,
-                            "day_of_week": a.schedule.dayOfWeek or "",
-                            "start_time": a.schedule.startTime,
-                            "end_time": a.schedule.endTime,
-                            "program": a.schedule.program,
-                            "location": a.schedule.location or "",
-                            "description": a.schedule.description or "",
-                        },
-                    }
+
+            attendances = (
+                query.order_by(Attendance.date.desc(), Attendance.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            has_more = len(attendances) > limit
+            attendances = attendances[:limit]
+
+            next_cursor = None
+            if has_more:
+                last = attendances[-1]
+                next_cursor = self._encode_history_cursor(last.date, last.id)
+
+            return success_response(
+                msg="Historial obtenido correctamente",
+                data={
+                    "items": [self._serialize_history_row(a) for a in attendances],
+                    "next_cursor": next_cursor,
+                    "has_more": has_more,
+                },
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def stream_history(
+        self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
+        search_dni=None, search_name=None, participant_id=None
+    ):
+        # Generador NDJSON del historial leído con un cursor del lado del servidor (memoria constante).
+        # Las fechas deben validarse antes (validate_history_dates) porque el stream ya no puede responder 400.
+        rows = self._history_rows(
+            date_from, date_to, schedule_id, day_filter, search_dni, search_name, participant_id
+        )
+        for a in rows:
+            yield json.dumps(self._serialize_history_row(a), ensure_ascii=False) + "\n"
+
+    def export_history_csv(self, **filters):
+        # Generador CSV del historial (mismos filtros que stream_history), por bloques de filas.
+        # Empieza con BOM UTF-8 para que Excel reconozca las tildes.
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(HISTORY_EXPORT_COLUMNS)
+        yield "\ufeff" + self._drain(buffer)
+
+        for position, a in enumerate(self._history_rows(**filters), start=1):
+            writer.writerow(self._history_export_row(a))
+            if position % HISTORY_STREAM_BATCH == 0:
+                yield self._drain(buffer)
+        yield self._drain(buffer)
+
+    def export_history_xlsx(self, **filters):
+        """
+        Generador XLSX del historial. Las filas se escriben una a una con un libro
+        write_only de openpyxl (en disco, memoria constante) y el archivo se envía por bloques;
+        un XLSX es un ZIP, así que no puede emitirse antes de escribir la última fila.
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Asistencias")
+        sheet.append(HISTORY_EXPORT_COLUMNS)
+        for a in self._history_rows(**filters):
+            row = self._history_export_row(a)
+            # Fecha como celda de fecha (ordenable y filtrable en Excel)
+            row[0] = WriteOnlyCell(sheet, value=a.date)
+            row[0].number_format = "yyyy-mm-dd"
+            sheet.append(row)
+
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            while True:
+                chunk = output.read(HISTORY_EXPORT_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _history_rows(
+        self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
+        search_dni=None, search_name=None, participant_id=None
+    ):
+        # Asistencias filtradas, más recientes primero, leídas en bloques con yield_per
+        query = self._history_query(
+            parse_attendance_date(date_from)[0], parse_attendance_date(date_to)[0],
+            schedule_id, day_filter, search_dni, search_name, participant_id,
+        )
+        statement = query.order_by(Attendance.date.desc(), Attendance.id.desc()).statement
+        return db.session.scalars(
+            statement, execution_options={"yield_per": HISTORY_STREAM_BATCH}
+        )
+
+    def _history_export_row(self, a):
+        return [
+            a.date.isoformat(),
+            a.schedule.name,
+            a.schedule.dayOfWeek or "",
+            a.schedule.startTime,
+            a.schedule.endTime,
+            a.schedule.program,
+            a.participant.dni,
+            a.participant.firstName,
+            a.participant.lastName,
+            a.status,
+        ]
+
+    def _drain(self, buffer):
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    def validate_history_dates(self, date_from=None, date_to=None):
+        # Retorna un error_response si los filtros de fecha no son válidos, o None
+        _, errors = parse_date_filters(date_from=date_from, date_to=date_to)
+        if errors:
+            return error_response(msg="Error de validación", code=400, data=errors)
+        return None
+
+    def validate_history_export(self, date_from=None, date_to=None, export_format="csv"):
+        # Como validate_history_dates, además del formato de exportación
+        if export_format not in HISTORY_EXPORT_FORMATS:
+            return error_response(
+                msg="Error de validación",
+                code=400,
+                data={"format": f"Formato inválido. Use: {', '.join(HISTORY_EXPORT_FORMATS)}"},
+            )
+        return self.validate_history_dates(date_from, date_to)
+
+    def _history_query(
+        self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
+        search_dni=None, search_name=None, participant_id=None
+    ):
+        # Consulta base del historial: JOIN con horario y participante cargados en la misma fila
+        query = (
+            Attendance.query.join(Attendance.schedule)
+            .join(Attendance.participant)
+            .options(contains_eager(Attendance.schedule), contains_eager(Attendance.participant))
+        )
+
+        # Filtro por DNI del participante (búsqueda exacta o parcial, índice trigram)
+        if search_dni:
+            query = query.filter(participant_search.dni_condition(search_dni))
+
+        # Filtro por nombre o DNI del participante (búsqueda parcial sin tildes, índice trigram)
+        if search_name:
+            query = query.filter(
+                Attendance.participant_id.in_(participant_search.matching_ids(search_name))
+            )
+
+        # Filtro por ID del participante (para ver historial individual)
+        if participant_id:
+            query = query.filter(Participant.external_id == participant_id)
+
+        if date_from:
+            query = query.filter(Attendance.date >= date_from)
+
+        if date_to:
+            query = query.filter(Attendance.date <= date_to)
+
+        if schedule_id:
+            query = query.filter(Schedule.external_id == schedule_id)
+
+        if day_filter:
+            # Mapear nombre del día a número de día de la semana (PostgreSQL: 0=Sunday, 1=Monday, etc.)
+            day_mapping = {
+                'DOMINGO': 0,
+                'LUNES': 1,
+                'MARTES': 2,
+                'MIERCOLES': 3,
+                'MIÉRCOLES': 3,
+                'JUEVES': 4,
+                'VIERNES': 5,
+                'SABADO': 6,
+                'SÁBADO': 6
+            }
+
+            day_number = day_mapping.get(day_filter.upper())
+            if day_number is not None:
+                # En PostgreSQL, EXTRACT(DOW FROM date) devuelve 0=Sunday, 1=Monday, etc.
+                query = query.filter(func.extract('dow', Attendance.date) == day_number)
+
+        return query
+
+    def _serialize_history_row(self, a):
+        return {
+            "external_id": a.external_id,
+            "date": a.date.isoformat(),
+            "status": a.status,
+            "participant": {
+                "external_id": a.participant.external_id,
+                "first_name": a.participant.firstName,
+                "last_name": a.participant.lastName,
+                "dni": a.participant.dni,
+            },
+            "schedule": {
+                "external_id": a.schedule.external_id,
+                "name": a.schedule.name,
+                "day_of_week": a.schedule.dayOfWeek or "",
+                "start_time": a.schedule.startTime,
+                "end_time": a.schedule.endTime,
+                "program": a.schedule.program,
+                "location": a.schedule.location or "",
+                "description": a.schedule.description or "",
+            },
+        }
+
+    def _encode_history_cursor(self, fecha, attendance_id):
+        raw = f"{fecha.isoformat()}|{attendance_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def _decode_history_cursor(self, cursor):
+        # Retorna (date, id) o None si el cursor no es válido
+        try:
+            fecha, attendance_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return date.fromisoformat(fecha), int(attendance_id)
+        except (ValueError, TypeError):
+            return None
+
+    def get_session_detail(self, schedule_id, date, if_none_match=None):
+        """
+        Detalle completo de participantes y estados de una sesión específica.
+        Retorna (resultado, etag). El ETag se deriva de la versión de la sesión en
+        schedule_occurrence, que cambia con cada registro o eliminación de asistencias,
+        y de la versión de participantes (nombres, correos y DNI incluidos en el detalle);
+        si coincide con if_none_match el resultado es None (304 sin cuerpo).
+        """
+        try:
+            fecha, date_error = parse_attendance_date(date)
+            if date_error:
+                return (
+                    error_response(msg="Error de validación", code=400, data={"date": date_error}),
+                    None,
                 )
-            
-            print(f"DEBUG - Resultado final: {len(result)} asistencias")
-            return success_response(msg="Historial obtenido correctamente", data=result)
+
+            session = (
+                db.session.query(Schedule.id, func.coalesce(ScheduleOccurrence.version, 0))
+                .outerjoin(
+                    ScheduleOccurrence,
+                    db.and_(
+                        ScheduleOccurrence.schedule_id == Schedule.id,
+                        ScheduleOccurrence.date == fecha,
+                    ),
+                )
+                .filter(Schedule.external_id == schedule_id)
+                .first()
+            )
+            if not session:
+                return error_response(msg="Horario no encontrado", data={}, code=404), None
+
+            schedule_pk, version = session
+            participants_version = cache_versions.current(PARTICIPANTS)[0]
+            etag = f"{schedule_id}-{fecha.isoformat()}-{version}-{participants_version}"
+            if if_none_match is not None and if_none_match.contains(etag):
+                return None, etag
+
+            result = session_detail_cache.get_or_set(
+                (schedule_pk, fecha, version),
+                lambda: self._build_session_detail(schedule_pk, fecha),
+            )
+            return success_response(msg="Detalle de sesión obtenido", data=result), etag
+        except Exception as e:
+            return error_response(msg="Error", code=500, data={"error": str(e)}), None
+
+    def get_session_roster(self, schedule_id, date):
+        """
+        Participantes esperados en una sesión con su estado de registro, para precargar el
+        formulario de registro masivo sin descargar la lista completa de participantes.
+        """
+        try:
+            fecha, date_error = parse_attendance_date(date)
+            if date_error:
+                return error_response(msg="Error de validación", code=400, data={"date": date_error})
+
+            schedule = Schedule.query.filter_by(external_id=schedule_id).first()
+            if not schedule:
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": schedule_id},
+                )
+
+            participants = expected_rosters.roster(schedule, fecha)
+            return success_response(
+                msg="Participantes esperados obtenidos",
+                data={
+                    "schedule_external_id": schedule.external_id,
+                    "schedule_name": schedule.name,
+                    "program": schedule.program,
+                    "max_slots": schedule.maxSlots,
+                    "date": fecha.isoformat(),
+                    "is_scheduled": bool(schedule_occurrences.expand([schedule], fecha, fecha)),
+                    "expected_count": sum(1 for p in participants if p["expected"]),
+                    "registered_count": sum(1 for p in participants if p["status"]),
+                    "participants": participants,
+                },
+            )
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
-    def get_session_detail(self, schedule_id, date):
-        # Detalle completo de participantes y estados de una sesión específica
+    def _build_session_detail(self, schedule_pk, fecha):
+        # Una sola consulta con JOIN a participant, sin cargas perezosas por fila
+        rows = (
+            db.session.query(
+                Attendance.status,
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.email,
+            )
+            .join(Participant, Attendance.participant_id == Participant.id)
+            .filter(Attendance.schedule_id == schedule_pk, Attendance.date == fecha)
+            .order_by(Participant.lastName, Participant.firstName, Participant.id)
+            .all()
+        )
+        return [
+            {
+                "participant_external_id": row.external_id,
+                "status": row.status,
+                "participant_name": f"{row.firstName} {row.lastName}",
+                "participant": {
+                    "external_id": row.external_id,
+                    "first_name": row.firstName,
+                    "last_name": row.lastName,
+                    "dni": row.dni,
+                    "email": row.email,
+                    "img": "https://i.pravatar.cc/150?u=" + row.external_id,
+                },
+            }
+            for row in rows
+        ]
+
+    def delete_session_attendance(self, schedule_id, date, mode=None):
+        """
+        Elimina todos los registros de asistencia de una sesión (horario + fecha).
+        mode="soft" los mueve a deleted_attendance para poder restaurarlos; "hard" (por
+        defecto) los elimina definitivamente junto con los que estuvieran en la papelera.
+        Los contadores, totales, rachas y cupos se ajustan en la misma transacción solo
+        para los participantes afectados.
+        """
         try:
+            mode = mode or DELETE_MODES[0]
+            if mode not in DELETE_MODES:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"mode": f"Modo inválido. Use: {', '.join(DELETE_MODES)}"},
+                )
+            fecha, date_error = parse_attendance_date(date)
+            if date_error:
+                return error_response(msg="Error de validación", code=400, data={"date": date_error})
+            archived_error = self._archived_date_error(fecha)
+            if archived_error:
+                return archived_error
+
             schedule = Schedule.query.filter_by(external_id=schedule_id).first()
             if not schedule:
-                return error_response(msg="Horario no encontrado", data={}, code=404)
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": schedule_id},
+                )
 
-            attendances = Attendance.query.filter_by(
-                schedule_id=schedule.id, date=date
-            ).all()
+            session_capacity.lock(schedule.id, fecha)
+            trash = DeletedAttendance.__table__
+            # Una nueva eliminación reemplaza lo que hubiera en la papelera de esa sesión
+            db.session.execute(
+                trash.delete().where(trash.c.schedule_id == schedule.id, trash.c.date == fecha)
+            )
 
-            result = []
-            for a in attendances:
-                result.append(
-                    {
-                        "participant_external_id": a.participant.external_id,
-                        "status": a.status,
-                        "participant_name": f"{a.participant.firstName} {a.participant.lastName}",
-                        "participant": {
-                            "external_id": a.participant.external_id,
-                            "first_name": a.participant.firstName,
-                            "last_name": a.participant.lastName,
-                            "dni": a.participant.dni,
-                            "email": getattr(a.participant, "email", None),
-                            "img": "https://i.pravatar.cc/150?u="
-                            + a.participant.external_id,
-                        },
-                    }
+            table = Attendance.__table__
+            deleted = table.delete().where(
+                table.c.schedule_id == schedule.id, table.c.date == fecha
+            )
+            if mode == "soft":
+                # WITH moved AS (DELETE ... RETURNING *) INSERT INTO deleted_attendance SELECT ...
+                moved = deleted.returning(
+                    *[table.c[name] for name in ATTENDANCE_ROW_COLUMNS]
+                ).cte("moved")
+                stmt = (
+                    trash.insert()
+                    .from_select(
+                        [*ATTENDANCE_ROW_COLUMNS, "deleted_at"],
+                        db.select(
+                            *[moved.c[name] for name in ATTENDANCE_ROW_COLUMNS],
+                            func.now(),
+                        ),
+                    )
+                    .returning(trash.c.participant_id, trash.c.status)
+                    .add_cte(moved)
                 )
+            else:
+                stmt = deleted.returning(table.c.participant_id, table.c.status)
 
-            return success_response(msg="Detalle de sesión obtenido", data=result)
+            changes = [
+                AttendanceChange(participant_id, schedule.id, fecha, status, None)
+                for participant_id, status in db.session.execute(stmt).all()
+            ]
+            self._apply_derived_changes(changes)
+            db.session.commit()
+            today_sessions_cache.delete(fecha)
+
+            return success_response(
+                msg="Registros de asistencia eliminados para la fecha",
+                data={"mode": mode, "deleted": len(changes)},
+            )
         except Exception as e:
+            db.session.rollback()
             return error_response(msg="Error", code=500, data={"error": str(e)})
 
-    def delete_session_attendance(self, schedule_id, date):
-        # Elimina todos los registros de asistencia de una fecha específica
+    def restore_session_attendance(self, schedule_id, date):
+        """
+        Restaura los registros de una sesión eliminados con mode="soft".
+        Los participantes que volvieron a registrarse después conservan el registro nuevo
+        (se omiten); si los restaurados superan el cupo de la sesión no se restaura nada.
+        """
         try:
+            fecha, date_error = parse_attendance_date(date)
+            if date_error:
+                return error_response(msg="Error de validación", code=400, data={"date": date_error})
+            archived_error = self._archived_date_error(fecha)
+            if archived_error:
+                return archived_error
+
             schedule = Schedule.query.filter_by(external_id=schedule_id).first()
             if not schedule:
                 return error_response(
@@ -549,11 +1351,75 @@ class AttendanceController:
                     data={"schedule_external_id": schedule_id},
                 )
 
-            Attendance.query.filter_by(schedule_id=schedule.id, date=date).delete()
+            attendance_partitions.ensure_month(fecha)
+            session = session_capacity.lock(schedule.id, fecha)
+            trash = DeletedAttendance.__table__
+            table = Attendance.__table__
+            in_session = db.and_(trash.c.schedule_id == schedule.id, trash.c.date == fecha)
+            registered = (
+                db.select(table.c.id)
+                .where(
+                    table.c.participant_id == trash.c.participant_id,
+                    table.c.schedule_id == trash.c.schedule_id,
+                    table.c.date == trash.c.date,
+                )
+                .exists()
+            )
+
+            pending = db.session.execute(
+                db.select(Participant.external_id, registered.label("registered"))
+                .select_from(trash)
+                .join(Participant, trash.c.participant_id == Participant.id)
+                .where(in_session)
+            ).all()
+            if not pending:
+                db.session.rollback()
+                return error_response(
+                    msg="No hay registros eliminados para restaurar en la sesión",
+                    code=404,
+                    data={"schedule_external_id": schedule_id, "date": fecha.isoformat()},
+                )
+
+            overflow = session_capacity.overflow(
+                schedule,
+                session.registered_count,
+                [row.external_id for row in pending if not row.registered],
+            )
+            if overflow:
+                db.session.rollback()
+                return error_response(
+                    msg="La restauración supera el cupo de la sesión", code=409, data=overflow
+                )
+
+            # WITH restored AS (DELETE FROM deleted_attendance ... RETURNING *) INSERT INTO attendance
+            restored = (
+                trash.delete()
+                .where(in_session, ~registered)
+                .returning(*[trash.c[name] for name in ATTENDANCE_ROW_COLUMNS])
+                .cte("restored")
+            )
+            stmt = (
+                table.insert()
+                .from_select(
+                    list(ATTENDANCE_ROW_COLUMNS),
+                    db.select(*[restored.c[name] for name in ATTENDANCE_ROW_COLUMNS]),
+                )
+                .returning(table.c.participant_id, table.c.status)
+                .add_cte(restored)
+            )
+            changes = [
+                AttendanceChange(participant_id, schedule.id, fecha, None, status)
+                for participant_id, status in db.session.execute(stmt).all()
+            ]
+            # Los omitidos ya tienen un registro más reciente; dejan la papelera
+            db.session.execute(trash.delete().where(in_session))
+            self._apply_derived_changes(changes)
             db.session.commit()
+            today_sessions_cache.delete(fecha)
 
             return success_response(
-                msg="Registros de asistencia eliminados para la fecha"
+                msg="Registros de asistencia restaurados",
+                data={"restored": len(changes), "skipped": len(pending) - len(changes)},
             )
         except Exception as e:
             db.session.rollback()
@@ -562,13 +1428,7 @@ class AttendanceController:
     def _calculate_attendance_percentage(self, participant_id):
         # Método interno: calcula porcentaje de asistencias de un participante
         try:
-            total = Attendance.query.filter_by(participant_id=participant_id).count()
-            if total == 0:
-                return 0
-            present = Attendance.query.filter_by(
-                participant_id=participant_id, status=Attendance.Status.PRESENT
-            ).count()
-            return round((present / total) * 100, 2)
+            return attendance_stats.get_participant_stats(participant_id)["percentage"]
         except:
             return 0
 
@@ -607,50 +1467,385 @@ class AttendanceController:
                     data={"schedule_external_id": data.get("schedule_external_id")},
                 )
 
-            fecha = data.get("date", date.today().isoformat())
-            registros_creados = []
+            fecha, date_error = parse_attendance_date(data.get("date") or date.today())
+            if date_error:
+                return error_response(msg="Error de validación", code=400, data={"date": date_error})
+            archived_error = self._archived_date_error(fecha)
+            if archived_error:
+                return archived_error
 
-            for item in data["attendances"]:
-                if "participant_external_id" not in item or "status" not in item:
-                    continue
+            # Antes de tocar attendance en esta transacción (crear una partición bloquea la tabla)
+            attendance_partitions.ensure_month(fecha)
 
-                participant = Participant.query.filter_by(
-                    external_id=item["participant_external_id"]
-                ).first()
-                if not participant:
-                    continue
+            result = self._upsert_session_attendance(
+                schedule, fecha, data["attendances"]
+            )
+            if result["overflow"]:
+                db.session.rollback()
+                return error_response(
+                    msg="La sesión no tiene cupos suficientes",
+                    code=409,
+                    data=result["overflow"],
+                )
+            db.session.commit()
+            today_sessions_cache.delete(fecha)
 
-                existing = Attendance.query.filter_by(
-                    participant_id=participant.id, schedule_id=schedule.id, date=fecha
-                ).first()
+            procesados = result["created"] + result["updated"]
+            return success_response(
+                msg=f"Se procesaron {len(procesados)} asistencias",
+                data={
+                    "total": len(procesados),
+                    "attendances": procesados,
+                    "created": result["created"],
+                    "updated": result["updated"],
+                    "rejected": result["rejected"],
+                },
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
-                if existing:
-                    existing.status = item["status"]
-                else:
-                    nuevo = Attendance(
-                        participant_id=participant.id,
-                        schedule_id=schedule.id,
-                        date=fecha,
-                        status=item["status"],
-                    )
-                    db.session.add(nuevo)
+    def sync_attendance(self, data):
+        """
+        Sincronización de asistencias tomadas sin conexión: varias sesiones por solicitud.
+        Cada lote trae idempotency_key, client_updated_at, schedule_external_id, date y
+        attendances. Los lotes ya aplicados devuelven el resultado guardado sin volver a
+        escribir; cada lote se aplica en su propio SAVEPOINT, de modo que un error o un
+        exceso de cupo no descarta los demás. Retorna {"results": {clave: resultado}}.
+        """
+        try:
+            batches = (data or {}).get("batches")
+            if not isinstance(batches, list) or not batches:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"batches": "Debe enviar una lista de lotes"},
+                )
+            if len(batches) > SYNC_MAX_BATCHES:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"batches": f"Máximo {SYNC_MAX_BATCHES} lotes por solicitud"},
+                )
 
-                registros_creados.append(
-                    {
-                        "participant_external_id": item["participant_external_id"],
-                        "status": item["status"],
+            results, pending = {}, {}
+            for position, batch in enumerate(batches):
+                key = batch.get("idempotency_key") if isinstance(batch, dict) else None
+                if not key or len(str(key)) > 64:
+                    results[f"#{position}"] = self._sync_error(
+                        {"idempotency_key": "Clave requerida (máximo 64 caracteres)"}
+                    )
+                else:
+                    # Una clave repetida en la misma solicitud se aplica una sola vez
+                    pending.setdefault(str(key), batch)
+
+            # Una consulta para los lotes ya aplicados y otra para los horarios referidos
+            applied, schedules = {}, {}
+            if pending:
+                applied = dict(
+                    db.session.query(SyncBatch.idempotency_key, SyncBatch.result)
+                    .filter(SyncBatch.idempotency_key.in_(list(pending)))
+                    .all()
+                )
+                schedule_ids = {
+                    b.get("schedule_external_id")
+                    for k, b in pending.items()
+                    if k not in applied and b.get("schedule_external_id")
+                }
+                if schedule_ids:
+                    schedules = {
+                        schedule.external_id: schedule
+                        for schedule in Schedule.query.filter(
+                            Schedule.external_id.in_(list(schedule_ids))
+                        ).all()
                     }
+
+            sessions = []
+            archived_until = attendance_partitions.archived_until() if pending else None
+            for key, batch in pending.items():
+                if key in applied:
+                    results[key] = dict(applied[key], status="duplicate")
+                    continue
+                session, errors = self._parse_sync_batch(batch, schedules)
+                fecha = session[1]
+                if fecha and archived_until and fecha < archived_until:
+                    errors["date"] = ARCHIVED_MONTH_ERROR
+                if errors:
+                    results[key] = self._sync_error(errors)
+                else:
+                    sessions.append((key, batch, *session))
+
+            # Mismo orden de bloqueo de sesiones en todas las solicitudes
+            sessions.sort(key=lambda s: (s[2].id, s[3], s[0]))
+            for fecha in {s[3] for s in sessions}:
+                attendance_partitions.ensure_month(fecha)
+            touched_dates = set()
+            for key, batch, schedule, fecha, client_updated_at in sessions:
+                results[key] = self._apply_sync_batch(
+                    key, schedule, fecha, client_updated_at, batch["attendances"]
                 )
+                if results[key]["status"] == "applied":
+                    touched_dates.add(fecha)
 
             db.session.commit()
+            for fecha in touched_dates:
+                today_sessions_cache.delete(fecha)
 
             return success_response(
-                msg=f"Se procesaron {len(registros_creados)} asistencias",
-                data={
-                    "total": len(registros_creados),
-                    "attendances": registros_creados,
-                },
+                msg=f"Se procesaron {len(results)} lotes", data={"results": results}
             )
         except Exception as e:
             db.session.rollback()
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def _parse_sync_batch(self, batch, schedules):
+        # Valida un lote de sincronización; retorna ((schedule, fecha, client_updated_at), errores)
+        errors = {}
+        fecha, date_error = parse_attendance_date(batch.get("date"))
+        if not fecha:
+            errors["date"] = date_error or "La fecha es requerida"
+        client_updated_at, ts_error = parse_client_timestamp(batch.get("client_updated_at"))
+        if not client_updated_at:
+            errors["client_updated_at"] = ts_error or "La fecha y hora del cliente es requerida"
+        if not isinstance(batch.get("attendances"), list):
+            errors["attendances"] = "El campo attendances es requerido y debe ser una lista"
+
+        schedule = None
+        if not batch.get("schedule_external_id"):
+            errors["schedule_external_id"] = "El campo schedule_external_id es requerido"
+        else:
+            schedule = schedules.get(batch["schedule_external_id"])
+            if not schedule:
+                errors["schedule_external_id"] = "Horario no encontrado"
+
+        return (schedule, fecha, client_updated_at), errors
+
+    def _apply_sync_batch(self, key, schedule, fecha, client_updated_at, items):
+        # Aplica un lote dentro de un SAVEPOINT y registra su clave de idempotencia
+        savepoint = db.session.begin_nested()
+        try:
+            table = SyncBatch.__table__
+            claimed = db.session.execute(
+                pg_insert(table)
+                .values(
+                    idempotency_key=key,
+                    schedule_id=schedule.id,
+                    date=fecha,
+                    created_at=datetime.utcnow(),
+                )
+                .on_conflict_do_nothing(index_elements=[table.c.idempotency_key])
+                .returning(table.c.idempotency_key)
+            ).first()
+            if not claimed:
+                # Otra solicitud aplicó la misma clave en paralelo (ya confirmada)
+                savepoint.rollback()
+                stored = db.session.get(SyncBatch, key)
+                return dict(stored.result or {}, status="duplicate")
+
+            result = self._upsert_session_attendance(schedule, fecha, items, client_updated_at)
+            if result["overflow"]:
+                savepoint.rollback()
+                return {
+                    "status": "error",
+                    "errors": {"overflow": result["overflow"]},
+                }
+
+            summary = {
+                "status": "applied",
+                "schedule_external_id": schedule.external_id,
+                "date": fecha.isoformat(),
+                "created": result["created"],
+                "updated": result["updated"],
+                "stale": result["stale"],
+                "rejected": result["rejected"],
+            }
+            db.session.execute(
+                table.update().where(table.c.idempotency_key == key).values(result=summary)
+            )
+            savepoint.commit()
+            return summary
+        except Exception as e:
+            savepoint.rollback()
+            return self._sync_error({"error": str(e)})
+
+    def _sync_error(self, errors):
+        return {"status": "error", "errors": errors}
+
+    def _archived_date_error(self, fecha):
+        # Los meses archivados ya no están en attendance: no se registran ni eliminan
+        if attendance_partitions.is_archived(fecha):
+            return error_response(
+                msg="Mes archivado", code=409, data={"date": ARCHIVED_MONTH_ERROR}
+            )
+        return None
+
+    def _upsert_session_attendance(self, schedule, fecha, items, client_updated_at=None):
+        # Registra asistencias de una sesión con una consulta IN y un único INSERT ... ON CONFLICT.
+        # Gana la escritura más reciente según client_updated_at (por defecto, ahora); las filas
+        # con una marca posterior no se modifican y se reportan como "stale".
+        written_at = client_write_time(client_updated_at)
+        rejected = []
+        statuses = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                item = {}
+            if "participant_external_id" not in item or "status" not in item:
+                rejected.append(
+                    {
+                        "index": index,
+                        "participant_external_id": item.get("participant_external_id"),
+                        "reason": "Los campos participant_external_id y status son requeridos",
+                    }
+                )
+                continue
+
+            status = str(item["status"] or "").strip().lower()
+            if status not in ATTENDANCE_STATUSES:
+                rejected.append(
+                    {
+                        "index": index,
+                        "participant_external_id": item["participant_external_id"],
+                        "reason": f"Estado inválido. Use: {', '.join(ATTENDANCE_STATUSES)}",
+                    }
+                )
+                continue
+
+            external_id = item["participant_external_id"]
+            if external_id in statuses:
+                # El último valor enviado para un participante es el que se registra
+                rejected.append(
+                    {
+                        "index": statuses[external_id][0],
+                        "participant_external_id": external_id,
+                        "reason": "Participante duplicado en la solicitud",
+                    }
+                )
+            statuses[external_id] = (index, status)
+
+        participant_ids = {}
+        if statuses:
+            participant_ids = dict(
+                db.session.query(Participant.external_id, Participant.id)
+                .filter(Participant.external_id.in_(list(statuses)))
+                .all()
+            )
+
+        rows = []
+        for external_id, (index, status) in statuses.items():
+            if external_id not in participant_ids:
+                rejected.append(
+                    {
+                        "index": index,
+                        "participant_external_id": external_id,
+                        "reason": "Participante no encontrado",
+                    }
+                )
+                continue
+            rows.append(
+                {
+                    "external_id": str(uuid.uuid4()),
+                    "participant_id": participant_ids[external_id],
+                    "schedule_id": schedule.id,
+                    "date": fecha,
+                    "status": status,
+                    "client_updated_at": written_at,
+                }
+            )
+
+        created, updated, stale, changes = [], [], [], []
+        if rows:
+            # Bloquea la sesión: los envíos simultáneos de la misma sesión esperan aquí
+            occurrence = session_capacity.lock(schedule.id, fecha)
+
+            # Estados previos (bloqueados) para ajustar los contadores derivados
+            previous = dict(
+                db.session.query(Attendance.participant_id, Attendance.status)
+                .filter(
+                    Attendance.schedule_id == schedule.id,
+                    Attendance.date == fecha,
+                    Attendance.participant_id.in_([r["participant_id"] for r in rows]),
+                )
+                .with_for_update()
+                .all()
+            )
+
+            # Solo los participantes sin registro previo ocupan un cupo nuevo
+            external_ids = {v: k for k, v in participant_ids.items()}
+            overflow = session_capacity.overflow(
+                schedule,
+                occurrence.registered_count,
+                [
+                    external_ids[r["participant_id"]]
+                    for r in rows
+                    if r["participant_id"] not in previous
+                ],
+            )
+            if overflow:
+                return {
+                    "created": [],
+                    "updated": [],
+                    "stale": [],
+                    "rejected": rejected,
+                    "overflow": overflow,
+                }
+
+            table = Attendance.__table__
+            stmt = pg_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_attendance_participant_schedule_date",
+                set_={
+                    "status": stmt.excluded.status,
+                    "client_updated_at": stmt.excluded.client_updated_at,
+                },
+                where=db.or_(
+                    table.c.client_updated_at.is_(None),
+                    table.c.client_updated_at <= stmt.excluded.client_updated_at,
+                ),
+            ).returning(table.c.participant_id, table.c.status)
+
+            # La sesión está bloqueada, así que lo que no estaba en previous es una alta
+            # (xmax no se puede retornar desde una tabla particionada)
+            for row in db.session.execute(stmt):
+                inserted = row.participant_id not in previous
+                entry = {
+                    "participant_external_id": external_ids[row.participant_id],
+                    "status": row.status,
+                }
+                (created if inserted else updated).append(entry)
+                changes.append(
+                    AttendanceChange(
+                        row.participant_id,
+                        schedule.id,
+                        fecha,
+                        None if inserted else previous[row.participant_id],
+                        row.status,
+                    )
+                )
+
+            # Las filas que el WHERE del ON CONFLICT descartó no aparecen en RETURNING
+            written = {change.participant_id for change in changes}
+            stale = [
+                {
+                    "participant_external_id": external_ids[r["participant_id"]],
+                    "status": previous.get(r["participant_id"]),
+                }
+                for r in rows
+                if r["participant_id"] not in written
+            ]
+
+        self._apply_derived_changes(changes)
+        rejected.sort(key=lambda r: r["index"])
+        return {
+            "created": created,
+            "updated": updated,
+            "stale": stale,
+            "rejected": rejected,
+            "overflow": None,
+        }
+
+    def _apply_derived_changes(self, changes):
+        # Propaga los cambios de asistencia a los datos derivados (en la misma transacción)
+        attendance_stats.apply_changes(changes)
+        attendance_rollups.apply_changes(changes)
+        attendance_streaks.apply_changes(changes)
+        session_capacity.apply_changes(changes)
@@ -1,12 +1,33 @@
 from app.models.participant import Participant
 from app.models.responsible import Responsible
 from app.models.user import User
+from app.services.cache_version_service import PARTICIPANTS, cache_versions
+from app.services.identity_conflict_service import (
+    PARTICIPANT,
+    RESPONSIBLE,
+    USER,
+    identity_conflicts,
+)
 from app.services.java_sync_service import java_sync
+from app.services.participant_counter_service import participant_counters
+from app.services.participant_import_service import (
+    IMPORT_FORMATS,
+    IMPORT_MAX_ROWS,
+    participant_import,
+)
+from app.services.participant_search_service import (
+    SEARCH_LIMIT,
+    SEARCH_MAX_LIMIT,
+    participant_search,
+)
+from app.utils.cache import TTLCache
 from app.utils.constants.message import ERROR_VALIDATION, INVALID_DATA, REQUIRED_FIELD
 from app.utils.responses import error_response, success_response
 from flask import request
+from sqlalchemy import func
 from app import db
 from werkzeug.security import generate_password_hash
+import base64
 import uuid
 
 from app.utils.validations.user_validation import (
@@ -19,6 +40,43 @@ from app.utils.validations.user_validation import (
     validate_required_fields,
 )
 
+USERS_PAGE_SIZE = 50
+USERS_MAX_PAGE_SIZE = 500
+USERS_COUNT_TTL = 300
+# Participantes insertados por flush en la importación masiva
+IMPORT_BATCH_SIZE = 500
+
+# Campos que se pueden pedir con fields= en el listado de participantes
+USER_LIST_FIELDS = {
+    "external_id": Participant.external_id,
+    "firstName": Participant.firstName,
+    "lastName": Participant.lastName,
+    "email": Participant.email,
+    "dni": Participant.dni,
+    "phone": Participant.phone,
+    "age": Participant.age,
+    "status": Participant.status,
+    "type": Participant.type,
+    "program": Participant.program,
+    "java_external": Participant.java_external,
+}
+USER_LIST_DEFAULT_FIELDS = (
+    "external_id",
+    "firstName",
+    "lastName",
+    "email",
+    "dni",
+    "age",
+    "status",
+    "type",
+    "java_external",
+)
+
+# Totales del listado por combinación de filtros; se descartan al cambiar la versión de
+# participantes, de modo que cada página no repite el conteo completo
+users_count_cache = TTLCache(ttl=USERS_COUNT_TTL, maxsize=64)
+cache_versions.subscribe(PARTICIPANTS, users_count_cache.clear)
+
 
 class UserController:
     def _get_token(self):
@@ -67,26 +125,151 @@ class UserController:
 
         return is_ascending or is_descending
 
-    def get_users(self):
+    def get_users(
+        self, status=None, type=None, program=None, age_min=None, age_max=None,
+        fields=None, cursor=None, limit=None
+    ):
+        """
+        Lista participantes filtrados en la base de datos, seleccionando solo las columnas
+        de fields (separadas por comas). Con cursor o limit se pagina por id y la respuesta
+        incluye next_cursor y el total de los filtros (conteo en caché).
+        """
         try:
-            participants = Participant.query.all()
+            errors = {}
+            names = (
+                [f.strip() for f in fields.split(",") if f.strip()]
+                if fields
+                else list(USER_LIST_DEFAULT_FIELDS)
+            )
+            unknown = [name for name in names if name not in USER_LIST_FIELDS]
+            if unknown or not names:
+                errors["fields"] = f"Campos válidos: {', '.join(USER_LIST_FIELDS)}"
+
+            ages = {}
+            for key, value in (("age_min", age_min), ("age_max", age_max)):
+                if value in (None, ""):
+                    continue
+                try:
+                    ages[key] = int(value)
+                except (TypeError, ValueError):
+                    errors[key] = "Debe ser un número entero"
+
+            paginated = cursor is not None or limit is not None
+            after_id = None
+            if paginated:
+                try:
+                    limit = min(int(limit or USERS_PAGE_SIZE), USERS_MAX_PAGE_SIZE)
+                    if limit <= 0:
+                        raise ValueError
+                except (TypeError, ValueError):
+                    errors["limit"] = f"Debe ser un número entre 1 y {USERS_MAX_PAGE_SIZE}"
+                if cursor:
+                    after_id = self._decode_users_cursor(cursor)
+                    if after_id is None:
+                        errors["cursor"] = "Cursor inválido"
+
+            if errors:
+                return error_response(ERROR_VALIDATION, code=400, data=errors)
+
+            filters = {
+                "status": str(status).strip().upper() if status else None,
+                "type": str(type).strip().upper() if type else None,
+                "program": str(program).strip().upper() if program else None,
+                "age_min": ages.get("age_min"),
+                "age_max": ages.get("age_max"),
+            }
+            conditions = self._users_conditions(filters)
+            query = (
+                db.session.query(Participant.id, *[USER_LIST_FIELDS[n] for n in names])
+                .filter(*conditions)
+                .order_by(Participant.id)
+            )
+
+            if not paginated:
+                data = [dict(zip(names, row[1:])) for row in query.all()]
+                return success_response(msg="Usuarios listados correctamente", data=data)
+
+            if after_id is not None:
+                query = query.filter(Participant.id > after_id)
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+
+            total = users_count_cache.get_or_set(
+                tuple(sorted(filters.items())),
+                lambda: db.session.query(func.count(Participant.id)).filter(*conditions).scalar(),
+            )
+            return success_response(
+                msg="Usuarios listados correctamente",
+                data={
+                    "items": [dict(zip(names, row[1:])) for row in rows],
+                    "next_cursor": self._encode_users_cursor(rows[-1].id) if has_more else None,
+                    "has_more": has_more,
+                    "total": total,
+                },
+            )
+        except Exception:
+            return error_response("Error interno del servidor", code=500)
+
+    def _users_conditions(self, filters):
+        conditions = []
+        if filters["status"]:
+            conditions.append(Participant.status == filters["status"])
+        if filters["type"]:
+            conditions.append(Participant.type == filters["type"])
+        if filters["program"]:
+            conditions.append(Participant.program == filters["program"])
+        if filters["age_min"] is not None:
+            conditions.append(Participant.age >= filters["age_min"])
+        if filters["age_max"] is not None:
+            conditions.append(Participant.age <= filters["age_max"])
+        return conditions
+
+    def _encode_users_cursor(self, participant_id):
+        return base64.urlsafe_b64encode(str(participant_id).encode()).decode()
+
+    def _decode_users_cursor(self, cursor):
+        # Retorna el id del último participante de la página anterior o None si no es válido
+        try:
+            return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, TypeError):
+            return None
+
+    def search_participants(self, term, limit=None):
+        """
+        Búsqueda de participantes por nombre o DNI (sin tildes), ordenada por relevancia.
+        """
+        try:
+            if not term or not str(term).strip():
+                return error_response(
+                    ERROR_VALIDATION, code=400, data={"q": REQUIRED_FIELD}
+                )
+
+            try:
+                limit = int(limit or SEARCH_LIMIT)
+                if limit <= 0:
+                    raise ValueError
+            except (ValueError, TypeError):
+                return error_response(
+                    ERROR_VALIDATION,
+                    code=400,
+                    data={"limit": f"Debe ser un número entre 1 y {SEARCH_MAX_LIMIT}"},
+                )
 
             data = [
                 {
                     "external_id": p.external_id,
                     "firstName": p.firstName,
                     "lastName": p.lastName,
-                    "email": p.email,
                     "dni": p.dni,
-                    "age": p.age,
+                    "program": p.program,
                     "status": p.status,
-                    "type": p.type,
-                    "java_external": p.java_external,
+                    "score": score,
                 }
-                for p in participants
+                for p, score in participant_search.search(term, limit)
             ]
 
-            return success_response(msg="Usuarios listados correctamente", data=data)
+            return success_response(msg="Participantes encontrados", data=data)
         except Exception:
             return error_response("Error interno del servidor", code=500)
 
@@ -128,12 +311,15 @@ class UserController:
             # ---------- Validaciones ----------
             # Permitir mismo DNI que un participante: esa persona puede ser también docente/pasante
             # Solo valida cada campo si tiene valor; si está vacío ya existe error de requerido
+            conflicts = identity_conflicts.find(dnis=[dni], emails=[email])
             if dni:
                 errors.update(
-                    validate_dni(dni, self._is_sequential, check_participant=False)
+                    validate_dni(
+                        dni, self._is_sequential, check_participant=False, conflicts=conflicts
+                    )
                 )
             if email:
-                errors.update(validate_email(email))
+                errors.update(validate_email(email, conflicts=conflicts))
             if first_name:
                 errors.update(
                     validate_name(
@@ -252,8 +438,14 @@ class UserController:
                     msg="Participant not found",
                 )
 
+            counter_key = participant_counters.key(participant)
             participant.status = new_state
+            version = cache_versions.bump(PARTICIPANTS)
             db.session.commit()
+            participant_counters.apply(
+                [(counter_key, participant_counters.key(participant))], version
+            )
+            cache_versions.sync(force=True)
 
             java_external = participant.java_external
             if token and java_external:
@@ -278,6 +470,115 @@ class UserController:
                 msg="Error interno del servidor al cambiar el estado", code=500
             )
 
+    def import_participants(self, stream, filename=None, fmt=None, dry_run=False):
+        """
+        Importa participantes desde un archivo CSV o XLSX en una sola transacción.
+        Valida todas las filas con las reglas de create_participant (unicidad resuelta en
+        una sola consulta para todo el archivo, más duplicados dentro del archivo), inserta
+        las válidas por lotes y retorna el reporte de errores por fila. dry_run solo valida.
+        """
+        try:
+            fmt = participant_import.format_for(filename, fmt)
+            if not fmt:
+                return error_response(
+                    ERROR_VALIDATION,
+                    code=400,
+                    data={"format": f"Formato no soportado. Use: {', '.join(IMPORT_FORMATS)}"},
+                )
+
+            rows = []
+            for number, payload in participant_import.rows(stream, fmt):
+                if len(rows) >= IMPORT_MAX_ROWS:
+                    return error_response(
+                        ERROR_VALIDATION,
+                        code=400,
+                        data={"file": f"Máximo {IMPORT_MAX_ROWS} filas por archivo"},
+                    )
+                rows.append((number, payload["participant"], payload["responsible"]))
+            if not rows:
+                return error_response(
+                    ERROR_VALIDATION, code=400, data={"file": "El archivo no contiene filas"}
+                )
+
+            conflicts = identity_conflicts.find(
+                dnis=[p.get("dni") for _, p, _ in rows] + [(r or {}).get("dni") for _, _, r in rows],
+                emails=[p.get("email") for _, p, _ in rows],
+            )
+            file_dnis, file_emails = {}, {}
+            for number, participant, _ in rows:
+                if participant.get("dni"):
+                    file_dnis.setdefault(participant["dni"], number)
+                if participant.get("email"):
+                    file_emails.setdefault(participant["email"], number)
+
+            valid, errors = [], []
+            for number, participant, responsible in rows:
+                age = participant.get("age")
+                is_minor = isinstance(age, int) and age < 18
+                row_errors = {}
+                result = self._validate_participant(participant, responsible, is_minor, conflicts)
+                if result:
+                    row_errors.update(result.get("data") or {"row": result.get("msg")})
+
+                dni, email = participant.get("dni"), participant.get("email")
+                if dni and file_dnis[dni] != number:
+                    row_errors.setdefault("dni", f"DNI repetido en la fila {file_dnis[dni]}")
+                if email and file_emails[email] != number:
+                    row_errors.setdefault("email", f"Correo repetido en la fila {file_emails[email]}")
+                responsible_dni = (responsible or {}).get("dni") if is_minor else None
+                if responsible_dni and responsible_dni in file_dnis:
+                    row_errors.setdefault(
+                        "responsibleDni",
+                        f"El DNI es de un participante del archivo (fila {file_dnis[responsible_dni]})",
+                    )
+
+                if row_errors:
+                    errors.append({"row": number, "dni": dni, "errors": row_errors})
+                else:
+                    valid.append((participant, responsible, is_minor))
+
+            if valid and not dry_run:
+                counter_changes = []
+                for start in range(0, len(valid), IMPORT_BATCH_SIZE):
+                    batch = valid[start : start + IMPORT_BATCH_SIZE]
+                    participants = [
+                        self._build_participant(
+                            participant,
+                            is_minor,
+                            participant.get("program"),
+                            user_id=conflicts.owner("dni", participant.get("dni"), USER),
+                        )
+                        for participant, _, is_minor in batch
+                    ]
+                    db.session.add_all(participants)
+                    db.session.flush()
+                    for (_, responsible, is_minor), participant in zip(batch, participants):
+                        if is_minor and responsible:
+                            self._create_responsible(responsible, participant.id)
+                    db.session.flush()
+                    counter_changes += [
+                        (None, participant_counters.key(participant))
+                        for participant in participants
+                    ]
+                version = cache_versions.bump(PARTICIPANTS)
+                db.session.commit()
+                participant_counters.apply(counter_changes, version)
+                cache_versions.sync(force=True)
+
+            return success_response(
+                msg="Validación de importación completada" if dry_run else "Importación completada",
+                data={
+                    "total": len(rows),
+                    "valid": len(valid),
+                    "created": 0 if dry_run else len(valid),
+                    "dry_run": dry_run,
+                    "errors": errors,
+                },
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response("Error interno del servidor", code=500, data={"error": str(e)})
+
     def search_in_java(self, dni):
         token = self._get_token()
 
@@ -315,8 +616,10 @@ class UserController:
 
             is_minor = age < 18
 
+            # DNI y correos ya registrados (participante, responsable, usuario) en una consulta
+            conflicts = self._participant_conflicts(participant_data, responsible_data)
             validation_result = self._validate_participant(
-                participant_data, responsible_data, is_minor
+                participant_data, responsible_data, is_minor, conflicts
             )
             if validation_result:
                 return validation_result
@@ -332,59 +635,65 @@ class UserController:
 
             # Si el DNI pertenece a un User (docente/pasante), vincular participante a ese usuario
             dni_str = str(participant_data.get("dni", "")).strip()
-            existing_user = User.query.filter_by(dni=dni_str).first()
-            user_id = existing_user.id if existing_user else None
+            user_id = conflicts.owner("dni", dni_str, USER)
 
+            # Participante y responsable en una sola transacción: el flush asigna el id
+            # del participante y cualquier error revierte ambos
             participant = self._build_participant(
                 participant_data, is_minor, program, user_id=user_id
             )
             db.session.add(participant)
-            db.session.commit()
-
-            p_fresh = Participant.query.filter_by(
-                external_id=participant.external_id
-            ).first()
-
-            try:
-                # 5. Responsable (solo iniciación/menores)
-                responsible = None
-                if is_minor and p_fresh:
-                    responsible = self._create_responsible(responsible_data, p_fresh.id)
+            db.session.flush()
 
-                if responsible:
-                    db.session.commit()
+            # 5. Responsable (solo iniciación/menores)
+            responsible = None
+            if is_minor:
+                responsible = self._create_responsible(responsible_data, participant.id)
 
-                # try:
-                #     self._sync_with_java(participant, participant_data, token, is_minor)
-                # except Exception as e:
-                #     print(f"[Warning] Error sincronizando con Java: {e}")
+            version = cache_versions.bump(PARTICIPANTS)
+            db.session.commit()
+            participant_counters.apply([(None, participant_counters.key(participant))], version)
+            cache_versions.sync(force=True)
 
-                return success_response(
-                    msg="Participante registrado correctamente",
-                    data={
-                        "participant_external_id": participant.external_id,
-                        "responsible_external_id": (
-                            responsible.external_id if responsible else None
-                        ),
-                    },
-                )
+            # try:
+            #     self._sync_with_java(participant, participant_data, token, is_minor)
+            # except Exception as e:
+            #     print(f"[Warning] Error sincronizando con Java: {e}")
 
-            except Exception as e:
-                db.session.delete(p_fresh)
-                db.session.commit()
-                return error_response(f"Error creando responsable: {str(e)}", 500)
+            return success_response(
+                msg="Participante registrado correctamente",
+                data={
+                    "participant_external_id": participant.external_id,
+                    "responsible_external_id": (
+                        responsible.external_id if responsible else None
+                    ),
+                },
+            )
 
         except Exception as e:
             db.session.rollback()
             return error_response("Error interno del servidor", code=500)
 
-    def _validate_participant(self, participant, responsible, is_minor):
+    def _participant_conflicts(self, participant, responsible):
+        # DNI del participante y del responsable y correo del participante, en una consulta
+        participant = participant or {}
+        return identity_conflicts.find(
+            dnis=[participant.get("dni"), (responsible or {}).get("dni")],
+            emails=[participant.get("email")],
+        )
+
+    def _validate_participant(self, participant, responsible, is_minor, conflicts=None):
         """
         Valida los datos del participante y del responsable.
+        conflicts son los DNI/correos ya registrados (IdentityConflicts); en lotes se
+        calculan una sola vez para todos los registros. Si no se indica, se consultan aquí.
         Retorna un error_response si hay errores, o None si todo es válido.
         """
         import re
 
+        if conflicts is None:
+            conflicts = self._participant_conflicts(participant, responsible)
+
         errors = {}
         friendly_names = {
             "firstName": "Nombre",
@@ -431,10 +740,7 @@ class UserController:
                 errors["dni"] = "DNI no puede ser un número secuencial"
             else:
                 # Permitir mismo DNI que un User (docente/pasante): esa persona puede ser también participante
-                if (
-                    Participant.query.filter_by(dni=dni_str).first()
-                    or Responsible.query.filter_by(dni=dni_str).first()
-                ):
+                if conflicts.exists("dni", dni_str, (PARTICIPANT, RESPONSIBLE)):
                     errors["dni"] = "El DNI ya está registrado"
                 # Si existe solo en User, no rechazar; en create_participant se vinculará con user_id
 
@@ -464,7 +770,7 @@ class UserController:
                 errors["email"] = "Formato de correo electrónico inválido"
             elif len(email_str) > 100:
                 errors["email"] = "Email no puede tener más de 100 caracteres"
-            elif Participant.query.filter_by(email=email).first():
+            elif conflicts.exists("email", email_str, (PARTICIPANT,)):
                 errors["email"] = "El correo ya está registrado"
 
         # ========== VALIDACIÓN DE EDAD (1-80 años) ==========
@@ -594,9 +900,8 @@ class UserController:
                         errors["responsibleDni"] = (
                             "DNI no puede ser un número secuencial"
                         )
-                    else:
-                        if Participant.query.filter_by(dni=dni_str).first():
-                            errors["responsibleDni"] = "El DNI ya está registrado"
+                    elif conflicts.exists("dni", dni_str, (PARTICIPANT,)):
+                        errors["responsibleDni"] = "El DNI ya está registrado"
 
                 # Validar teléfono del responsable
                 responsible_phone = responsible.get("phone")
@@ -900,22 +1205,18 @@ class UserController:
             print(f"[UserService] Error: {str(e)}")
             return error_response(f"Error actualizando perfil: {str(e)}")
 
-    def get_active_participants_count(self):
+    def get_active_participants_count(self, breakdown=False):
         """
         Devuelve el total de participantes activos mayores y menores de edad.
+        Con breakdown agrega el total general y los conteos por programa y por tipo.
+        Se sirve desde los contadores en memoria (participant_counters).
         """
         try:
-            total_adult = Participant.query.filter(
-                Participant.age >= 18, Participant.status == "ACTIVO"
-            ).count()
-
-            total_minor = Participant.query.filter(
-                Participant.age < 18, Participant.status == "ACTIVO"
-            ).count()
+            data = participant_counters.breakdown() if breakdown else participant_counters.totals()
 
             return success_response(
                 msg="Totales de participantes activos obtenidos correctamente",
-                data={"adult": total_adult, "minor": total_minor},
+                data=data,
             )
 
         except Exception as e:
@@ -979,6 +1280,7 @@ class UserController:
             participant = Participant.query.filter_by(external_id=external_id).first()
             if not participant:
                 return error_response("Participante no encontrado", 404)
+            counter_key = participant_counters.key(participant)
 
             errors = {}
 
@@ -1023,6 +1325,11 @@ class UserController:
                     elif self._is_sequential(phone_str):
                         errors["phone"] = "Teléfono no puede ser un número secuencial"
 
+            # DNI y correo ya registrados por otros participantes, en una sola consulta
+            conflicts = identity_conflicts.find(
+                dnis=[data.get("dni")], emails=[data.get("email")]
+            )
+
             # ========== VALIDAR EMAIL ==========
             if "email" in data:
                 email_str = str(data["email"]).strip()
@@ -1033,10 +1340,8 @@ class UserController:
                     errors["email"] = "Email no puede tener más de 100 caracteres"
                 else:
                     # Verificar unicidad (excluyendo el participante actual)
-                    existing = Participant.query.filter(
-                        Participant.email == email_str, Participant.id != participant.id
-                    ).first()
-                    if existing:
+                    owner = conflicts.owner("email", email_str, PARTICIPANT)
+                    if owner is not None and owner != participant.id:
                         errors["email"] = "El correo ya está registrado"
 
             # ========== VALIDAR ADDRESS ==========
@@ -1072,10 +1377,8 @@ class UserController:
                     errors["dni"] = "DNI no puede ser un número secuencial"
                 else:
                     # Verificar unicidad (excluyendo el participante actual)
-                    existing = Participant.query.filter(
-                        Participant.dni == dni_str, Participant.id != participant.id
-                    ).first()
-                    if existing:
+                    owner = conflicts.owner("dni", dni_str, PARTICIPANT)
+                    if owner is not None and owner != participant.id:
                         errors["dni"] = "El DNI ya está registrado"
 
             # ========== VALIDAR TYPE ==========
@@ -1216,7 +1519,12 @@ class UserController:
                 if "phone" in responsible_data:
                     responsible.phone = str(responsible_data["phone"]).strip()
 
+            version = cache_versions.bump(PARTICIPANTS)
             db.session.commit()
+            participant_counters.apply(
+                [(counter_key, participant_counters.key(participant))], version
+            )
+            cache_versions.sync(force=True)
 
             # Preparar datos del responsable para la respuesta
             responsible_response = None
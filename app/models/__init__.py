@@ -12,6 +12,13 @@ from .test import Test
 from .testExercise import TestExercise
 from .user import User
 from.activityLog import ActivityLog
+from .participantAttendanceStats import ParticipantAttendanceStats
+from .scheduleOccurrence import ScheduleOccurrence
+from .attendanceRollup import AttendanceRollup
+from .syncBatch import SyncBatch
+from .participantAttendanceStreak import ParticipantAttendanceStreak
+from .cacheVersion import CacheVersion
+from .deletedAttendance import DeletedAttendance
 
 __all__ = [
     "Attendance",
@@ -27,5 +34,12 @@ __all__ = [
     "Test",
     "TestExercise",
     "User",
-    "ActivityLog"
+    "ActivityLog",
+    "ParticipantAttendanceStats",
+    "ScheduleOccurrence",
+    "AttendanceRollup",
+    "SyncBatch",
+    "ParticipantAttendanceStreak",
+    "CacheVersion",
+    "DeletedAttendance",
 ]
@@ -3,17 +3,35 @@ import uuid
 
 class Attendance(db.Model):
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "participant_id",
+            "schedule_id",
+            "date",
+            name="uq_attendance_participant_schedule_date",
+        ),
+        db.Index("ix_attendance_schedule_date", "schedule_id", "date"),
+        db.Index("ix_attendance_participant_date", "participant_id", "date"),
+        # Filtro por día de la semana del historial
+        db.Index("ix_attendance_date_dow", db.text("(EXTRACT(dow FROM date))")),
+        # En una tabla particionada toda restricción única debe incluir la fecha
+        db.UniqueConstraint("external_id", "date", name="uq_attendance_external_id_date"),
+        # Particiones mensuales attendance_pYYYY_MM (ver attendance_partition_service)
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     external_id = db.Column(
-        db.String(36), default=lambda: str(uuid.uuid4()), unique=True, nullable=False
+        db.String(36), default=lambda: str(uuid.uuid4()), nullable=False
     )
-    date = db.Column(db.String(50), nullable=False)
+    date = db.Column(db.Date, primary_key=True)
     status = db.Column(db.String(20), nullable=False)
     participant_id = db.Column(
         db.Integer, db.ForeignKey("participant.id"), nullable=False
     )
     schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=False)
+    # Momento (UTC) en que se tomó la asistencia; resuelve conflictos de sincronización
+    client_updated_at = db.Column(db.DateTime, nullable=True)
 
     participant = db.relationship("Participant", backref=db.backref("attendances", lazy=True))
     schedule = db.relationship("Schedule", backref=db.backref("attendances", lazy=True))
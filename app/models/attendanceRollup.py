@@ -0,0 +1,30 @@
+from datetime import datetime
+from app import db
+
+
+class AttendanceRollup(db.Model):
+    """Totales de asistencia por horario y periodo (semana o mes), para reportes."""
+
+    __tablename__ = "attendance_rollup"
+
+    class Period:
+        WEEK = "week"
+        MONTH = "month"
+
+    schedule_id = db.Column(
+        db.Integer, db.ForeignKey("schedule.id", ondelete="CASCADE"), primary_key=True
+    )
+    period_type = db.Column(db.String(10), primary_key=True)
+    # Lunes de la semana o día 1 del mes
+    period_start = db.Column(db.Date, primary_key=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_attendance_rollup_period", "period_type", "period_start"),
+    )
+
+    def __repr__(self):
+        return f"<AttendanceRollup {self.schedule_id} {self.period_type} {self.period_start}>"
@@ -0,0 +1,15 @@
+from datetime import datetime
+from app import db
+
+
+class CacheVersion(db.Model):
+    """Versión compartida de un catálogo cacheado; cada escritura del catálogo la incrementa."""
+
+    __tablename__ = "cache_version"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CacheVersion {self.name}={self.version}>"
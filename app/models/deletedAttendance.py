@@ -0,0 +1,30 @@
+from datetime import datetime
+from app import db
+
+
+class DeletedAttendance(db.Model):
+    """
+    Registros de asistencia eliminados de forma lógica (papelera por sesión).
+    Conserva las columnas de attendance para poder restaurarlos tal cual.
+    """
+
+    __tablename__ = "deleted_attendance"
+    __table_args__ = (
+        db.Index("ix_deleted_attendance_schedule_date", "schedule_id", "date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    external_id = db.Column(db.String(36), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    participant_id = db.Column(
+        db.Integer, db.ForeignKey("participant.id", ondelete="CASCADE"), nullable=False
+    )
+    schedule_id = db.Column(
+        db.Integer, db.ForeignKey("schedule.id", ondelete="CASCADE"), nullable=False
+    )
+    client_updated_at = db.Column(db.DateTime, nullable=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<DeletedAttendance {self.external_id} {self.date}>"
@@ -3,6 +3,10 @@ import uuid
 
 class Participant(db.Model):
     __tablename__ = "participant"
+    __table_args__ = (
+        # Listado filtrado por estado y programa, paginado por id
+        db.Index("ix_participant_status_program_id", "status", "program", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     external_id = db.Column(
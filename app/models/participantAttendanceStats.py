@@ -0,0 +1,18 @@
+from datetime import datetime
+from app import db
+
+
+class ParticipantAttendanceStats(db.Model):
+    """Contadores de asistencia por participante (modelo de lectura desnormalizado)."""
+
+    __tablename__ = "participant_attendance_stats"
+
+    participant_id = db.Column(
+        db.Integer, db.ForeignKey("participant.id", ondelete="CASCADE"), primary_key=True
+    )
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ParticipantAttendanceStats {self.participant_id}: {self.present_count}/{self.total_count}>"
@@ -0,0 +1,24 @@
+from datetime import datetime
+from app import db
+
+
+class ParticipantAttendanceStreak(db.Model):
+    """Racha actual de cada participante: sesiones consecutivas con el mismo estado."""
+
+    __tablename__ = "participant_attendance_streak"
+    __table_args__ = (
+        # Participantes en riesgo: status = 'absent' AND streak_length >= N
+        db.Index("ix_attendance_streak_status_length", "current_status", "streak_length"),
+    )
+
+    participant_id = db.Column(
+        db.Integer, db.ForeignKey("participant.id", ondelete="CASCADE"), primary_key=True
+    )
+    current_status = db.Column(db.String(20), nullable=False)
+    streak_length = db.Column(db.Integer, nullable=False, default=0)
+    # Fecha de la sesión más reciente registrada
+    last_date = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ParticipantAttendanceStreak {self.participant_id}: {self.current_status} x{self.streak_length}>"
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+
+class ScheduleOccurrence(db.Model):
+    """Contador de inscritos por sesión concreta (horario + fecha), usado como candado de cupos."""
+
+    __tablename__ = "schedule_occurrence"
+
+    schedule_id = db.Column(
+        db.Integer, db.ForeignKey("schedule.id", ondelete="CASCADE"), primary_key=True
+    )
+    date = db.Column(db.Date, primary_key=True)
+    registered_count = db.Column(db.Integer, nullable=False, default=0)
+    # Se incrementa con cada cambio de asistencia de la sesión
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScheduleOccurrence {self.schedule_id} {self.date}: {self.registered_count}>"
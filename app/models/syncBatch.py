@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+
+class SyncBatch(db.Model):
+    """Lote de sincronización ya aplicado, identificado por la clave generada en el cliente."""
+
+    __tablename__ = "sync_batch"
+
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    schedule_id = db.Column(
+        db.Integer, db.ForeignKey("schedule.id", ondelete="CASCADE"), nullable=False
+    )
+    date = db.Column(db.Date, nullable=False)
+    # Resultado devuelto la primera vez; se repite tal cual en los reintentos
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<SyncBatch {self.idempotency_key}>"
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify
+from datetime import date
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.controllers.attendance_controller import AttendanceController
 from app.utils.jwt_required import jwt_required
 
@@ -18,16 +19,29 @@ def response_handler(result):
 def get_participants():
     # Lista participantes con porcentajes calculados
     program = request.args.get("program")
-    result = controller.get_participants(program)
+    date_from = request.args.get("date_from")
+    date_to = request.args.get("date_to")
+    result = controller.get_participants(program, date_from, date_to)
     return response_handler(result)
 
 
 @attendance_bp.route("/attendance/v2/public/schedules", methods=["GET"])
 @jwt_required
 def get_schedules():
-    # Lista horarios/sesiones activas
-    result = controller.get_schedules()
-    return response_handler(result)
+    # Lista horarios/sesiones activas (ETag / Last-Modified según la versión de horarios)
+    result, etag, last_modified = controller.get_schedules(
+        request.if_none_match, request.if_modified_since
+    )
+    if result is None:
+        response = Response(status=304)
+    else:
+        response, status_code = response_handler(result)
+        response.status_code = status_code
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
 
 
 @attendance_bp.route("/attendance/v2/public/schedules", methods=["POST"])
@@ -39,6 +53,66 @@ def create_schedule():
     return response_handler(result)
 
 
+@attendance_bp.route("/attendance/v2/public/schedules/occurrences", methods=["GET"])
+@jwt_required
+def get_schedule_occurrences():
+    # Calendario de sesiones concretas: ?from=YYYY-MM-DD&to=YYYY-MM-DD&program=
+    result = controller.get_schedule_occurrences(
+        request.args.get("from"), request.args.get("to"), request.args.get("program")
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/schedules/validate", methods=["POST"])
+@jwt_required
+def validate_schedules():
+    # Valida un horario completo (lista de sesiones) sin guardarlo: errores y solapamientos
+    data = request.json
+    result = controller.validate_schedules(data)
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/reports/attendance", methods=["GET"])
+@jwt_required
+def get_attendance_report():
+    # Totales por semana o mes: ?period=week|month&from=&to=&group_by=schedule|program&program=&schedule_id=
+    result = controller.get_attendance_report(
+        request.args.get("period"),
+        request.args.get("from"),
+        request.args.get("to"),
+        request.args.get("group_by"),
+        request.args.get("program"),
+        request.args.get("schedule_id"),
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/at-risk", methods=["GET"])
+@jwt_required
+def get_at_risk_participants():
+    # Participantes con ausencias consecutivas: ?min_absences=N (por defecto 3)&program=
+    result = controller.get_at_risk_participants(
+        request.args.get("min_absences"), request.args.get("program")
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/sessions/today", methods=["GET"])
+@jwt_required
+def get_today_sessions():
+    # Sesiones programadas para hoy con su estado de registro
+    result = controller.get_today_sessions()
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/schedules/<schedule_id>/matrix", methods=["GET"])
+@jwt_required
+def get_attendance_matrix(schedule_id):
+    # Matriz participante × fecha de un horario: ?month=YYYY-MM (por defecto el mes actual)
+    result = controller.get_attendance_matrix(schedule_id, request.args.get("month"))
+    return response_handler(result)
+
+
 @attendance_bp.route("/attendance/v2/public/schedules/<schedule_id>", methods=["PUT"])
 @jwt_required
 def update_schedule(schedule_id):
@@ -55,36 +129,108 @@ def delete_schedule(schedule_id):
     result = controller.delete_schedule(schedule_id)
     return response_handler(result)
 
+def history_filters():
+    # Filtros comunes del historial: rango de fechas, sesión, día y búsqueda por participante
+    return {
+        "date_from": request.args.get("date_from") or request.args.get("startDate"),
+        "date_to": request.args.get("date_to") or request.args.get("endDate"),
+        "schedule_id": request.args.get("schedule_id") or request.args.get("scheduleId"),
+        "day_filter": request.args.get("day_of_week"),
+        "search_dni": request.args.get("dni"),
+        "search_name": request.args.get("name") or request.args.get("search"),
+        "participant_id": request.args.get("participant_id") or request.args.get("participantId"),
+    }
+
+
 @attendance_bp.route("/attendance/v2/public/history", methods=["GET"])
 @jwt_required
 def get_history():
-    # Historial con filtros de rango de fechas, sesión y búsqueda por participante
-    date_from = request.args.get("date_from") or request.args.get("startDate")
-    date_to = request.args.get("date_to") or request.args.get("endDate")
-    schedule_id = request.args.get("schedule_id") or request.args.get("scheduleId")
-    day_filter = request.args.get("day_of_week")
-    # Nuevos filtros de búsqueda por participante
-    search_dni = request.args.get("dni")
-    search_name = request.args.get("name") or request.args.get("search")
-    participant_id = request.args.get("participant_id") or request.args.get("participantId")
-    
-    result = controller.get_history(date_from, date_to, schedule_id, day_filter, search_dni, search_name, participant_id)
+    # Historial con filtros; con cursor/limit responde paginado por (fecha, id)
+    result = controller.get_history(
+        **history_filters(),
+        cursor=request.args.get("cursor"),
+        limit=request.args.get("limit"),
+    )
     return response_handler(result)
 
 
+@attendance_bp.route("/attendance/v2/public/history/stream", methods=["GET"])
+@jwt_required
+def stream_history():
+    # Historial completo como NDJSON (una asistencia por línea) con memoria constante
+    filters = history_filters()
+    error = controller.validate_history_dates(filters["date_from"], filters["date_to"])
+    if error:
+        return response_handler(error)
+
+    rows = controller.stream_history(**filters)
+    return Response(stream_with_context(rows), mimetype="application/x-ndjson")
+
+
+@attendance_bp.route("/attendance/v2/public/history/export", methods=["GET"])
+@jwt_required
+def export_history():
+    # Exportación del historial con los mismos filtros: ?format=csv|xlsx
+    filters = history_filters()
+    export_format = (request.args.get("format") or "csv").lower()
+    error = controller.validate_history_export(
+        filters["date_from"], filters["date_to"], export_format
+    )
+    if error:
+        return response_handler(error)
+
+    filename = f"asistencias_{date.today().isoformat()}.{export_format}"
+    if export_format == "xlsx":
+        rows = controller.export_history_xlsx(**filters)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        rows = controller.export_history_csv(**filters)
+        mimetype = "text/csv; charset=utf-8"
+    return Response(
+        stream_with_context(rows),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @attendance_bp.route("/attendance/v2/public/history/session/<schedule_id>/<date>", methods=["GET"])
 @jwt_required
 def get_session_detail(schedule_id, date):
-    # Detalle completo de participantes en una sesión específica
-    result = controller.get_session_detail(schedule_id, date)
+    # Detalle completo de participantes en una sesión específica (ETag / If-None-Match)
+    result, etag = controller.get_session_detail(schedule_id, date, request.if_none_match)
+    if result is None:
+        response = Response(status=304)
+    else:
+        response, status_code = response_handler(result)
+        response.status_code = status_code
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+@attendance_bp.route("/attendance/v2/public/sessions/<schedule_id>/<date>/roster", methods=["GET"])
+@jwt_required
+def get_session_roster(schedule_id, date):
+    # Participantes esperados de la sesión con su estado, para precargar el registro masivo
+    result = controller.get_session_roster(schedule_id, date)
     return response_handler(result)
 
 
 @attendance_bp.route("/attendance/v2/public/history/session/<schedule_id>/<date>", methods=["DELETE"])
 @jwt_required
 def delete_session_attendance(schedule_id, date):
-    # Eliminar todos los registros de una fecha
-    result = controller.delete_session_attendance(schedule_id, date)
+    # Eliminar todos los registros de una fecha: ?mode=hard|soft (soft permite restaurar)
+    result = controller.delete_session_attendance(schedule_id, date, request.args.get("mode"))
+    return response_handler(result)
+
+
+@attendance_bp.route(
+    "/attendance/v2/public/history/session/<schedule_id>/<date>/restore", methods=["POST"]
+)
+@jwt_required
+def restore_session_attendance(schedule_id, date):
+    # Restaura los registros de una sesión eliminados con mode=soft
+    result = controller.restore_session_attendance(schedule_id, date)
     return response_handler(result)
 
 
@@ -92,9 +238,18 @@ def delete_session_attendance(schedule_id, date):
 @jwt_required
 def delete_session_attendance_legacy(schedule_id, date):
     # Eliminación de sesión sin prefijo v2
-    result = controller.delete_session_attendance(schedule_id, date)
+    result = controller.delete_session_attendance(schedule_id, date, request.args.get("mode"))
+    return response_handler(result)
+
+@attendance_bp.route("/attendance/v2/public/sync", methods=["POST"])
+@jwt_required
+def sync_attendance():
+    # Sincronización idempotente de asistencias tomadas sin conexión (varias sesiones)
+    data = request.json
+    result = controller.sync_attendance(data)
     return response_handler(result)
 
+
 @attendance_bp.route("/attendance/v2/public/register", methods=["POST"])
 @jwt_required
 def register_public_attendance():
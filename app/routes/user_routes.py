@@ -15,7 +15,17 @@ def response_handler(result):
 @user_bp.route("/users", methods=["GET"])
 @jwt_required
 def listar_users():
-    result = controller.get_users()
+    # Filtros: ?status=&type=&program=&age_min=&age_max=&fields=a,b; con cursor/limit pagina por id
+    result = controller.get_users(
+        status=request.args.get("status"),
+        type=request.args.get("type"),
+        program=request.args.get("program"),
+        age_min=request.args.get("age_min"),
+        age_max=request.args.get("age_max"),
+        fields=request.args.get("fields"),
+        cursor=request.args.get("cursor"),
+        limit=request.args.get("limit"),
+    )
     return response_handler(result)
 
 
@@ -47,6 +57,20 @@ def create_participant():
     return response_handler(controller.create_participant(data))
 
 
+@user_bp.route("/participants/import", methods=["POST"])
+@jwt_required
+def import_participants():
+    # Importación masiva: archivo "file" (CSV o XLSX); ?dry_run=true solo valida
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"status": "error", "msg": "Falta el archivo", "code": 400}), 400
+    dry_run = str(request.args.get("dry_run", "")).lower() in ("1", "true")
+    result = controller.import_participants(
+        upload.stream, upload.filename, request.args.get("format"), dry_run
+    )
+    return response_handler(result)
+
+
 @user_bp.route("/save-user", methods=["POST"])
 @jwt_required
 def create_user():
@@ -121,6 +145,15 @@ def update_user_profile():
         return jsonify({"status": "error", "msg": f"Error: {str(e)}", "code": 500}), 500
 
 
+@user_bp.route("/participants/search", methods=["GET"])
+@jwt_required
+def search_participants():
+    """Busca participantes por nombre o DNI: ?q=<término>&limit=<n>"""
+    return response_handler(
+        controller.search_participants(request.args.get("q"), request.args.get("limit"))
+    )
+
+
 @user_bp.route("/participants/<string:external_id>", methods=["GET"])
 def get_participant(external_id):
     """Obtiene un participante por su external_id con su responsable (si tiene)"""
@@ -130,7 +163,9 @@ def get_participant(external_id):
 @user_bp.route("/participants/active/count", methods=["GET"])
 @jwt_required
 def get_active_participants_count():
-    return response_handler(controller.get_active_participants_count())
+    """Activos mayores y menores; ?breakdown=true agrega conteos por programa y tipo"""
+    breakdown = str(request.args.get("breakdown", "")).lower() in ("1", "true")
+    return response_handler(controller.get_active_participants_count(breakdown))
 
 
 @user_bp.route("/participants/<string:external_id>", methods=["PUT"])
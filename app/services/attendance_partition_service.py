@@ -0,0 +1,169 @@
+"""
+Servicio de particiones mensuales de la tabla attendance.
+attendance está particionada por rango de fecha (una partición attendance_pYYYY_MM por mes),
+de modo que las consultas con filtro de fecha solo leen los meses implicados. Las particiones
+se crean al iniciar la aplicación para los próximos meses y bajo demanda antes de registrar
+asistencias de otro mes; los meses de periodos cerrados se archivan separándolos de la tabla.
+"""
+import threading
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app import db
+
+PARTITION_PREFIX = "attendance_p"
+ARCHIVE_SCHEMA = "attendance_archive"
+PARTITION_MONTHS_AHEAD = 2
+PARTITION_LOCK_TIMEOUT = "5s"
+ARCHIVED_MONTH_ERROR = "El mes de la fecha está archivado; sus asistencias no se pueden modificar"
+
+
+class AttendancePartitionService:
+    """Crea, lista y archiva las particiones mensuales de attendance."""
+
+    def __init__(self):
+        self._ensured = set()
+        self._lock = threading.Lock()
+
+    def month_start(self, day):
+        return day.replace(day=1)
+
+    def next_month(self, month):
+        return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    def partition_name(self, month):
+        return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+    def is_partitioned(self, connection=None):
+        """True si attendance ya es una tabla particionada (tras schema upgrade)."""
+        relkind = (connection or db.session).execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass('attendance')")
+        ).scalar()
+        return relkind == "p"
+
+    def ensure_month(self, day):
+        """
+        Garantiza que exista la partición del mes de day.
+        Usa su propia conexión y confirma de inmediato: debe llamarse antes de leer o
+        escribir attendance en la transacción actual, porque crear una partición bloquea
+        la tabla padre. Lanza ValueError si el mes ya está archivado: crear otra partición
+        duplicaría las filas de la copia archivada.
+        """
+        # Se consulta siempre: otro proceso pudo archivar el mes después de recordarlo aquí
+        if self.is_archived(day):
+            raise ValueError(ARCHIVED_MONTH_ERROR)
+        month = self.month_start(day)
+        if month in self._ensured:
+            return
+
+        with self._lock:
+            if month in self._ensured:
+                return
+            with db.engine.begin() as connection:
+                # No hacer cola indefinida detrás de lecturas largas (exportaciones)
+                connection.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+                # Sin particionar no se recuerda el mes: si schema upgrade convierte la tabla
+                # con la app en marcha, la partición se crea en la siguiente llamada
+                if not self.is_partitioned(connection):
+                    return
+                self._create_partition(connection, month)
+            self._ensured.add(month)
+
+    def ensure_range(self, date_from, date_to):
+        """Garantiza las particiones de todos los meses entre date_from y date_to."""
+        month = self.month_start(date_from)
+        while month <= date_to:
+            self.ensure_month(month)
+            month = self.next_month(month)
+
+    def ensure_upcoming(self, months_ahead=PARTITION_MONTHS_AHEAD):
+        """Particiones del mes actual y de los months_ahead siguientes (al iniciar la app)."""
+        month = self.month_start(date.today())
+        for _ in range(months_ahead):
+            month = self.next_month(month)
+        self.ensure_range(self.month_start(date.today()), month)
+
+    def partitions(self):
+        """Particiones adjuntas a attendance: [{"name", "rows"}] ordenadas por mes."""
+        rows = db.session.execute(
+            text(
+                """
+                SELECT c.relname AS name, c.reltuples::bigint AS rows
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass('attendance')
+                ORDER BY c.relname
+                """
+            )
+        ).all()
+        return [{"name": row.name, "rows": max(row.rows, 0)} for row in rows]
+
+    def archived_until(self):
+        """Día siguiente al último mes archivado (inicio de los datos vigentes), o None."""
+        name = db.session.execute(
+            text(
+                """
+                SELECT max(c.relname)
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema AND c.relkind = 'r' AND c.relname LIKE :prefix
+                """
+            ),
+            {"schema": ARCHIVE_SCHEMA, "prefix": f"{PARTITION_PREFIX}%"},
+        ).scalar()
+        if not name:
+            return None
+        year, month = name[len(PARTITION_PREFIX):].split("_")
+        return self.next_month(date(int(year), int(month), 1))
+
+    def is_archived(self, day):
+        """True si el mes de day ya se movió a attendance_archive."""
+        archived_until = self.archived_until()
+        return archived_until is not None and day < archived_until
+
+    def archive(self, before):
+        """
+        Separa de attendance las particiones de los meses anteriores a before y las mueve al
+        esquema attendance_archive, donde siguen consultables pero fuera de las consultas
+        habituales. Retorna los nombres archivados; hace commit.
+        """
+        cutoff = self.partition_name(self.month_start(before))
+        archived = []
+        db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+        for partition in self.partitions():
+            name = partition["name"]
+            if not name.startswith(PARTITION_PREFIX) or name >= cutoff:
+                continue
+            db.session.execute(text(f'ALTER TABLE attendance DETACH PARTITION "{name}"'))
+            # Sin el DEFAULT nextval() la tabla archivada no depende de la secuencia de attendance
+            db.session.execute(text(f'ALTER TABLE "{name}" ALTER COLUMN id DROP DEFAULT'))
+            db.session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}'))
+            archived.append(name)
+        db.session.commit()
+
+        with self._lock:
+            self._ensured = {m for m in self._ensured if self.partition_name(m) >= cutoff}
+        return archived
+
+    def _create_partition(self, connection, month):
+        name = self.partition_name(month)
+        try:
+            with connection.begin_nested():
+                connection.execute(
+                    text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF attendance '
+                        f"FOR VALUES FROM ('{month.isoformat()}') "
+                        f"TO ('{self.next_month(month).isoformat()}')"
+                    )
+                )
+        except DBAPIError:
+            # Otro worker la creó a la vez; solo es un error si sigue sin existir
+            exists = connection.execute(
+                text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+            ).scalar()
+            if not exists:
+                raise
+
+
+# Instancia global del servicio
+attendance_partitions = AttendancePartitionService()
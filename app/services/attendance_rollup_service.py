@@ -0,0 +1,218 @@
+"""
+Servicio de totales de asistencia por periodo.
+Mantiene la tabla attendance_rollup (presentes, ausentes y total por horario y semana o mes)
+con los mismos cambios incrementales que los contadores por participante, de modo que los
+reportes de tendencia leen unas pocas filas por periodo en lugar de todo el historial.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import Date, case, cast, func, insert, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.attendance import Attendance
+from app.models.attendanceRollup import AttendanceRollup
+from app.models.schedule import Schedule
+from app.services.attendance_partition_service import attendance_partitions
+from app.services.attendance_stats_service import AttendanceStatsService
+from app import db
+
+PERIODS = (AttendanceRollup.Period.WEEK, AttendanceRollup.Period.MONTH)
+GROUP_BY = ("schedule", "program")
+
+
+class AttendanceRollupService:
+    """Totales semanales y mensuales de asistencia por horario y por programa."""
+
+    def period_start(self, period, day):
+        """Inicio del periodo que contiene day: lunes de la semana o día 1 del mes."""
+        if period == AttendanceRollup.Period.WEEK:
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    def apply_changes(self, changes):
+        """
+        Ajusta los totales con los cambios de asistencia de la transacción actual
+        mediante un único INSERT ... ON CONFLICT DO UPDATE; no hace commit.
+        """
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for change in changes:
+            for period in PERIODS:
+                delta = deltas[
+                    (change.schedule_id, period, self.period_start(period, change.date))
+                ]
+                for status, sign in ((change.old_status, -1), (change.new_status, 1)):
+                    if status is None:
+                        continue
+                    delta[0] += sign * (status == Attendance.Status.PRESENT)
+                    delta[1] += sign * (status == Attendance.Status.ABSENT)
+                    delta[2] += sign
+
+        rows = [
+            {
+                "schedule_id": schedule_id,
+                "period_type": period,
+                "period_start": start,
+                "present_count": present,
+                "absent_count": absent,
+                "total_count": total,
+                "updated_at": datetime.utcnow(),
+            }
+            for (schedule_id, period, start), (present, absent, total) in sorted(deltas.items())
+            if present or absent or total
+        ]
+        if not rows:
+            return
+
+        table = AttendanceRollup.__table__
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.schedule_id, table.c.period_type, table.c.period_start],
+            set_={
+                "present_count": table.c.present_count + stmt.excluded.present_count,
+                "absent_count": table.c.absent_count + stmt.excluded.absent_count,
+                "total_count": table.c.total_count + stmt.excluded.total_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.session.execute(stmt)
+
+    def rebuild(self):
+        """
+        Recalcula los totales desde la tabla attendance. Retorna filas generadas.
+        Si hay meses archivados, solo se recalculan los periodos que empiezan desde el
+        primer día vigente: los anteriores y el que cruza el corte (semana con días
+        archivados) conservan sus totales.
+        """
+        table = AttendanceRollup.__table__
+        archived_until = attendance_partitions.archived_until()
+
+        total = 0
+        for period in PERIODS:
+            recompute_from = self._recompute_from(period, archived_until)
+            delete = table.delete().where(table.c.period_type == period)
+            if recompute_from:
+                delete = delete.where(table.c.period_start >= recompute_from)
+            db.session.execute(delete)
+
+            start = cast(func.date_trunc(period, Attendance.date), Date)
+            select = db.select(
+                Attendance.schedule_id,
+                literal(period),
+                start,
+                self._count_status(Attendance.Status.PRESENT),
+                self._count_status(Attendance.Status.ABSENT),
+                func.count(Attendance.id),
+                literal(datetime.utcnow()),
+            ).group_by(Attendance.schedule_id, start)
+            if recompute_from:
+                select = select.where(Attendance.date >= recompute_from)
+            result = db.session.execute(
+                insert(table).from_select(
+                    [
+                        "schedule_id",
+                        "period_type",
+                        "period_start",
+                        "present_count",
+                        "absent_count",
+                        "total_count",
+                        "updated_at",
+                    ],
+                    select,
+                )
+            )
+            total += result.rowcount
+        db.session.commit()
+        return total
+
+    def report(
+        self,
+        period=AttendanceRollup.Period.WEEK,
+        date_from=None,
+        date_to=None,
+        group_by="schedule",
+        program=None,
+        schedule_external_id=None,
+    ):
+        """
+        Totales por periodo agrupados por horario o por programa, ordenados por periodo.
+        El rango incluye los periodos completos que contienen date_from y date_to.
+        """
+        present = func.sum(AttendanceRollup.present_count)
+        absent = func.sum(AttendanceRollup.absent_count)
+        total = func.sum(AttendanceRollup.total_count)
+        if group_by == "program":
+            keys = [Schedule.program]
+        else:
+            keys = [Schedule.external_id, Schedule.name, Schedule.program]
+
+        query = (
+            db.session.query(
+                AttendanceRollup.period_start,
+                *keys,
+                present.label("present"),
+                absent.label("absent"),
+                total.label("total"),
+            )
+            .join(Schedule, AttendanceRollup.schedule_id == Schedule.id)
+            .filter(AttendanceRollup.period_type == period)
+        )
+        if date_from:
+            query = query.filter(
+                AttendanceRollup.period_start >= self.period_start(period, date_from)
+            )
+        if date_to:
+            query = query.filter(AttendanceRollup.period_start <= date_to)
+        if program:
+            query = query.filter(Schedule.program == program)
+        if schedule_external_id:
+            query = query.filter(Schedule.external_id == schedule_external_id)
+
+        rows = (
+            query.group_by(AttendanceRollup.period_start, *keys)
+            .having(total > 0)
+            .order_by(AttendanceRollup.period_start, *keys)
+            .all()
+        )
+
+        result = []
+        for row in rows:
+            item = {"period_start": row.period_start.isoformat()}
+            if group_by == "program":
+                item["program"] = row.program
+            else:
+                item.update(
+                    {
+                        "schedule_external_id": row.external_id,
+                        "schedule_name": row.name,
+                        "program": row.program,
+                    }
+                )
+            item.update(
+                {
+                    "present": int(row.present or 0),
+                    "absent": int(row.absent or 0),
+                    "total": int(row.total or 0),
+                    "attendance_rate": AttendanceStatsService.percentage(
+                        int(row.present or 0), int(row.total or 0)
+                    ),
+                }
+            )
+            result.append(item)
+        return result
+
+    def _recompute_from(self, period, archived_until):
+        """Primer inicio de periodo sin días archivados (None: se recalcula todo)."""
+        if archived_until is None:
+            return None
+        start = self.period_start(period, archived_until)
+        if start == archived_until:
+            return start
+        if period == AttendanceRollup.Period.WEEK:
+            return start + timedelta(days=7)
+        return attendance_partitions.next_month(start)
+
+    def _count_status(self, status):
+        return func.sum(case((Attendance.status == status, 1), else_=0))
+
+
+# Instancia global del servicio
+attendance_rollups = AttendanceRollupService()
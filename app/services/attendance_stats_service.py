@@ -0,0 +1,221 @@
+"""
+Servicio de estadísticas de asistencia.
+Calcula presentes, totales y porcentajes de asistencia por participante con una
+sola consulta agrupada, en lugar de dos COUNT por participante, y mantiene la
+tabla desnormalizada participant_attendance_stats para lecturas O(1).
+"""
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import case, func, insert, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.attendance import Attendance
+from app.models.participant import Participant
+from app.models.participantAttendanceStats import ParticipantAttendanceStats
+from app.models.schedule import Schedule
+from app import db
+
+# Cambio sobre una fila de asistencia: old_status=None es una alta, new_status=None una baja.
+AttendanceChange = namedtuple(
+    "AttendanceChange",
+    ["participant_id", "schedule_id", "date", "old_status", "new_status"],
+)
+
+
+class AttendanceStatsService:
+    """Estadísticas de asistencia por participante basadas en consultas agregadas."""
+
+    def aggregate_subquery(self, program=None, date_from=None, date_to=None):
+        """
+        Subconsulta agrupada (participant_id, present, total).
+        program filtra por el programa de la sesión; date_from/date_to acotan el rango.
+        """
+        present = func.sum(
+            case((Attendance.status == Attendance.Status.PRESENT, 1), else_=0)
+        )
+        query = db.session.query(
+            Attendance.participant_id.label("participant_id"),
+            present.label("present"),
+            func.count(Attendance.id).label("total"),
+        )
+        if program:
+            query = query.join(Schedule, Attendance.schedule_id == Schedule.id).filter(
+                Schedule.program == program
+            )
+        if date_from:
+            query = query.filter(Attendance.date >= date_from)
+        if date_to:
+            query = query.filter(Attendance.date <= date_to)
+
+        return query.group_by(Attendance.participant_id).subquery()
+
+    def get_stats(self, participant_ids=None, program=None, date_from=None, date_to=None):
+        """
+        Retorna {participant_id: {"present", "total", "percentage"}} en una sola consulta.
+        Sin filtros de programa ni fechas se lee la tabla de contadores; con filtros se agrega.
+        Los participantes sin registros no aparecen en el resultado.
+        """
+        if participant_ids is not None and not participant_ids:
+            return {}
+
+        stats = self._stats_source(program, date_from, date_to)
+        query = db.session.query(stats.c.participant_id, stats.c.present, stats.c.total)
+        if participant_ids is not None:
+            query = query.filter(stats.c.participant_id.in_(list(participant_ids)))
+
+        return {
+            row.participant_id: self._build_stats(row.present, row.total)
+            for row in query.all()
+        }
+
+    def get_participant_stats(self, participant_id, program=None, date_from=None, date_to=None):
+        """Estadísticas de un único participante (ceros si no tiene registros)."""
+        stats = self.get_stats([participant_id], program, date_from, date_to)
+        return stats.get(participant_id, self._build_stats(0, 0))
+
+    def participants_with_stats(self, program=None, date_from=None, date_to=None):
+        """
+        Participantes (opcionalmente filtrados por programa) junto a sus estadísticas,
+        resueltos con un único LEFT JOIN contra los contadores o la subconsulta agrupada.
+        Retorna una lista de tuplas (Participant, stats).
+        """
+        stats = self._stats_source(date_from=date_from, date_to=date_to)
+        query = db.session.query(Participant, stats.c.present, stats.c.total).outerjoin(
+            stats, stats.c.participant_id == Participant.id
+        )
+        if program:
+            query = query.filter(Participant.program == program)
+
+        return [
+            (participant, self._build_stats(present, total))
+            for participant, present, total in query.order_by(Participant.id).all()
+        ]
+
+    def apply_changes(self, changes):
+        """
+        Ajusta los contadores con los cambios de asistencia de la transacción actual.
+        Emite un único INSERT ... ON CONFLICT DO UPDATE con incrementos atómicos; no hace commit.
+        Las filas van ordenadas por participante para que transacciones concurrentes las
+        bloqueen en el mismo orden (sin interbloqueos).
+        """
+        deltas = {}
+        for change in changes:
+            present, total = deltas.get(change.participant_id, (0, 0))
+            if change.old_status is not None:
+                total -= 1
+                present -= change.old_status == Attendance.Status.PRESENT
+            if change.new_status is not None:
+                total += 1
+                present += change.new_status == Attendance.Status.PRESENT
+            deltas[change.participant_id] = (present, total)
+
+        rows = [
+            {
+                "participant_id": participant_id,
+                "present_count": present,
+                "total_count": total,
+                "updated_at": datetime.utcnow(),
+            }
+            for participant_id, (present, total) in sorted(deltas.items())
+            if present or total
+        ]
+        if not rows:
+            return
+
+        table = ParticipantAttendanceStats.__table__
+        stmt = pg_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.participant_id],
+            set_={
+                "present_count": table.c.present_count + stmt.excluded.present_count,
+                "total_count": table.c.total_count + stmt.excluded.total_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.session.execute(stmt)
+
+    def rebuild(self):
+        """Recalcula todos los contadores desde la tabla attendance. Retorna filas generadas."""
+        table = ParticipantAttendanceStats.__table__
+        stats = self.aggregate_subquery()
+        db.session.execute(table.delete())
+        result = db.session.execute(
+            insert(table).from_select(
+                ["participant_id", "present_count", "total_count", "updated_at"],
+                db.select(
+                    stats.c.participant_id,
+                    stats.c.present,
+                    stats.c.total,
+                    literal(datetime.utcnow()),
+                ),
+            )
+        )
+        db.session.commit()
+        return result.rowcount
+
+    def check_consistency(self):
+        """
+        Compara los contadores con un recálculo completo y retorna las diferencias:
+        [{"participant_id", "stored_present", "stored_total", "actual_present", "actual_total"}].
+        """
+        table = ParticipantAttendanceStats.__table__
+        actual = self.aggregate_subquery()
+        stored_present = func.coalesce(table.c.present_count, 0)
+        stored_total = func.coalesce(table.c.total_count, 0)
+        actual_present = func.coalesce(actual.c.present, 0)
+        actual_total = func.coalesce(actual.c.total, 0)
+
+        rows = db.session.execute(
+            db.select(
+                func.coalesce(table.c.participant_id, actual.c.participant_id).label(
+                    "participant_id"
+                ),
+                stored_present.label("stored_present"),
+                stored_total.label("stored_total"),
+                actual_present.label("actual_present"),
+                actual_total.label("actual_total"),
+            )
+            .select_from(
+                table.join(
+                    actual,
+                    table.c.participant_id == actual.c.participant_id,
+                    full=True,
+                )
+            )
+            .where(
+                db.or_(stored_present != actual_present, stored_total != actual_total)
+            )
+        ).all()
+
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def percentage(present, total):
+        """Porcentaje de asistencia redondeado a dos decimales."""
+        if not total:
+            return 0
+        return round((present / total) * 100, 2)
+
+    def _stats_source(self, program=None, date_from=None, date_to=None):
+        # Sin filtros basta la tabla de contadores; con filtros se agrega sobre attendance
+        if program or date_from or date_to:
+            return self.aggregate_subquery(program, date_from, date_to)
+
+        table = ParticipantAttendanceStats.__table__
+        return db.select(
+            table.c.participant_id.label("participant_id"),
+            table.c.present_count.label("present"),
+            table.c.total_count.label("total"),
+        ).subquery()
+
+    def _build_stats(self, present, total):
+        present = int(present or 0)
+        total = int(total or 0)
+        return {
+            "present": present,
+            "total": total,
+            "percentage": self.percentage(present, total),
+        }
+
+
+# Instancia global del servicio
+attendance_stats = AttendanceStatsService()
@@ -0,0 +1,205 @@
+"""
+Servicio de rachas de asistencia.
+Mantiene en participant_attendance_streak la racha actual de cada participante (sesiones
+consecutivas presentes o ausentes). Cada registro nuevo posterior al último solo alarga o
+reinicia la racha; las correcciones de fechas pasadas y los borrados recalculan la racha de
+los participantes afectados. La consulta de participantes en riesgo lee el índice
+(current_status, streak_length) en lugar de recorrer el historial.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import case, func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.attendance import Attendance
+from app.models.participant import Participant
+from app.models.participantAttendanceStreak import ParticipantAttendanceStreak
+from app import db
+
+# Ausencias consecutivas a partir de las cuales un participante se considera en riesgo
+AT_RISK_MIN_ABSENCES = 3
+
+
+class AttendanceStreakService:
+    """Rachas de presencia/ausencia por participante y detección de participantes en riesgo."""
+
+    def apply_changes(self, changes):
+        """
+        Actualiza las rachas con los cambios de asistencia de la transacción actual; no hace commit.
+        Un registro nuevo con fecha igual o posterior a la última alarga o reinicia la racha;
+        el resto de cambios (correcciones, fechas anteriores, borrados) recalculan la racha.
+        """
+        by_participant = defaultdict(list)
+        for change in changes:
+            by_participant[change.participant_id].append(change)
+        if not by_participant:
+            return
+
+        table = ParticipantAttendanceStreak.__table__
+        last_dates = dict(
+            db.session.execute(
+                db.select(table.c.participant_id, table.c.last_date)
+                .where(table.c.participant_id.in_(list(by_participant)))
+                # Bloqueo en orden de participante, igual en todas las transacciones
+                .order_by(table.c.participant_id)
+                .with_for_update()
+            ).all()
+        )
+
+        appended = []
+        recompute = set()
+        for participant_id, participant_changes in by_participant.items():
+            change = participant_changes[0]
+            last_date = last_dates.get(participant_id)
+            if (
+                len(participant_changes) == 1
+                and change.old_status is None
+                and change.new_status is not None
+                and (last_date is None or change.date >= last_date)
+            ):
+                appended.append(change)
+            else:
+                recompute.add(participant_id)
+
+        recompute.update(self._append(appended))
+        if recompute:
+            self._recompute(recompute)
+
+    def rebuild(self):
+        """Recalcula las rachas de todos los participantes desde attendance. Retorna filas generadas."""
+        db.session.execute(ParticipantAttendanceStreak.__table__.delete())
+        total = self._recompute()
+        db.session.commit()
+        return total
+
+    def at_risk(self, min_absences=AT_RISK_MIN_ABSENCES, program=None):
+        """
+        Participantes activos con al menos min_absences ausencias consecutivas en su racha
+        actual, ordenados de mayor a menor racha.
+        """
+        query = (
+            db.session.query(
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.program,
+                ParticipantAttendanceStreak.streak_length,
+                ParticipantAttendanceStreak.last_date,
+            )
+            .join(Participant, ParticipantAttendanceStreak.participant_id == Participant.id)
+            .filter(
+                ParticipantAttendanceStreak.current_status == Attendance.Status.ABSENT,
+                ParticipantAttendanceStreak.streak_length >= min_absences,
+                Participant.status == "ACTIVO",
+            )
+        )
+        if program:
+            query = query.filter(Participant.program == program)
+
+        rows = query.order_by(
+            ParticipantAttendanceStreak.streak_length.desc(),
+            ParticipantAttendanceStreak.last_date.desc(),
+        ).all()
+        return [
+            {
+                "participant_external_id": row.external_id,
+                "firstName": row.firstName,
+                "lastName": row.lastName,
+                "dni": row.dni,
+                "program": row.program,
+                "consecutive_absences": row.streak_length,
+                "last_date": row.last_date.isoformat(),
+            }
+            for row in rows
+        ]
+
+    def _append(self, changes):
+        """
+        Alarga o reinicia la racha con registros nuevos en un único upsert.
+        Retorna los participantes cuya fila cambió de fecha entre la lectura y la escritura
+        (otra transacción registró una sesión posterior) para recalcularlos.
+        """
+        if not changes:
+            return set()
+
+        table = ParticipantAttendanceStreak.__table__
+        stmt = pg_insert(table).values(
+            [
+                {
+                    "participant_id": change.participant_id,
+                    "current_status": change.new_status,
+                    "streak_length": 1,
+                    "last_date": change.date,
+                    "updated_at": datetime.utcnow(),
+                }
+                for change in sorted(changes, key=lambda c: c.participant_id)
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.participant_id],
+            set_={
+                "streak_length": case(
+                    (
+                        table.c.current_status == stmt.excluded.current_status,
+                        table.c.streak_length + 1,
+                    ),
+                    else_=1,
+                ),
+                "current_status": stmt.excluded.current_status,
+                "last_date": stmt.excluded.last_date,
+                "updated_at": stmt.excluded.updated_at,
+            },
+            where=table.c.last_date <= stmt.excluded.last_date,
+        ).returning(table.c.participant_id)
+
+        written = set(db.session.execute(stmt).scalars())
+        return {change.participant_id for change in changes} - written
+
+    def _recompute(self, participant_ids=None):
+        """
+        Calcula la racha actual desde attendance (de todos o de participant_ids) y la guarda.
+        La racha son las sesiones más recientes, ordenadas por fecha, con el mismo estado
+        que la última. Retorna filas generadas.
+        """
+        window = {
+            "partition_by": Attendance.participant_id,
+            "order_by": (Attendance.date.desc(), Attendance.id.desc()),
+        }
+        ordered = db.select(
+            Attendance.participant_id,
+            Attendance.date,
+            Attendance.status,
+            func.first_value(Attendance.status).over(**window).label("latest"),
+            func.row_number().over(**window).label("position"),
+        )
+        if participant_ids is not None:
+            ordered = ordered.where(Attendance.participant_id.in_(list(participant_ids)))
+        ordered = ordered.subquery()
+
+        # Primera sesión con otro estado: la racha son las posiciones anteriores a ella
+        first_break = func.min(ordered.c.position).filter(ordered.c.status != ordered.c.latest)
+        streaks = db.select(
+            ordered.c.participant_id,
+            ordered.c.latest,
+            func.coalesce(first_break - 1, func.count()),
+            func.max(ordered.c.date),
+            literal(datetime.utcnow()),
+        ).group_by(ordered.c.participant_id, ordered.c.latest)
+
+        table = ParticipantAttendanceStreak.__table__
+        if participant_ids is not None:
+            # Participantes sin registros restantes no tienen racha
+            db.session.execute(
+                table.delete().where(table.c.participant_id.in_(list(participant_ids)))
+            )
+        result = db.session.execute(
+            pg_insert(table).from_select(
+                ["participant_id", "current_status", "streak_length", "last_date", "updated_at"],
+                streaks,
+            )
+        )
+        return result.rowcount
+
+
+# Instancia global del servicio
+attendance_streaks = AttendanceStreakService()
@@ -0,0 +1,95 @@
+"""
+Servicio de versiones de caché compartidas entre procesos.
+Cada catálogo cacheado en memoria (horarios, participantes) tiene una fila en cache_version
+cuya versión se incrementa en la misma transacción que lo modifica. Cada worker compara,
+como mucho una vez cada CACHE_VERSION_CHECK_INTERVAL segundos, las versiones guardadas con
+las que conoce y, si alguna cambió, descarta las cachés suscritas a ella.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from app.models.cacheVersion import CacheVersion
+from app import db
+
+# Catálogos versionados
+SCHEDULES = "schedules"
+PARTICIPANTS = "participants"
+
+# Segundos entre comprobaciones de versión de un mismo proceso
+CACHE_VERSION_CHECK_INTERVAL = 2
+
+
+class CacheVersionService:
+    """Versiones de catálogos y suscripciones de invalidación de las cachés del proceso."""
+
+    def __init__(self, check_interval=CACHE_VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._known = {}
+        self._listeners = defaultdict(list)
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, name, callback):
+        """Registra callback() para descartar una caché cuando cambie la versión de name."""
+        self._listeners[name].append(callback)
+
+    def bump(self, name):
+        """
+        Incrementa la versión de name en la transacción actual (llamar antes del commit
+        de la escritura del catálogo). Retorna la nueva versión; no hace commit.
+        """
+        table = CacheVersion.__table__
+        stmt = pg_insert(table).values(name=name, version=1, updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+        ).returning(table.c.version)
+        return db.session.execute(stmt).scalar()
+
+    def current(self, name):
+        """(versión, fecha de modificación) de name vista en la última comprobación; (0, None) si no existe."""
+        return self._known.get(name, (0, None))
+
+    def sync(self, force=False):
+        """
+        Lee las versiones guardadas (salvo que la última lectura sea reciente y no se fuerce)
+        y ejecuta las suscripciones de los catálogos cuya versión cambió.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if (
+                not force
+                and self._checked_at is not None
+                and now - self._checked_at < self.check_interval
+            ):
+                return
+            self._checked_at = now
+
+        try:
+            rows = db.session.execute(
+                db.select(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at)
+            ).all()
+        except SQLAlchemyError:
+            # Sin versiones las cachés se mantienen; se reintenta en la próxima comprobación
+            db.session.rollback()
+            with self._lock:
+                self._checked_at = None
+            return
+
+        changed = []
+        with self._lock:
+            for row in rows:
+                if self._known.get(row.name, (None, None))[0] != row.version:
+                    self._known[row.name] = (row.version, row.updated_at)
+                    changed.append(row.name)
+
+        for name in changed:
+            for callback in self._listeners[name]:
+                callback()
+
+
+# Instancia global del servicio
+cache_versions = CacheVersionService()
@@ -0,0 +1,109 @@
+"""
+Servicio de participantes esperados por sesión.
+Para cada sesión concreta (horario + fecha) calcula quiénes deben asistir según el programa
+del horario y el estado del participante, y guarda la lista en memoria por sesión. La lista
+se descarta cuando cambia la versión de horarios o de participantes (cache_version).
+"""
+from app.models.attendance import Attendance
+from app.models.participant import Participant
+from app.services.cache_version_service import PARTICIPANTS, SCHEDULES, cache_versions
+from app.utils.cache import TTLCache
+from app import db
+
+# Segundos que se reutiliza la lista de una sesión (respaldo de las versiones)
+ROSTER_TTL = 600
+
+
+class ExpectedRosterService:
+    """Participantes esperados por sesión y su estado de registro."""
+
+    def __init__(self):
+        self._cache = TTLCache(ttl=ROSTER_TTL, maxsize=256)
+
+    def expected(self, schedule, fecha):
+        """
+        Participantes activos del programa del horario (todos los activos si el horario no
+        tiene programa), ordenados por apellido. Calculado una vez por sesión.
+        """
+        return self._cache.get_or_set(
+            (schedule.id, fecha), lambda: self._load(schedule.program)
+        )
+
+    def roster(self, schedule, fecha):
+        """
+        Lista para el formulario de registro: los esperados y, además, quienes ya tienen
+        registro en la sesión sin ser esperados (cambio de programa, inactivos).
+        Cada elemento lleva expected y el status registrado (None si aún no hay registro).
+        """
+        registered = {
+            row.participant_id: row
+            for row in db.session.query(
+                Attendance.participant_id,
+                Attendance.status,
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+            )
+            .join(Participant, Attendance.participant_id == Participant.id)
+            .filter(Attendance.schedule_id == schedule.id, Attendance.date == fecha)
+            .all()
+        }
+
+        result = []
+        for participant in self.expected(schedule, fecha):
+            record = registered.pop(participant["id"], None)
+            result.append(
+                self._entry(participant, True, record.status if record else None)
+            )
+        for record in sorted(registered.values(), key=lambda r: (r.lastName, r.firstName)):
+            participant = {
+                "external_id": record.external_id,
+                "first_name": record.firstName,
+                "last_name": record.lastName,
+                "dni": record.dni,
+            }
+            result.append(self._entry(participant, False, record.status))
+        return result
+
+    def invalidate(self):
+        """Descarta las listas calculadas (cambios de horarios o de participantes)."""
+        self._cache.clear()
+
+    def _load(self, program):
+        query = db.session.query(
+            Participant.id,
+            Participant.external_id,
+            Participant.firstName,
+            Participant.lastName,
+            Participant.dni,
+        ).filter(Participant.status == "ACTIVO")
+        if program:
+            query = query.filter(Participant.program == program)
+        rows = query.order_by(Participant.lastName, Participant.firstName, Participant.id).all()
+        return [
+            {
+                "id": row.id,
+                "external_id": row.external_id,
+                "first_name": row.firstName,
+                "last_name": row.lastName,
+                "dni": row.dni,
+            }
+            for row in rows
+        ]
+
+    def _entry(self, participant, expected, status):
+        return {
+            "participant_external_id": participant["external_id"],
+            "first_name": participant["first_name"],
+            "last_name": participant["last_name"],
+            "dni": participant["dni"],
+            "expected": expected,
+            "status": status,
+        }
+
+
+# Instancia global del servicio
+expected_rosters = ExpectedRosterService()
+cache_versions.subscribe(SCHEDULES, expected_rosters.invalidate)
+cache_versions.subscribe(PARTICIPANTS, expected_rosters.invalidate)
@@ -0,0 +1,74 @@
+"""
+Servicio de unicidad de identidades (DNI y correo).
+Resuelve en una sola consulta UNION ALL qué DNI y correos ya existen en participant,
+responsible y users, para un registro o para un lote completo, en lugar de una consulta
+por tabla y por campo.
+"""
+from sqlalchemy import literal, union_all
+from app.models.participant import Participant
+from app.models.responsible import Responsible
+from app.models.user import User
+from app import db
+
+# Orígenes posibles de una coincidencia
+PARTICIPANT = "participant"
+RESPONSIBLE = "responsible"
+USER = "user"
+
+
+class IdentityConflicts:
+    """Coincidencias encontradas: (campo, valor) -> {origen: id del registro existente}."""
+
+    def __init__(self, rows=()):
+        self._found = {}
+        for field, source, value, owner_id in rows:
+            self._found.setdefault((field, value), {})[source] = owner_id
+
+    def exists(self, field, value, sources=(PARTICIPANT, RESPONSIBLE, USER)):
+        """True si value ya está registrado en alguno de los orígenes indicados."""
+        owners = self._found.get((field, value), {})
+        return any(source in owners for source in sources)
+
+    def owner(self, field, value, source):
+        """Id del registro de source que ya tiene ese valor, o None."""
+        return self._found.get((field, value), {}).get(source)
+
+
+class IdentityConflictService:
+    """Búsqueda de DNI y correos ya registrados en una única consulta."""
+
+    def find(self, dnis=(), emails=()):
+        """
+        DNI (participant, responsible, users) y correos (participant, users) existentes
+        entre los valores dados. Sin valores no consulta la base de datos.
+        """
+        dnis = sorted({str(d).strip() for d in dnis if d and str(d).strip()})
+        emails = sorted({str(e).strip() for e in emails if e and str(e).strip()})
+
+        parts = []
+        if dnis:
+            parts += [
+                self._select("dni", PARTICIPANT, Participant.dni, Participant.id, dnis),
+                self._select("dni", RESPONSIBLE, Responsible.dni, Responsible.id, dnis),
+                self._select("dni", USER, User.dni, User.id, dnis),
+            ]
+        if emails:
+            parts += [
+                self._select("email", PARTICIPANT, Participant.email, Participant.id, emails),
+                self._select("email", USER, User.email, User.id, emails),
+            ]
+        if not parts:
+            return IdentityConflicts()
+        return IdentityConflicts(db.session.execute(union_all(*parts)).all())
+
+    def _select(self, field, source, column, id_column, values):
+        return db.select(
+            literal(field).label("field"),
+            literal(source).label("source"),
+            column.label("value"),
+            id_column.label("owner_id"),
+        ).where(column.in_(values))
+
+
+# Instancia global del servicio
+identity_conflicts = IdentityConflictService()
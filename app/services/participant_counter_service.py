@@ -0,0 +1,118 @@
+"""
+Servicio de contadores de participantes activos.
+Guarda en memoria cuántos participantes activos hay por (mayor de edad, programa, tipo),
+cargados con una sola consulta agrupada, y de ahí responde los totales de mayores y menores
+y los desgloses por programa y por tipo sin consultar la tabla participant.
+
+El worker que modifica participantes aplica la diferencia a sus contadores; los demás los
+descartan al ver una versión nueva de participantes (cache_version) y los recargan.
+"""
+import threading
+from sqlalchemy import func
+from app.models.participant import Participant
+from app.services.cache_version_service import PARTICIPANTS, cache_versions
+from app import db
+
+ACTIVE_STATUS = "ACTIVO"
+ADULT_AGE = 18
+
+
+class ParticipantCounterService:
+    """Conteos de participantes activos servidos desde memoria."""
+
+    def __init__(self):
+        self._counts = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def key(self, participant):
+        """
+        Grupo del participante en los contadores: (mayor de edad, programa, tipo),
+        o None si no está activo. Tomarlo antes y después de modificarlo.
+        """
+        if participant is None or participant.status != ACTIVE_STATUS:
+            return None
+        return (int(participant.age) >= ADULT_AGE, participant.program, participant.type)
+
+    def totals(self):
+        """Activos mayores y menores de edad."""
+        return self._totals(self._snapshot())
+
+    def breakdown(self):
+        """Totales de mayores y menores, total general y desgloses por programa y por tipo."""
+        counts = self._snapshot()
+        by_program, by_type = {}, {}
+        for (_, program, type_), n in counts.items():
+            if program:
+                by_program[program] = by_program.get(program, 0) + n
+            if type_:
+                by_type[type_] = by_type.get(type_, 0) + n
+        return {
+            **self._totals(counts),
+            "total": sum(counts.values()),
+            "by_program": by_program,
+            "by_type": by_type,
+        }
+
+    def apply(self, changes, version):
+        """
+        Aplica [(grupo anterior, grupo nuevo), ...] tras el commit de una escritura que subió
+        la versión de participantes a version. Si entre medio hubo otra escritura (de este u
+        otro worker) los contadores se descartan y se recargan en la próxima lectura.
+        """
+        with self._lock:
+            if self._counts is None:
+                return
+            if version is None or self._version is None or version != self._version + 1:
+                self._counts = None
+                return
+            for old, new in changes:
+                if old == new:
+                    continue
+                if old is not None:
+                    remaining = self._counts.get(old, 0) - 1
+                    if remaining > 0:
+                        self._counts[old] = remaining
+                    else:
+                        self._counts.pop(old, None)
+                if new is not None:
+                    self._counts[new] = self._counts.get(new, 0) + 1
+            self._version = version
+
+    def invalidate(self):
+        """Descarta los contadores salvo que ya reflejen la versión vigente de participantes."""
+        with self._lock:
+            if self._version != cache_versions.current(PARTICIPANTS)[0]:
+                self._counts = None
+
+    def _totals(self, counts):
+        return {
+            "adult": sum(n for (adult, _, _), n in counts.items() if adult),
+            "minor": sum(n for (adult, _, _), n in counts.items() if not adult),
+        }
+
+    def _snapshot(self):
+        with self._lock:
+            if self._counts is not None:
+                return dict(self._counts)
+
+        # La versión se toma antes de consultar: una escritura posterior la deja desfasada
+        # y los contadores se vuelven a cargar
+        version = cache_versions.current(PARTICIPANTS)[0]
+        adult = Participant.age >= ADULT_AGE
+        rows = (
+            db.session.query(adult, Participant.program, Participant.type, func.count())
+            .filter(Participant.status == ACTIVE_STATUS)
+            .group_by(adult, Participant.program, Participant.type)
+            .all()
+        )
+        counts = {(row[0], row[1], row[2]): row[3] for row in rows}
+        with self._lock:
+            self._counts = dict(counts)
+            self._version = version
+        return counts
+
+
+# Instancia global del servicio
+participant_counters = ParticipantCounterService()
+cache_versions.subscribe(PARTICIPANTS, participant_counters.invalidate)
@@ -0,0 +1,105 @@
+"""
+Lectura de archivos de importación masiva de participantes (CSV o XLSX).
+Convierte cada fila en el mismo formato que recibe create_participant
+({"participant": {...}, "responsible": {...}}) leyendo el archivo fila a fila.
+"""
+import csv
+import io
+
+IMPORT_FORMATS = ("csv", "xlsx")
+IMPORT_MAX_ROWS = 5000
+
+# Columnas del archivo (encabezados, sin distinguir mayúsculas) -> campo del participante
+PARTICIPANT_COLUMNS = {
+    "firstname": "firstName",
+    "lastname": "lastName",
+    "dni": "dni",
+    "age": "age",
+    "phone": "phone",
+    "email": "email",
+    "address": "address",
+    "program": "program",
+    "type": "type",
+}
+# Columnas del responsable (solo menores de 18)
+RESPONSIBLE_COLUMNS = {
+    "responsiblename": "name",
+    "responsibledni": "dni",
+    "responsiblephone": "phone",
+}
+# Campos numéricos de 10 dígitos que Excel guarda como número y pierden el 0 inicial
+DIGIT_FIELDS = ("dni", "phone")
+
+
+class ParticipantImportService:
+    """Lee filas de un archivo de participantes como diccionarios de create_participant."""
+
+    def format_for(self, filename, requested=None):
+        """Formato pedido o deducido de la extensión; None si no es soportado."""
+        fmt = requested
+        if not fmt and filename and "." in filename:
+            fmt = filename.rsplit(".", 1)[-1]
+        fmt = (fmt or "").strip().lower()
+        return fmt if fmt in IMPORT_FORMATS else None
+
+    def rows(self, stream, fmt):
+        """Genera (número de fila, datos) desde un archivo binario abierto."""
+        raw_rows = self._xlsx_rows(stream) if fmt == "xlsx" else self._csv_rows(stream)
+        header = None
+        for number, values in enumerate(raw_rows, start=1):
+            if header is None:
+                header = [str(v or "").strip().lower().replace(" ", "") for v in values]
+                continue
+            if not any(v not in (None, "") for v in values):
+                continue
+            yield number, self._to_payload(dict(zip(header, values)))
+
+    def _csv_rows(self, stream):
+        # utf-8-sig acepta archivos exportados por Excel (con BOM)
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        yield from csv.reader(text)
+
+    def _xlsx_rows(self, stream):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def _to_payload(self, row):
+        participant = {}
+        for column, field in PARTICIPANT_COLUMNS.items():
+            value = self._clean(field, row.get(column))
+            if value is not None:
+                participant[field] = value
+        if "age" in participant:
+            try:
+                participant["age"] = int(participant["age"])
+            except (TypeError, ValueError):
+                pass  # _validate_participant reporta la edad inválida
+        for field in ("program", "type"):
+            if field in participant:
+                participant[field] = participant[field].upper()
+
+        responsible = {}
+        for column, field in RESPONSIBLE_COLUMNS.items():
+            value = self._clean(field, row.get(column))
+            if value is not None:
+                responsible[field] = value
+        return {"participant": participant, "responsible": responsible or None}
+
+    def _clean(self, field, value):
+        if value is None:
+            return None
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = int(value)
+            if field in DIGIT_FIELDS:
+                return str(value).zfill(10)
+        value = str(value).strip()
+        return value or None
+
+
+# Instancia global del servicio
+participant_import = ParticipantImportService()
@@ -0,0 +1,117 @@
+"""
+Servicio de búsqueda de participantes por nombre o DNI.
+Usa los índices GIN de pg_trgm (ver schema_patches) sobre el nombre completo sin
+tildes y sobre el DNI, de modo que las búsquedas parciales no recorren la tabla.
+En una instalación sin schema upgrade (sin f_unaccent ni pg_trgm) busca con ILIKE sobre
+el nombre sin tildes vía translate() y ordena por coincidencia de prefijo.
+"""
+import unicodedata
+from sqlalchemy import case, func, literal_column, or_, text
+from app.models.participant import Participant
+from app import db
+
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# Tildes que translate() quita cuando no existe f_unaccent
+ACCENTED = "ÁÉÍÓÚÜÑáéíóúüñ"
+UNACCENTED = "aeiouunaeiouun"
+
+
+class ParticipantSearchService:
+    """Búsqueda con ranking de participantes por nombre completo o DNI."""
+
+    def __init__(self):
+        self._trigram = False
+
+    def trigram_available(self):
+        """
+        True si existen f_unaccent y pg_trgm (creados por schema upgrade). Solo se recuerda
+        la respuesta afirmativa, para usarlos en cuanto se aplique el upgrade.
+        """
+        if not self._trigram:
+            self._trigram = bool(
+                db.session.execute(
+                    text(
+                        "SELECT to_regprocedure('f_unaccent(text)') IS NOT NULL "
+                        "AND to_regprocedure('similarity(text, text)') IS NOT NULL"
+                    )
+                ).scalar()
+            )
+        return self._trigram
+
+    def normalize(self, term):
+        """Minúsculas y sin tildes, igual que la expresión indexada f_unaccent(lower(...))."""
+        term = unicodedata.normalize("NFKD", str(term or "").strip().lower())
+        return "".join(c for c in term if not unicodedata.combining(c))
+
+    def full_name_expression(self):
+        full_name = Participant.firstName + literal_column("' '") + Participant.lastName
+        if not self.trigram_available():
+            return func.lower(func.translate(full_name, ACCENTED, UNACCENTED))
+        # Debe coincidir exactamente con la expresión de ix_participant_full_name_trgm
+        return func.f_unaccent(func.lower(full_name))
+
+    def name_condition(self, term):
+        """Coincidencia parcial sin tildes en nombre, apellido o nombre completo."""
+        return self.full_name_expression().ilike(
+            f"%{self._escape_like(self.normalize(term))}%", escape="\\"
+        )
+
+    def dni_condition(self, dni):
+        """Coincidencia parcial de DNI (indexada con gin_trgm_ops)."""
+        return Participant.dni.like(f"%{self._escape_like(str(dni).strip())}%", escape="\\")
+
+    def matching_ids(self, term):
+        """Subconsulta de ids de participantes cuyo nombre o DNI coincide con el término."""
+        return db.select(Participant.id).where(self._match_condition(term))
+
+    def search(self, term, limit=SEARCH_LIMIT):
+        """
+        Participantes que coinciden con el término, ordenados por relevancia:
+        primero DNI exacto o por prefijo, luego similitud trigram con el nombre completo.
+        Retorna una lista de tuplas (Participant, similitud).
+        """
+        normalized = self.normalize(term)
+        if not normalized:
+            return []
+
+        full_name = self.full_name_expression()
+        dni_rank = case(
+            (Participant.dni == normalized, 2),
+            (Participant.dni.like(f"{self._escape_like(normalized)}%", escape="\\"), 1),
+            else_=0,
+        )
+        if self.trigram_available():
+            similarity = func.greatest(
+                func.similarity(full_name, normalized),
+                func.word_similarity(normalized, full_name),
+            )
+        else:
+            similarity = case(
+                (full_name.like(f"{self._escape_like(normalized)}%", escape="\\"), 1.0),
+                else_=0.0,
+            )
+
+        rows = (
+            db.session.query(Participant, dni_rank, similarity)
+            .filter(self._match_condition(term))
+            .order_by(dni_rank.desc(), similarity.desc(), Participant.lastName, Participant.id)
+            .limit(min(limit, SEARCH_MAX_LIMIT))
+            .all()
+        )
+        return [(participant, round(float(score or 0), 3)) for participant, _, score in rows]
+
+    def _match_condition(self, term):
+        normalized = self.normalize(term)
+        conditions = [self.name_condition(term)]
+        if normalized.isdigit():
+            conditions.append(self.dni_condition(normalized))
+        return or_(*conditions)
+
+    def _escape_like(self, value):
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# Instancia global del servicio
+participant_search = ParticipantSearchService()
@@ -0,0 +1,238 @@
+"""
+Motor de detección de solapamientos entre horarios.
+Mantiene en memoria, por (programa, día de la semana) y por (programa, fecha específica),
+los intervalos horarios de las sesiones activas ordenados por hora de inicio, de modo que
+cada consulta de conflicto es una búsqueda binaria más los candidatos que realmente se cruzan.
+"""
+import bisect
+from collections import namedtuple
+from app.models.schedule import Schedule
+from app.services.cache_version_service import SCHEDULES, cache_versions
+from app.services.schedule_occurrence_service import schedule_occurrences
+from app.utils.cache import TTLCache
+from app import db
+
+# Segundos que un proceso reutiliza el índice antes de recargarlo; respaldo de la versión
+# de horarios, que es la que propaga los cambios hechos por otros workers
+CONFLICT_INDEX_TTL = 60
+
+# Horario reducido a lo necesario para detectar solapamientos.
+# weekday es el día (0=lunes) si es recurrente; specific_date la fecha si es sesión única.
+ScheduleSlot = namedtuple(
+    "ScheduleSlot",
+    [
+        "key",
+        "name",
+        "program",
+        "start",
+        "end",
+        "weekday",
+        "specific_date",
+        "start_date",
+        "end_date",
+    ],
+)
+
+
+class IntervalBucket:
+    """Intervalos [start, end) ordenados por inicio, con la duración máxima para acotar la búsqueda."""
+
+    def __init__(self):
+        self._starts = []
+        self._slots = []
+        self._max_len = 0
+
+    def add(self, slot):
+        position = bisect.bisect_right(self._starts, slot.start)
+        self._starts.insert(position, slot.start)
+        self._slots.insert(position, slot)
+        self._max_len = max(self._max_len, slot.end - slot.start)
+
+    def overlapping(self, start, end):
+        """Intervalos que se cruzan con [start, end); los que solo se tocan no cuentan."""
+        # Solo pueden cruzarse los que empiezan antes de end y después de start - max_len
+        upper = bisect.bisect_left(self._starts, end)
+        lower = bisect.bisect_right(self._starts, start - self._max_len)
+        return [slot for slot in self._slots[lower:upper] if slot.end > start]
+
+
+class ScheduleConflictIndex:
+    """Índice de intervalos de un conjunto de horarios (sin acceso a BD)."""
+
+    def __init__(self, slots=()):
+        self._weekly = {}
+        self._dated = {}
+        self._dated_days = {}
+        for slot in slots:
+            self.add(slot)
+
+    def add(self, slot):
+        if slot.specific_date:
+            key = (slot.program, slot.specific_date)
+            if key not in self._dated:
+                self._dated[key] = IntervalBucket()
+                bisect.insort(
+                    self._dated_days.setdefault(
+                        (slot.program, slot.specific_date.weekday()), []
+                    ),
+                    slot.specific_date,
+                )
+            self._dated[key].add(slot)
+        else:
+            self._weekly.setdefault((slot.program, slot.weekday), IntervalBucket()).add(slot)
+
+    def conflicts(self, slot, exclude_key=None):
+        """Horarios del índice que se solapan con slot, ignorando exclude_key."""
+        found = []
+        if slot.specific_date:
+            day = slot.specific_date
+            weekly = self._weekly.get((slot.program, day.weekday()))
+            if weekly:
+                found += [
+                    s
+                    for s in weekly.overlapping(slot.start, slot.end)
+                    if self._in_range(day, s.start_date, s.end_date)
+                ]
+            dated = self._dated.get((slot.program, day))
+            if dated:
+                found += dated.overlapping(slot.start, slot.end)
+        else:
+            weekly = self._weekly.get((slot.program, slot.weekday))
+            if weekly:
+                found += [
+                    s
+                    for s in weekly.overlapping(slot.start, slot.end)
+                    if self._ranges_intersect(slot, s)
+                ]
+            # Sesiones de fecha específica que caen ese día de la semana dentro de la vigencia
+            days = self._dated_days.get((slot.program, slot.weekday), [])
+            lower = bisect.bisect_left(days, slot.start_date) if slot.start_date else 0
+            upper = bisect.bisect_right(days, slot.end_date) if slot.end_date else len(days)
+            for day in days[lower:upper]:
+                found += self._dated[(slot.program, day)].overlapping(slot.start, slot.end)
+
+        return [s for s in found if exclude_key is None or s.key != exclude_key]
+
+    def _in_range(self, day, start_date, end_date):
+        return (start_date is None or start_date <= day) and (
+            end_date is None or day <= end_date
+        )
+
+    def _ranges_intersect(self, a, b):
+        return (a.end_date is None or b.start_date is None or b.start_date <= a.end_date) and (
+            b.end_date is None or a.start_date is None or a.start_date <= b.end_date
+        )
+
+
+class ScheduleConflictService:
+    """Detecta solapamientos de horarios usando un índice en memoria por proceso."""
+
+    def __init__(self):
+        self._cache = TTLCache(ttl=CONFLICT_INDEX_TTL, maxsize=1)
+
+    def to_slot(
+        self,
+        key,
+        name,
+        program,
+        start_time,
+        end_time,
+        day_of_week=None,
+        specific_date=None,
+        start_date=None,
+        end_date=None,
+        is_recurring=None,
+    ):
+        """
+        Convierte los datos de un horario en un ScheduleSlot, con la misma regla que el
+        motor de ocurrencias: la fecha específica aplica si no es recurrente o no hay día.
+        Retorna None si faltan datos para ubicarlo (hora o día inválidos).
+        """
+        start = self._minutes(start_time)
+        end = self._minutes(end_time)
+        weekday = schedule_occurrences.day_number(day_of_week)
+        specific = self._to_date(specific_date)
+        if start is None or end is None or start >= end:
+            return None
+
+        if specific and (not is_recurring or weekday is None):
+            return ScheduleSlot(key, name, program, start, end, None, specific, None, None)
+        if weekday is None:
+            return None
+        return ScheduleSlot(
+            key,
+            name,
+            program,
+            start,
+            end,
+            weekday,
+            None,
+            self._to_date(start_date),
+            self._to_date(end_date),
+        )
+
+    def index(self):
+        """Índice de los horarios activos, reutilizado hasta invalidate() o expirar el TTL."""
+        return self._cache.get_or_set("index", self._load)
+
+    def invalidate(self):
+        """Descarta el índice (llamar tras crear, modificar o eliminar horarios)."""
+        self._cache.clear()
+
+    def find_conflicts(self, slot, exclude_key=None):
+        """Horarios activos que se solapan con slot (exclude_key omite el propio horario)."""
+        return self.index().conflicts(slot, exclude_key)
+
+    def validate_timetable(self, slots, replaced_keys=()):
+        """
+        Valida un conjunto de horarios contra los existentes y entre sí.
+        replaced_keys son horarios existentes que el conjunto reemplaza y no deben contarse.
+        Retorna [(posición, [ScheduleSlot en conflicto])] solo para los que se solapan.
+        """
+        replaced = set(replaced_keys)
+        existing = self.index()
+        planned = ScheduleConflictIndex()
+        report = []
+        for position, slot in enumerate(slots):
+            found = [s for s in existing.conflicts(slot) if s.key not in replaced]
+            found += planned.conflicts(slot)
+            if found:
+                report.append((position, found))
+            planned.add(slot)
+        return report
+
+    def _load(self):
+        # Se leen columnas y no entidades, sin autoflush: los cambios pendientes de un
+        # update_schedule en curso no deben quedar en el índice compartido
+        with db.session.no_autoflush:
+            rows = db.session.execute(
+                db.select(
+                    Schedule.external_id,
+                    Schedule.name,
+                    Schedule.program,
+                    Schedule.startTime,
+                    Schedule.endTime,
+                    Schedule.dayOfWeek,
+                    Schedule.specificDate,
+                    Schedule.startDate,
+                    Schedule.endDate,
+                    Schedule.isRecurring,
+                ).where(Schedule.status == "active")
+            ).all()
+        slots = (self.to_slot(*row) for row in rows)
+        return ScheduleConflictIndex(slot for slot in slots if slot)
+
+    def _minutes(self, value):
+        try:
+            hours, minutes = str(value).strip().split(":")[:2]
+            return int(hours) * 60 + int(minutes)
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    def _to_date(self, value):
+        return schedule_occurrences.to_date(value)
+
+
+# Instancia global del servicio
+schedule_conflicts = ScheduleConflictService()
+cache_versions.subscribe(SCHEDULES, schedule_conflicts.invalidate)
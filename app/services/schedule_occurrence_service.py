@@ -0,0 +1,145 @@
+"""
+Motor de ocurrencias de horarios.
+Expande los horarios activos (recurrentes por día de la semana o de fecha específica)
+en sesiones concretas con fecha para cualquier rango, con caché por (rango, programa)
+que se invalida cuando se crea, modifica o elimina un horario.
+"""
+import unicodedata
+from datetime import date, timedelta
+from app.models.schedule import Schedule
+from app.services.cache_version_service import SCHEDULES, cache_versions
+from app.utils.cache import TTLCache
+from app import db
+
+# Días aceptados: inglés (formato de create_schedule) y español (datos anteriores)
+DAY_NUMBERS = {
+    "MONDAY": 0,
+    "TUESDAY": 1,
+    "WEDNESDAY": 2,
+    "THURSDAY": 3,
+    "FRIDAY": 4,
+    "SATURDAY": 5,
+    "SUNDAY": 6,
+    "LUNES": 0,
+    "MARTES": 1,
+    "MIERCOLES": 2,
+    "JUEVES": 3,
+    "VIERNES": 4,
+    "SABADO": 5,
+    "DOMINGO": 6,
+}
+
+MAX_RANGE_DAYS = 366
+
+
+class ScheduleOccurrenceService:
+    """Calcula en qué fechas ocurre cada horario activo."""
+
+    def __init__(self):
+        self._cache = TTLCache(ttl=None, maxsize=128)
+
+    def day_number(self, day_of_week):
+        """Número de día (0=lunes) para un nombre en inglés o español, o None."""
+        if not day_of_week:
+            return None
+        name = unicodedata.normalize("NFKD", str(day_of_week).strip().upper())
+        name = "".join(c for c in name if not unicodedata.combining(c))
+        return DAY_NUMBERS.get(name)
+
+    def occurrences(self, date_from, date_to, program=None):
+        """
+        Ocurrencias entre date_from y date_to (inclusive), ordenadas por fecha y hora.
+        Cada ocurrencia es un dict con schedule_id, date y los datos del horario.
+        """
+        key = (date_from, date_to, program)
+        return self._cache.get_or_set(
+            key, lambda: self._load(date_from, date_to, program)
+        )
+
+    def occurrences_on(self, day, program=None):
+        """Ocurrencias de un día concreto."""
+        return self.occurrences(day, day, program)
+
+    def invalidate(self):
+        """Descarta todas las ocurrencias calculadas (llamar tras escribir horarios)."""
+        self._cache.clear()
+
+    def _load(self, date_from, date_to, program=None):
+        # Solo horarios activos cuyo rango de vigencia puede cruzarse con el solicitado
+        desde, hasta = date_from.isoformat(), date_to.isoformat()
+        query = Schedule.query.filter(Schedule.status == "active").filter(
+            db.or_(
+                Schedule.specificDate.between(desde, hasta),
+                db.and_(
+                    Schedule.dayOfWeek.isnot(None),
+                    db.or_(Schedule.startDate.is_(None), Schedule.startDate <= hasta),
+                    db.or_(Schedule.endDate.is_(None), Schedule.endDate >= desde),
+                ),
+            )
+        )
+        if program:
+            query = query.filter(Schedule.program == program)
+
+        return self.expand(query.all(), date_from, date_to)
+
+    def expand(self, schedules, date_from, date_to):
+        """Expande una lista de horarios en ocurrencias dentro del rango (sin acceso a BD)."""
+        result = []
+        for schedule in schedules:
+            for day in self._schedule_dates(schedule, date_from, date_to):
+                result.append(self._build_occurrence(schedule, day))
+
+        result.sort(key=lambda o: (o["date"], o["start_time"], o["schedule_id"] or 0))
+        return result
+
+    def _schedule_dates(self, schedule, date_from, date_to):
+        specific = self.to_date(schedule.specificDate)
+        weekday = self.day_number(schedule.dayOfWeek)
+
+        # Sesión de fecha específica: una única ocurrencia
+        if specific and (not schedule.isRecurring or weekday is None):
+            if date_from <= specific <= date_to:
+                yield specific
+            return
+
+        if weekday is None:
+            return
+
+        start = max(date_from, self.to_date(schedule.startDate) or date_from)
+        end = min(date_to, self.to_date(schedule.endDate) or date_to)
+        current = start + timedelta(days=(weekday - start.weekday()) % 7)
+        while current <= end:
+            yield current
+            current += timedelta(days=7)
+
+    def _build_occurrence(self, schedule, day):
+        return {
+            "schedule_id": schedule.id,
+            "schedule_external_id": schedule.external_id,
+            "date": day,
+            "name": schedule.name,
+            "day_of_week": schedule.dayOfWeek,
+            "start_time": schedule.startTime,
+            "end_time": schedule.endTime,
+            "program": schedule.program,
+            "max_slots": schedule.maxSlots,
+            "specific_date": schedule.specificDate,
+            "is_recurring": schedule.isRecurring,
+            "location": schedule.location,
+        }
+
+    def to_date(self, value):
+        """Fecha a partir de un date o de un texto ISO (YYYY-MM-DD); None si no es válida."""
+        if not value:
+            return None
+        if isinstance(value, date):
+            return value
+        try:
+            return date.fromisoformat(str(value).strip())
+        except ValueError:
+            return None
+
+
+# Instancia global del servicio
+schedule_occurrences = ScheduleOccurrenceService()
+cache_versions.subscribe(SCHEDULES, schedule_occurrences.invalidate)
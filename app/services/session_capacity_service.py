@@ -0,0 +1,95 @@
+"""
+Servicio de cupos por sesión.
+Cada sesión concreta (horario + fecha) tiene una fila en schedule_occurrence con el número
+de inscritos. Los registros de asistencia bloquean esa fila (SELECT ... FOR UPDATE) antes
+de comprobar el cupo, de modo que dos envíos simultáneos de la misma sesión se serializan
+en lugar de contar e insertar a la vez.
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models.attendance import Attendance
+from app.models.scheduleOccurrence import ScheduleOccurrence
+from app import db
+
+
+class SessionCapacityService:
+    """Contadores de inscritos por sesión y control de cupos."""
+
+    def lock(self, schedule_id, fecha):
+        """
+        Crea (si no existe) y bloquea la fila de la sesión hasta el fin de la transacción.
+        La primera vez el contador se inicializa contando las asistencias existentes de esa
+        sesión (consulta acotada por ix_attendance_schedule_date).
+        Retorna la fila con registered_count y version.
+        """
+        table = ScheduleOccurrence.__table__
+        existing = (
+            db.select(
+                literal(schedule_id),
+                literal(fecha),
+                func.count(Attendance.id),
+                literal(1),
+                literal(datetime.utcnow()),
+            )
+            .where(Attendance.schedule_id == schedule_id, Attendance.date == fecha)
+        )
+        db.session.execute(
+            pg_insert(table)
+            .from_select(
+                ["schedule_id", "date", "registered_count", "version", "updated_at"],
+                existing,
+            )
+            .on_conflict_do_nothing(index_elements=[table.c.schedule_id, table.c.date])
+        )
+        return db.session.execute(
+            db.select(table.c.registered_count, table.c.version)
+            .where(table.c.schedule_id == schedule_id, table.c.date == fecha)
+            .with_for_update()
+        ).one()
+
+    def overflow(self, schedule, registered, new_participants):
+        """
+        Reporte de exceso de cupo si al sumar new_participants (external_ids sin registro
+        previo en la sesión) se supera maxSlots; None si caben.
+        """
+        max_slots = int(schedule.maxSlots or 0)
+        available = max(max_slots - registered, 0)
+        if len(new_participants) <= available:
+            return None
+        return {
+            "schedule_external_id": schedule.external_id,
+            "max_slots": max_slots,
+            "registered": registered,
+            "requested_new": len(new_participants),
+            "available": available,
+            "overflow": len(new_participants) - available,
+            "participants": list(new_participants),
+        }
+
+    def apply_changes(self, changes):
+        """
+        Ajusta inscritos y versión de cada sesión afectada por los cambios de asistencia.
+        Las filas deben existir (lock() en la misma transacción); no hace commit.
+        """
+        deltas = defaultdict(int)
+        for change in changes:
+            key = (change.schedule_id, change.date)
+            deltas[key] += (change.old_status is None) - (change.new_status is None)
+
+        table = ScheduleOccurrence.__table__
+        for (schedule_id, fecha), delta in deltas.items():
+            db.session.execute(
+                table.update()
+                .where(table.c.schedule_id == schedule_id, table.c.date == fecha)
+                .values(
+                    registered_count=table.c.registered_count + delta,
+                    version=table.c.version + 1,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+
+
+# Instancia global del servicio
+session_capacity = SessionCapacityService()
@@ -23,6 +23,8 @@ ERROR_EX_NOT_IN_TEST = "Ejercicio no pertenece al test"
 ERROR_EX_DUPLICATED = "Ejercicio duplicado"
 ERROR_VALUE_INVALID = "El valor del ejercicio debe ser numérico y mayor o igual a 0"
 ERROR_DATE_FORMAT = "Formato de fecha inválido, debe ser YYYY-MM-DD"
+ERROR_MONTH_FORMAT = "Formato de mes inválido, debe ser YYYY-MM"
+ERROR_DATETIME_FORMAT = "Formato de fecha y hora inválido, debe ser ISO 8601 (YYYY-MM-DDTHH:MM:SS)"
 SUCCESS_APPLY_TEST = "Evaluación aplicada correctamente"
 
 # DNI
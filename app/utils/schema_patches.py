@@ -0,0 +1,165 @@
+"""
+Parches de esquema idempotentes para bases de datos existentes.
+db.create_all() solo crea tablas nuevas; los cambios sobre tablas ya creadas
+(restricciones, índices, tipos de columna) se aplican con:
+
+    flask --app index schema upgrade
+"""
+from sqlalchemy import text
+from app import db
+
+SCHEMA_PATCHES = [
+    (
+        "attendance_unique_participant_schedule_date",
+        [
+            # Conserva el registro más reciente de cada (participante, horario, fecha)
+            """
+            DELETE FROM attendance a
+            USING attendance b
+            WHERE a.participant_id = b.participant_id
+              AND a.schedule_id = b.schedule_id
+              AND a.date = b.date
+              AND a.id < b.id
+            """,
+            """
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint
+                    WHERE conname = 'uq_attendance_participant_schedule_date'
+                ) THEN
+                    ALTER TABLE attendance
+                        ADD CONSTRAINT uq_attendance_participant_schedule_date
+                        UNIQUE (participant_id, schedule_id, date);
+                END IF;
+            END $$
+            """,
+        ],
+    ),
+    (
+        "attendance_date_native_type",
+        [
+            """
+            DO $$
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'attendance'
+                      AND column_name = 'date'
+                      AND data_type <> 'date'
+                ) THEN
+                    ALTER TABLE attendance
+                        ALTER COLUMN date TYPE date USING date::date;
+                END IF;
+            END $$
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_attendance_schedule_date ON attendance (schedule_id, date)",
+            "CREATE INDEX IF NOT EXISTS ix_attendance_participant_date ON attendance (participant_id, date)",
+            "CREATE INDEX IF NOT EXISTS ix_attendance_date_dow ON attendance ((EXTRACT(dow FROM date)))",
+        ],
+    ),
+    (
+        "participant_trigram_search",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE EXTENSION IF NOT EXISTS unaccent",
+            # unaccent() no es IMMUTABLE; el envoltorio permite usarlo en un índice
+            """
+            CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS
+            $$ SELECT public.unaccent('public.unaccent', $1) $$
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_participant_full_name_trgm ON participant
+            USING gin (f_unaccent(lower("firstName" || ' ' || "lastName")) gin_trgm_ops)
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_participant_dni_trgm ON participant USING gin (dni gin_trgm_ops)",
+        ],
+    ),
+    (
+        "participant_listing_filters",
+        [
+            """
+            CREATE INDEX IF NOT EXISTS ix_participant_status_program_id
+            ON participant (status, program, id)
+            """,
+        ],
+    ),
+    (
+        "responsible_dni_index",
+        # Búsqueda de DNI ya registrados (identity_conflict_service)
+        ["CREATE INDEX IF NOT EXISTS ix_responsible_dni ON responsible (dni)"],
+    ),
+    (
+        "attendance_client_updated_at",
+        ["ALTER TABLE attendance ADD COLUMN IF NOT EXISTS client_updated_at timestamp"],
+    ),
+    (
+        "attendance_monthly_partitions",
+        [
+            # Convierte attendance en tabla particionada por mes y copia los registros.
+            # Las restricciones únicas pasan a incluir date (requisito de PostgreSQL).
+            """
+            DO $$
+            DECLARE
+                month date;
+            BEGIN
+                IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('attendance')) = 'r' THEN
+                    ALTER TABLE attendance RENAME TO attendance_unpartitioned;
+                    ALTER TABLE attendance_unpartitioned
+                        DROP CONSTRAINT IF EXISTS attendance_pkey,
+                        DROP CONSTRAINT IF EXISTS attendance_external_id_key,
+                        DROP CONSTRAINT IF EXISTS uq_attendance_participant_schedule_date;
+                    DROP INDEX IF EXISTS ix_attendance_schedule_date,
+                        ix_attendance_participant_date, ix_attendance_date_dow;
+                    ALTER SEQUENCE IF EXISTS attendance_id_seq OWNED BY NONE;
+
+                    CREATE TABLE attendance (
+                        LIKE attendance_unpartitioned INCLUDING DEFAULTS,
+                        PRIMARY KEY (id, date),
+                        CONSTRAINT uq_attendance_participant_schedule_date
+                            UNIQUE (participant_id, schedule_id, date),
+                        CONSTRAINT uq_attendance_external_id_date UNIQUE (external_id, date),
+                        FOREIGN KEY (participant_id) REFERENCES participant (id),
+                        FOREIGN KEY (schedule_id) REFERENCES schedule (id)
+                    ) PARTITION BY RANGE (date);
+                    ALTER SEQUENCE IF EXISTS attendance_id_seq OWNED BY attendance.id;
+                    CREATE INDEX ix_attendance_schedule_date ON attendance (schedule_id, date);
+                    CREATE INDEX ix_attendance_participant_date ON attendance (participant_id, date);
+                    CREATE INDEX ix_attendance_date_dow ON attendance ((EXTRACT(dow FROM date)));
+
+                    FOR month IN
+                        SELECT generate_series(
+                            date_trunc('month', coalesce(min(date), current_date)),
+                            date_trunc('month', greatest(coalesce(max(date), current_date), current_date)),
+                            interval '1 month'
+                        )::date
+                        FROM attendance_unpartitioned
+                    LOOP
+                        EXECUTE format(
+                            'CREATE TABLE %I PARTITION OF attendance FOR VALUES FROM (%L) TO (%L)',
+                            'attendance_p' || to_char(month, 'YYYY_MM'),
+                            month,
+                            (month + interval '1 month')::date
+                        );
+                    END LOOP;
+
+                    INSERT INTO attendance SELECT * FROM attendance_unpartitioned;
+                    DROP TABLE attendance_unpartitioned;
+                END IF;
+            END $$
+            """,
+        ],
+    ),
+]
+
+
+def apply_schema_patches():
+    """Aplica todos los parches en orden dentro de una transacción. Retorna sus nombres."""
+    applied = []
+    for name, statements in SCHEMA_PATCHES:
+        for statement in statements:
+            db.session.execute(text(statement))
+        applied.append(name)
+    db.session.commit()
+    return applied
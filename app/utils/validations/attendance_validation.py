@@ -0,0 +1,72 @@
+from datetime import date, datetime, timezone
+from app.utils.constants.message import (
+    DATE_FORMAT,
+    ERROR_DATE_FORMAT,
+    ERROR_DATETIME_FORMAT,
+    ERROR_MONTH_FORMAT,
+)
+
+
+def parse_attendance_date(date_str):
+    """Convierte una fecha ISO (YYYY-MM-DD) en date. Retorna (fecha, error)."""
+    if not date_str:
+        return None, None
+    if isinstance(date_str, date):
+        return date_str, None
+
+    try:
+        return datetime.strptime(str(date_str).strip(), DATE_FORMAT).date(), None
+    except ValueError:
+        return None, ERROR_DATE_FORMAT
+
+
+def parse_month(month_str):
+    """Convierte un mes YYYY-MM en la fecha de su primer día. Retorna (fecha, error)."""
+    if not month_str:
+        return None, None
+
+    try:
+        return datetime.strptime(str(month_str).strip(), "%Y-%m").date(), None
+    except ValueError:
+        return None, ERROR_MONTH_FORMAT
+
+
+def parse_date_filters(**filters):
+    """
+    Convierte varios filtros de fecha a la vez.
+    Retorna (valores, errores) con las mismas claves recibidas.
+    """
+    values, errors = {}, {}
+    for field, raw in filters.items():
+        values[field], error = parse_attendance_date(raw)
+        if error:
+            errors[field] = error
+    return values, errors
+
+
+def parse_client_timestamp(value):
+    """
+    Convierte una fecha y hora ISO 8601 enviada por el cliente en datetime UTC sin zona.
+    Sin zona horaria se asume UTC. Retorna (fecha_hora, error).
+    """
+    if not value:
+        return None, None
+
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None, ERROR_DATETIME_FORMAT
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed, None
+
+
+def client_write_time(client_updated_at, now=None):
+    """
+    Marca con la que compite una escritura (gana la más reciente): la del cliente, sin
+    pasar de la hora actual para que un reloj adelantado no bloquee correcciones
+    posteriores. Sin marca del cliente se usa la hora actual.
+    """
+    now = now or datetime.utcnow()
+    return min(client_updated_at, now) if client_updated_at else now
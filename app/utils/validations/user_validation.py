@@ -1,7 +1,10 @@
 import re
-from app.models.participant import Participant
-from app.models.responsible import Responsible
-from app.models.user import User
+from app.services.identity_conflict_service import (
+    PARTICIPANT,
+    RESPONSIBLE,
+    USER,
+    identity_conflicts,
+)
 from app.utils.constants.message import (
     DNI_EXISTS,
     DNI_LENGTH,
@@ -47,12 +50,13 @@ def validate_required_fields(data, required_fields):
     return errors
 
 
-def validate_dni(dni, is_sequential, check_participant=True):
+def validate_dni(dni, is_sequential, check_participant=True, conflicts=None):
     """
     Valida formato y unicidad del DNI.
     - check_participant=True (default): DNI no debe existir en User, Participant ni Responsible.
     - check_participant=False: solo rechaza si existe en User o Responsible.
       Usado en create_user para permitir que un participante sea también docente/pasante (mismo DNI).
+    - conflicts: resultado previo de identity_conflicts.find (evita otra consulta).
     """
     errors = {}
     if not dni.isdigit():
@@ -64,22 +68,25 @@ def validate_dni(dni, is_sequential, check_participant=True):
     elif is_sequential(dni):
         errors["dni"] = DNI_SEQUENTIAL
     else:
-        exists_user = User.query.filter_by(dni=dni).first()
-        exists_responsible = Responsible.query.filter_by(dni=dni).first()
-        exists_participant = Participant.query.filter_by(dni=dni).first() if check_participant else None
-        if exists_user or exists_responsible or exists_participant:
+        if conflicts is None:
+            conflicts = identity_conflicts.find(dnis=[dni])
+        sources = (USER, RESPONSIBLE, PARTICIPANT) if check_participant else (USER, RESPONSIBLE)
+        if conflicts.exists("dni", dni, sources):
             errors["dni"] = DNI_EXISTS
     return errors
 
 
-def validate_email(email):
+def validate_email(email, conflicts=None):
     errors = {}
     if not re.match(EMAIL_PATTERN, email):
         errors["email"] = EMAIL_INVALID
     elif len(email) > 100:
         errors["email"] = EMAIL_LENGTH
-    elif User.query.filter_by(email=email).first():
-        errors["email"] = EMAIL_EXISTS
+    else:
+        if conflicts is None:
+            conflicts = identity_conflicts.find(emails=[email])
+        if conflicts.exists("email", email, (USER,)):
+            errors["email"] = EMAIL_EXISTS
     return errors
 
 
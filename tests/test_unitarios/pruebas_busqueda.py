@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy.dialects import postgresql
+from app.services.participant_search_service import ParticipantSearchService
+
+
+def compile_sql(clause):
+    """SQL de PostgreSQL y valores de sus parámetros."""
+    compiled = clause.compile(dialect=postgresql.dialect())
+    return str(compiled), list(compiled.params.values())
+
+
+class TestParticipantSearch(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_busqueda -v
+    """Pruebas de normalización y construcción de consultas de búsqueda (sin base de datos)"""
+
+    def setUp(self):
+        self.service = ParticipantSearchService()
+
+    def test_tc_01_normalize_removes_accents_and_case(self):
+        """TC-01: normalize quita tildes, diéresis y mayúsculas como f_unaccent(lower())"""
+        self.assertEqual(self.service.normalize("  José Ñúñez "), "jose nunez")
+        self.assertEqual(self.service.normalize("GÜEMES"), "guemes")
+        self.assertEqual(self.service.normalize(None), "")
+
+    def test_tc_02_name_condition_uses_indexed_expression(self):
+        """TC-02: Con pg_trgm la condición usa la expresión del índice trigram"""
+        with patch.object(self.service, "trigram_available", return_value=True):
+            sql, params = compile_sql(self.service.name_condition("José"))
+
+        self.assertIn('f_unaccent(lower(participant."firstName"', sql)
+        self.assertIn("%jose%", params)
+
+    def test_tc_03_name_condition_without_unaccent(self):
+        """TC-03: Sin f_unaccent la condición quita tildes con translate()"""
+        with patch.object(self.service, "trigram_available", return_value=False):
+            sql, params = compile_sql(self.service.name_condition("José"))
+
+        self.assertNotIn("f_unaccent", sql)
+        self.assertIn("translate(", sql)
+        self.assertIn("%jose%", params)
+
+    def test_tc_04_dni_only_for_numeric_terms(self):
+        """TC-04: El DNI solo se busca cuando el término es numérico"""
+        with patch.object(self.service, "trigram_available", return_value=True):
+            numeric, params = compile_sql(self.service._match_condition("110456"))
+            text, _ = compile_sql(self.service._match_condition("ana"))
+
+        self.assertIn("participant.dni LIKE", numeric)
+        self.assertEqual(params.count("%110456%"), 2)
+        self.assertNotIn("participant.dni", text)
+
+    def test_tc_05_like_wildcards_are_escaped(self):
+        """TC-05: % y _ del término se buscan literalmente"""
+        self.assertEqual(self.service._escape_like("50%_a"), "50\\%\\_a")
+
+    def test_tc_06_empty_term_returns_nothing(self):
+        """TC-06: Un término vacío no consulta la base de datos"""
+        with patch("app.services.participant_search_service.db") as mock_db:
+            self.assertEqual(self.service.search("   "), [])
+        mock_db.session.query.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
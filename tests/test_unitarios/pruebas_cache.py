@@ -0,0 +1,188 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.services.cache_version_service import CacheVersionService
+from app.services.participant_counter_service import ParticipantCounterService
+from app.utils.cache import TTLCache
+
+
+def participant(status="ACTIVO", age=25, program="FUNCIONAL", type="ESTUDIANTE"):
+    return SimpleNamespace(status=status, age=age, program=program, type=type)
+
+
+class TestTTLCache(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_cache -v
+    """Pruebas de la caché en memoria del proceso"""
+
+    @patch("app.utils.cache.time.monotonic")
+    def test_tc_01_entries_expire_after_ttl(self, mock_monotonic):
+        """TC-01: Una entrada deja de estar disponible al vencer su ttl"""
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=None)
+
+        mock_monotonic.return_value = 109.9
+        self.assertEqual(cache.get("a"), 1)
+        mock_monotonic.return_value = 110.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_tc_02_least_recently_used_is_evicted(self):
+        """TC-02: Al superar maxsize se descarta la entrada usada hace más tiempo"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_tc_03_get_or_set_computes_once(self):
+        """TC-03: get_or_set solo llama a factory cuando falta el valor"""
+        cache = TTLCache()
+        factory = MagicMock(return_value=[1, 2])
+
+        self.assertEqual(cache.get_or_set("k", factory), [1, 2])
+        self.assertEqual(cache.get_or_set("k", factory), [1, 2])
+        factory.assert_called_once()
+
+    def test_tc_04_delete_where_and_clear(self):
+        """TC-04: delete_where elimina por predicado y clear vacía la caché"""
+        cache = TTLCache()
+        for key in (("s", 1), ("s", 2), ("t", 1)):
+            cache.set(key, True)
+
+        cache.delete_where(lambda key: key[0] == "s")
+        self.assertIsNone(cache.get(("s", 1)))
+        self.assertTrue(cache.get(("t", 1)))
+        cache.clear()
+        self.assertIsNone(cache.get(("t", 1)))
+
+
+@patch("app.services.cache_version_service.db")
+class TestCacheVersions(unittest.TestCase):
+    """Invalidación de cachés entre procesos por versión"""
+
+    def setUp(self):
+        self.versions = CacheVersionService(check_interval=60)
+        self.schedules = MagicMock()
+        self.participants = MagicMock()
+        self.versions.subscribe("schedules", self.schedules)
+        self.versions.subscribe("participants", self.participants)
+
+    def stored(self, mock_db, **versions):
+        mock_db.session.execute.return_value.all.return_value = [
+            SimpleNamespace(name=name, version=version, updated_at=datetime(2026, 10, 5))
+            for name, version in versions.items()
+        ]
+
+    def test_tc_05_callbacks_run_only_for_changed_versions(self, mock_db):
+        """TC-05: Solo se invalidan las cachés cuya versión cambió"""
+        self.stored(mock_db, schedules=1, participants=1)
+        self.versions.sync(force=True)
+        self.schedules.reset_mock()
+        self.participants.reset_mock()
+
+        self.stored(mock_db, schedules=1, participants=2)
+        self.versions.sync(force=True)
+
+        self.schedules.assert_not_called()
+        self.participants.assert_called_once()
+        self.assertEqual(self.versions.current("participants")[0], 2)
+
+    def test_tc_06_sync_is_throttled_unless_forced(self, mock_db):
+        """TC-06: Dentro del intervalo no se vuelve a consultar salvo con force"""
+        self.stored(mock_db, schedules=1)
+        self.versions.sync()
+        self.versions.sync()
+        self.assertEqual(mock_db.session.execute.call_count, 1)
+
+        self.versions.sync(force=True)
+        self.assertEqual(mock_db.session.execute.call_count, 2)
+
+
+@patch("app.services.participant_counter_service.cache_versions")
+@patch("app.services.participant_counter_service.db")
+class TestParticipantCounters(unittest.TestCase):
+    """Contadores de participantes activos en memoria"""
+
+    def setUp(self):
+        self.counters = ParticipantCounterService()
+
+    def load(self, mock_db, mock_versions, rows, version=5):
+        query = mock_db.session.query.return_value
+        query.filter.return_value.group_by.return_value.all.return_value = rows
+        mock_versions.current.return_value = (version, None)
+
+    def test_tc_07_totals_and_breakdown_from_one_query(self, mock_db, mock_versions):
+        """TC-07: Totales y desgloses salen de una sola consulta agrupada"""
+        self.load(
+            mock_db,
+            mock_versions,
+            [
+                (True, "FUNCIONAL", "ESTUDIANTE", 4),
+                (True, "FUNCIONAL", "DOCENTE", 1),
+                (False, "INICIACION", "ESTUDIANTE", 3),
+            ],
+        )
+
+        self.assertEqual(self.counters.totals(), {"adult": 5, "minor": 3})
+        breakdown = self.counters.breakdown()
+        self.assertEqual(breakdown["total"], 8)
+        self.assertEqual(breakdown["by_program"], {"FUNCIONAL": 5, "INICIACION": 3})
+        self.assertEqual(breakdown["by_type"], {"ESTUDIANTE": 7, "DOCENTE": 1})
+        mock_db.session.query.assert_called_once()
+
+    def test_tc_08_status_and_type_changes_apply_deltas(self, mock_db, mock_versions):
+        """TC-08: Inactivar y cambiar de tipo ajustan los contadores sin consultar"""
+        self.load(mock_db, mock_versions, [(True, "FUNCIONAL", "ESTUDIANTE", 2)])
+        self.counters.totals()
+
+        p = participant()
+        before = self.counters.key(p)
+        p.type = "DOCENTE"
+        self.counters.apply([(before, self.counters.key(p))], 6)
+        before = self.counters.key(p)
+        p.status = "INACTIVO"
+        self.counters.apply([(before, self.counters.key(p))], 7)
+        self.counters.apply([(None, self.counters.key(participant(age=12, program="INICIACION")))], 8)
+
+        breakdown = self.counters.breakdown()
+        self.assertEqual((breakdown["adult"], breakdown["minor"]), (1, 1))
+        self.assertEqual(breakdown["by_type"], {"ESTUDIANTE": 2})
+        self.assertEqual(breakdown["by_program"], {"FUNCIONAL": 1, "INICIACION": 1})
+        mock_db.session.query.assert_called_once()
+
+    def test_tc_09_version_gap_discards_counters(self, mock_db, mock_versions):
+        """TC-09: Si otra escritura se intercaló, los contadores se recargan"""
+        self.load(mock_db, mock_versions, [(True, "FUNCIONAL", "ESTUDIANTE", 2)])
+        self.counters.totals()
+
+        self.counters.apply([(None, self.counters.key(participant()))], 7)
+        self.load(mock_db, mock_versions, [(True, "FUNCIONAL", "ESTUDIANTE", 4)], version=7)
+
+        self.assertEqual(self.counters.totals(), {"adult": 4, "minor": 0})
+        self.assertEqual(mock_db.session.query.call_count, 2)
+
+    def test_tc_10_invalidate_keeps_counters_of_own_write(self, mock_db, mock_versions):
+        """TC-10: La invalidación por versión no descarta lo ya aplicado por este proceso"""
+        self.load(mock_db, mock_versions, [(True, "FUNCIONAL", "ESTUDIANTE", 2)])
+        self.counters.totals()
+        self.counters.apply([(None, self.counters.key(participant()))], 6)
+
+        mock_versions.current.return_value = (6, None)
+        self.counters.invalidate()
+        self.assertEqual(self.counters.totals()["adult"], 3)
+
+        mock_versions.current.return_value = (7, None)
+        self.counters.invalidate()
+        self.counters.totals()
+        self.assertEqual(mock_db.session.query.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.controllers.attendance_controller import AttendanceController
+from app.services.session_capacity_service import SessionCapacityService, session_capacity
+
+
+def query_returning(rows):
+    """Consulta simulada: filter/with_for_update encadenan y all() retorna rows."""
+    query = MagicMock()
+    query.filter.return_value = query
+    query.with_for_update.return_value = query
+    query.all.return_value = rows
+    return query
+
+
+def make_schedule(max_slots=10):
+    return SimpleNamespace(id=10, external_id="sch-10", maxSlots=max_slots)
+
+
+class TestSessionOverflow(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_cupos -v
+    """Pruebas del control de cupos por sesión (sin base de datos)"""
+
+    def setUp(self):
+        self.capacity = SessionCapacityService()
+
+    def test_tc_01_exactly_at_the_limit_fits(self):
+        """TC-01: Completar exactamente el cupo no es un exceso"""
+        self.assertIsNone(self.capacity.overflow(make_schedule(10), 8, ["p-1", "p-2"]))
+        self.assertIsNone(self.capacity.overflow(make_schedule(10), 10, []))
+
+    def test_tc_02_above_the_limit_reports_overflow(self):
+        """TC-02: Superar el cupo retorna el reporte con los disponibles y el exceso"""
+        report = self.capacity.overflow(make_schedule(10), 8, ["p-1", "p-2", "p-3"])
+
+        self.assertEqual(
+            report,
+            {
+                "schedule_external_id": "sch-10",
+                "max_slots": 10,
+                "registered": 8,
+                "requested_new": 3,
+                "available": 2,
+                "overflow": 1,
+                "participants": ["p-1", "p-2", "p-3"],
+            },
+        )
+
+    def test_tc_03_counter_above_limit_leaves_no_slots(self):
+        """TC-03: Si el cupo se redujo por debajo de los inscritos no quedan disponibles"""
+        report = self.capacity.overflow(make_schedule(5), 7, ["p-1"])
+
+        self.assertEqual((report["available"], report["overflow"]), (0, 1))
+
+
+@patch.object(session_capacity, "lock")
+@patch("app.controllers.attendance_controller.db")
+class TestRegisterOverflow(unittest.TestCase):
+    """Registro de una sesión llena: los ya registrados no ocupan un cupo nuevo"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+        self.fecha = date(2026, 10, 5)
+
+    def items(self, *external_ids):
+        return [{"participant_external_id": pid, "status": "present"} for pid in external_ids]
+
+    def upsert(self, mock_db, mock_lock, previous, items, registered=10):
+        mock_db.or_.side_effect = lambda *c: c[0] | c[1]
+        mock_db.session.query.side_effect = [
+            query_returning([("p-1", 1), ("p-2", 2), ("p-3", 3)]),
+            query_returning(list(previous.items())),
+        ]
+        mock_db.session.execute.return_value = []
+        mock_lock.return_value = SimpleNamespace(registered_count=registered, version=1)
+        with patch.object(self.controller, "_apply_derived_changes"):
+            return self.controller._upsert_session_attendance(make_schedule(10), self.fecha, items)
+
+    def test_tc_04_re_registered_participants_do_not_count(self, mock_db, mock_lock):
+        """TC-04: Con la sesión llena se pueden corregir los estados ya registrados"""
+        result = self.upsert(
+            mock_db, mock_lock, {1: "absent", 2: "absent"}, self.items("p-1", "p-2")
+        )
+
+        self.assertIsNone(result["overflow"])
+        mock_db.session.execute.assert_called_once()
+
+    def test_tc_05_only_new_participants_are_reported(self, mock_db, mock_lock):
+        """TC-05: El exceso lista solo a los participantes sin registro previo"""
+        result = self.upsert(
+            mock_db, mock_lock, {1: "absent", 2: "absent"}, self.items("p-1", "p-2", "p-3")
+        )
+
+        self.assertEqual(result["overflow"]["requested_new"], 1)
+        self.assertEqual(result["overflow"]["participants"], ["p-3"])
+        mock_db.session.execute.assert_not_called()
+
+    @patch("app.controllers.attendance_controller.attendance_partitions")
+    @patch("app.controllers.attendance_controller.Schedule")
+    def test_tc_06_register_overflow_writes_nothing(
+        self, mock_schedule, mock_partitions, mock_db, mock_lock
+    ):
+        """TC-06: Un envío que supera el cupo retorna 409 con el reporte y no escribe nada"""
+        mock_partitions.is_archived.return_value = False
+        mock_schedule.query.filter_by.return_value.first.return_value = make_schedule(10)
+        mock_db.session.query.side_effect = [
+            query_returning([("p-1", 1), ("p-2", 2), ("p-3", 3)]),
+            query_returning([]),
+        ]
+        mock_lock.return_value = SimpleNamespace(registered_count=9, version=3)
+
+        with patch.object(self.controller, "_apply_derived_changes") as mock_derived:
+            response = self.controller.register_bulk_attendance(
+                {
+                    "schedule_external_id": "sch-10",
+                    "date": "2026-10-05",
+                    "attendances": self.items("p-1", "p-2", "p-3"),
+                }
+            )
+
+        self.assertEqual(response["code"], 409)
+        self.assertEqual(response["data"]["available"], 1)
+        self.assertEqual(response["data"]["overflow"], 2)
+        self.assertEqual(response["data"]["participants"], ["p-1", "p-2", "p-3"])
+        mock_db.session.execute.assert_not_called()
+        mock_derived.assert_not_called()
+        mock_db.session.rollback.assert_called_once()
+        mock_db.session.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+import re
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+from app.services.attendance_partition_service import AttendancePartitionService
+from app.services.attendance_rollup_service import AttendanceRollupService
+from app.services.attendance_stats_service import AttendanceChange, AttendanceStatsService
+from app.services.attendance_streak_service import AttendanceStreakService
+
+
+def written_rows(stmt, *columns):
+    """Filas de un INSERT ... VALUES de varias filas como tuplas con las columnas pedidas."""
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    rows = {}
+    for key, value in params.items():
+        match = re.fullmatch(r"(.+)_m(\d+)", key)
+        if match:
+            rows.setdefault(int(match.group(2)), {})[match.group(1)] = value
+    return [tuple(row[c] for c in columns) for _, row in sorted(rows.items())]
+
+
+def clause_params(query):
+    """Valores comparados en las llamadas a filter() de una consulta simulada."""
+    return [
+        value
+        for call in query.filter.call_args_list
+        for clause in call[0]
+        for value in clause.compile(dialect=postgresql.dialect()).params.values()
+    ]
+
+
+@patch("app.services.attendance_rollup_service.db")
+class TestRollupChanges(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_derivados -v
+    """Pruebas de los totales por periodo (base de datos simulada)"""
+
+    COLUMNS = ("period_type", "period_start", "present_count", "absent_count", "total_count")
+
+    def setUp(self):
+        self.rollups = AttendanceRollupService()
+
+    def apply(self, mock_db, *changes):
+        self.rollups.apply_changes(list(changes))
+        return written_rows(mock_db.session.execute.call_args[0][0], *self.COLUMNS)
+
+    def test_tc_01_status_flip_keeps_total(self, mock_db):
+        """TC-01: Cambiar de presente a ausente mueve un conteo sin alterar el total"""
+        rows = self.apply(mock_db, AttendanceChange(1, 10, date(2026, 10, 7), "present", "absent"))
+
+        self.assertEqual(
+            rows,
+            [
+                ("month", date(2026, 10, 1), -1, 1, 0),
+                ("week", date(2026, 10, 5), -1, 1, 0),
+            ],
+        )
+
+    def test_tc_02_delete_subtracts_from_week_and_month(self, mock_db):
+        """TC-02: Eliminar un registro resta del periodo semanal y mensual de su fecha"""
+        rows = self.apply(
+            mock_db,
+            AttendanceChange(1, 10, date(2026, 10, 4), "present", None),
+            AttendanceChange(2, 10, date(2026, 10, 4), "absent", None),
+        )
+
+        self.assertEqual(
+            rows,
+            [
+                ("month", date(2026, 10, 1), -1, -1, -2),
+                ("week", date(2026, 9, 28), -1, -1, -2),
+            ],
+        )
+
+    def test_tc_03_changes_that_cancel_out_are_not_written(self, mock_db):
+        """TC-03: Si los cambios se compensan no se ejecuta ninguna consulta"""
+        self.rollups.apply_changes(
+            [
+                AttendanceChange(1, 10, date(2026, 10, 7), None, "present"),
+                AttendanceChange(2, 10, date(2026, 10, 7), "present", None),
+            ]
+        )
+
+        mock_db.session.execute.assert_not_called()
+
+    def test_tc_04_recompute_from_straddling_cutoff(self, mock_db):
+        """TC-04: La semana que cruza el corte de archivo conserva sus totales"""
+        # 2026-10-01 es jueves: la semana del 28/09 tiene días archivados
+        self.assertEqual(self.rollups._recompute_from("week", date(2026, 10, 1)), date(2026, 10, 5))
+        self.assertEqual(self.rollups._recompute_from("month", date(2026, 10, 1)), date(2026, 10, 1))
+        # 2026-06-01 es lunes: ninguna semana cruza el corte
+        self.assertEqual(self.rollups._recompute_from("week", date(2026, 6, 1)), date(2026, 6, 1))
+        self.assertIsNone(self.rollups._recompute_from("week", None))
+
+    @patch("app.services.attendance_rollup_service.attendance_partitions")
+    def test_tc_05_rebuild_only_replaces_periods_after_cutoff(self, mock_partitions, mock_db):
+        """TC-05: rebuild elimina y recalcula solo los periodos desde el primer día vigente"""
+        mock_partitions.archived_until.return_value = date(2026, 10, 1)
+        mock_partitions.next_month.side_effect = AttendancePartitionService().next_month
+        mock_db.select.side_effect = sqlalchemy.select
+        self.rollups.rebuild()
+
+        statements = [call[0][0] for call in mock_db.session.execute.call_args_list]
+        deletes = [s.compile(dialect=postgresql.dialect()).params for s in statements[::2]]
+        self.assertEqual(
+            [(p["period_type_1"], p["period_start_1"]) for p in deletes],
+            [("week", date(2026, 10, 5)), ("month", date(2026, 10, 1))],
+        )
+        inserts = [s.compile(dialect=postgresql.dialect()).params for s in statements[1::2]]
+        self.assertEqual([p["date_1"] for p in inserts], [date(2026, 10, 5), date(2026, 10, 1)])
+        mock_db.session.commit.assert_called_once()
+
+
+
+@patch("app.services.attendance_streak_service.db")
+class TestStreakChanges(unittest.TestCase):
+    """Pruebas de la decisión entre alargar y recalcular rachas (base de datos simulada)"""
+
+    def setUp(self):
+        self.streaks = AttendanceStreakService()
+        self.fecha = date(2026, 10, 5)
+
+    def apply(self, mock_db, last_dates, changes, not_written=()):
+        mock_db.select.side_effect = sqlalchemy.select
+        mock_db.session.execute.return_value.all.return_value = list(last_dates.items())
+        with patch.object(self.streaks, "_append", return_value=set(not_written)) as mock_append, \
+                patch.object(self.streaks, "_recompute") as mock_recompute:
+            self.streaks.apply_changes(changes)
+        appended = [c.participant_id for c in mock_append.call_args[0][0]]
+        recomputed = mock_recompute.call_args[0][0] if mock_recompute.called else set()
+        return appended, recomputed
+
+    def test_tc_06_new_record_on_last_date_is_appended(self, mock_db):
+        """TC-06: Un registro nuevo con la misma fecha que la última sesión alarga la racha"""
+        appended, recomputed = self.apply(
+            mock_db,
+            {1: self.fecha},
+            [
+                AttendanceChange(1, 10, self.fecha, None, "absent"),
+                AttendanceChange(2, 10, self.fecha, None, "present"),
+            ],
+        )
+
+        self.assertEqual((appended, recomputed), ([1, 2], set()))
+
+    def test_tc_07_backdated_record_is_recomputed(self, mock_db):
+        """TC-07: Un registro anterior a la última sesión recalcula la racha"""
+        appended, recomputed = self.apply(
+            mock_db, {1: self.fecha}, [AttendanceChange(1, 10, date(2026, 10, 1), None, "absent")]
+        )
+
+        self.assertEqual((appended, recomputed), ([], {1}))
+
+    def test_tc_08_corrections_and_deletes_are_recomputed(self, mock_db):
+        """TC-08: Corregir un estado o eliminar un registro recalcula la racha"""
+        appended, recomputed = self.apply(
+            mock_db,
+            {1: self.fecha, 2: self.fecha},
+            [
+                AttendanceChange(1, 10, self.fecha, "absent", "present"),
+                AttendanceChange(2, 10, self.fecha, "present", None),
+            ],
+        )
+
+        self.assertEqual((appended, recomputed), ([], {1, 2}))
+
+    def test_tc_09_several_changes_of_one_participant(self, mock_db):
+        """TC-09: Varios cambios de un participante en el lote recalculan solo a ese participante"""
+        appended, recomputed = self.apply(
+            mock_db,
+            {},
+            [
+                AttendanceChange(1, 10, self.fecha, None, "absent"),
+                AttendanceChange(1, 11, date(2026, 10, 6), None, "absent"),
+                AttendanceChange(2, 10, self.fecha, None, "present"),
+            ],
+        )
+
+        self.assertEqual((appended, recomputed), ([2], {1}))
+
+    def test_tc_10_rows_not_written_by_append_are_recomputed(self, mock_db):
+        """TC-10: Si otra transacción registró una sesión posterior, la racha se recalcula"""
+        appended, recomputed = self.apply(
+            mock_db,
+            {},
+            [
+                AttendanceChange(1, 10, self.fecha, None, "absent"),
+                AttendanceChange(2, 10, self.fecha, None, "present"),
+            ],
+            not_written={2},
+        )
+
+        self.assertEqual((appended, recomputed), ([1, 2], {2}))
+
+    def test_tc_11_at_risk_threshold(self, mock_db):
+        """TC-11: En riesgo se filtra por racha de ausencias >= min_absences (3 por defecto)"""
+        query = MagicMock()
+        query.join.return_value = query
+        query.filter.return_value = query
+        query.order_by.return_value = query
+        query.all.return_value = [
+            SimpleNamespace(
+                external_id="p-1",
+                firstName="Ana",
+                lastName="Loja",
+                dni="1104567892",
+                program="FUNCIONAL",
+                streak_length=4,
+                last_date=self.fecha,
+            )
+        ]
+        mock_db.session.query.return_value = query
+
+        result = self.streaks.at_risk()
+        self.assertEqual(result[0]["consecutive_absences"], 4)
+        self.assertEqual(result[0]["last_date"], "2026-10-05")
+        self.assertIn(3, clause_params(query))
+
+        query.filter.reset_mock()
+        self.streaks.at_risk(min_absences=5, program="INICIACION")
+        params = clause_params(query)
+        self.assertIn(5, params)
+        self.assertNotIn(3, params)
+        self.assertIn("INICIACION", params)
+
+
+
+@patch("app.services.attendance_stats_service.db")
+class TestStatsChanges(unittest.TestCase):
+    """Pruebas de los contadores por participante (base de datos simulada)"""
+
+    COLUMNS = ("participant_id", "present_count", "total_count")
+
+    def setUp(self):
+        self.stats = AttendanceStatsService()
+        self.fecha = date(2026, 10, 5)
+
+    def apply(self, mock_db, *changes):
+        self.stats.apply_changes(list(changes))
+        return written_rows(mock_db.session.execute.call_args[0][0], *self.COLUMNS)
+
+    def test_tc_12_insert_update_and_delete(self, mock_db):
+        """TC-12: Altas suman, correcciones solo mueven presentes y bajas restan"""
+        rows = self.apply(
+            mock_db,
+            AttendanceChange(3, 10, self.fecha, "present", None),
+            AttendanceChange(1, 10, self.fecha, None, "present"),
+            AttendanceChange(2, 10, self.fecha, "absent", "present"),
+        )
+
+        # Ordenadas por participante: mismo orden de bloqueo en todas las transacciones
+        self.assertEqual(rows, [(1, 1, 1), (2, 1, 0), (3, -1, -1)])
+        stmt = mock_db.session.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (participant_id) DO UPDATE", sql)
+        self.assertIn(
+            "participant_attendance_stats.total_count + excluded.total_count", sql
+        )
+
+    def test_tc_13_several_changes_of_one_participant(self, mock_db):
+        """TC-13: Varios cambios de un participante en el lote se suman en una sola fila"""
+        rows = self.apply(
+            mock_db,
+            AttendanceChange(1, 10, self.fecha, None, "present"),
+            AttendanceChange(1, 11, self.fecha, None, "absent"),
+            AttendanceChange(1, 12, date(2026, 10, 1), "absent", "present"),
+            AttendanceChange(1, 13, date(2026, 9, 30), "present", None),
+        )
+
+        self.assertEqual(rows, [(1, 1, 1)])
+
+    def test_tc_14_changes_without_effect_are_not_written(self, mock_db):
+        """TC-14: Si el lote no altera ningún contador no se ejecuta ninguna consulta"""
+        self.stats.apply_changes(
+            [
+                AttendanceChange(1, 10, self.fecha, None, "absent"),
+                AttendanceChange(1, 11, self.fecha, "absent", None),
+                AttendanceChange(2, 10, self.fecha, "present", "present"),
+            ]
+        )
+        self.stats.apply_changes([])
+
+        mock_db.session.execute.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.controllers.attendance_controller import AttendanceController
+from app.services.schedule_conflict_service import (
+    ScheduleConflictIndex,
+    ScheduleConflictService,
+)
+from app.services.schedule_occurrence_service import ScheduleOccurrenceService
+
+
+def make_schedule(**kwargs):
+    data = {
+        "id": 1,
+        "external_id": "sch-1",
+        "name": "Funcional Lunes",
+        "dayOfWeek": None,
+        "startTime": "08:00",
+        "endTime": "09:00",
+        "program": "FUNCIONAL",
+        "maxSlots": 20,
+        "specificDate": None,
+        "startDate": None,
+        "endDate": None,
+        "isRecurring": True,
+        "location": None,
+    }
+    data.update(kwargs)
+    return SimpleNamespace(**data)
+
+
+class TestScheduleOccurrences(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_horarios -v
+    """Pruebas del motor de ocurrencias de horarios (sin base de datos)"""
+
+    def setUp(self):
+        self.service = ScheduleOccurrenceService()
+
+    def test_tc_01_recurring_weekly_expansion(self):
+        """TC-01: Un horario recurrente genera una ocurrencia por semana en el rango"""
+        schedule = make_schedule(dayOfWeek="MONDAY")
+        result = self.service.expand([schedule], date(2026, 10, 1), date(2026, 10, 31))
+
+        self.assertEqual(
+            [o["date"] for o in result],
+            [date(2026, 10, 5), date(2026, 10, 12), date(2026, 10, 19), date(2026, 10, 26)],
+        )
+
+    def test_tc_02_spanish_day_names(self):
+        """TC-02: Acepta nombres de día en español con o sin tilde"""
+        self.assertEqual(self.service.day_number("Miércoles"), 2)
+        self.assertEqual(self.service.day_number("SABADO"), 5)
+        self.assertEqual(self.service.day_number("wednesday"), 2)
+        self.assertIsNone(self.service.day_number("FERIADO"))
+
+    def test_tc_03_recurring_respects_validity_range(self):
+        """TC-03: startDate y endDate acotan las ocurrencias recurrentes"""
+        schedule = make_schedule(
+            dayOfWeek="MONDAY", startDate="2026-10-10", endDate="2026-10-20"
+        )
+        result = self.service.expand([schedule], date(2026, 10, 1), date(2026, 10, 31))
+
+        self.assertEqual([o["date"] for o in result], [date(2026, 10, 12), date(2026, 10, 19)])
+
+    def test_tc_04_specific_date_single_occurrence(self):
+        """TC-04: Una sesión de fecha específica ocurre solo ese día"""
+        schedule = make_schedule(specificDate="2026-10-15", isRecurring=False)
+
+        inside = self.service.expand([schedule], date(2026, 10, 1), date(2026, 10, 31))
+        outside = self.service.expand([schedule], date(2026, 11, 1), date(2026, 11, 30))
+
+        self.assertEqual([o["date"] for o in inside], [date(2026, 10, 15)])
+        self.assertEqual(outside, [])
+
+    def test_tc_05_occurrences_sorted_by_date_and_time(self):
+        """TC-05: Las ocurrencias se ordenan por fecha y hora de inicio"""
+        late = make_schedule(id=1, dayOfWeek="TUESDAY", startTime="18:00", endTime="19:00")
+        early = make_schedule(id=2, dayOfWeek="TUESDAY", startTime="07:00", endTime="08:00")
+        result = self.service.expand([late, early], date(2026, 10, 6), date(2026, 10, 6))
+
+        self.assertEqual([o["schedule_id"] for o in result], [2, 1])
+
+
+class TestScheduleConflicts(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_horarios -v
+    """Pruebas del índice de solapamientos de horarios (sin base de datos)"""
+
+    def setUp(self):
+        self.service = ScheduleConflictService()
+
+    def slot(self, key, start, end, **kwargs):
+        return self.service.to_slot(
+            key,
+            kwargs.get("name", key),
+            kwargs.get("program", "FUNCIONAL"),
+            start,
+            end,
+            kwargs.get("day_of_week"),
+            kwargs.get("specific_date"),
+            kwargs.get("start_date"),
+            kwargs.get("end_date"),
+            kwargs.get("is_recurring", kwargs.get("specific_date") is None),
+        )
+
+    def test_tc_06_weekly_overlap_and_touching_intervals(self):
+        """TC-06: Detecta cruces del mismo día y programa; intervalos contiguos no chocan"""
+        index = ScheduleConflictIndex(
+            [
+                self.slot("a", "08:00", "10:00", day_of_week="MONDAY"),
+                self.slot("b", "12:00", "13:00", day_of_week="MONDAY"),
+            ]
+        )
+
+        overlap = index.conflicts(self.slot("n", "09:30", "12:30", day_of_week="MONDAY"))
+        touching = index.conflicts(self.slot("n", "10:00", "12:00", day_of_week="MONDAY"))
+        other_program = index.conflicts(
+            self.slot("n", "09:00", "09:30", day_of_week="MONDAY", program="INICIACION")
+        )
+
+        self.assertEqual(sorted(s.key for s in overlap), ["a", "b"])
+        self.assertEqual(touching, [])
+        self.assertEqual(other_program, [])
+
+    def test_tc_07_long_interval_found_from_late_start(self):
+        """TC-07: Un intervalo largo que empezó mucho antes también se detecta"""
+        index = ScheduleConflictIndex(
+            [
+                self.slot("largo", "06:00", "20:00", day_of_week="FRIDAY"),
+                self.slot("corto", "07:00", "08:00", day_of_week="FRIDAY"),
+            ]
+        )
+
+        found = index.conflicts(self.slot("n", "18:00", "19:00", day_of_week="FRIDAY"))
+
+        self.assertEqual([s.key for s in found], ["largo"])
+
+    def test_tc_08_specific_date_vs_recurring(self):
+        """TC-08: Una sesión de fecha específica choca con el recurrente de ese día vigente"""
+        index = ScheduleConflictIndex(
+            [
+                self.slot(
+                    "lunes",
+                    "08:00",
+                    "09:00",
+                    day_of_week="MONDAY",
+                    start_date="2026-10-01",
+                    end_date="2026-10-31",
+                ),
+                self.slot("especial", "08:30", "09:30", specific_date="2026-11-09"),
+            ]
+        )
+
+        inside = index.conflicts(self.slot("n", "08:00", "09:00", specific_date="2026-10-12"))
+        outside = index.conflicts(self.slot("n", "08:00", "09:00", specific_date="2026-11-02"))
+        recurring = index.conflicts(
+            self.slot("n", "09:00", "10:00", day_of_week="MONDAY", start_date="2026-11-01")
+        )
+
+        self.assertEqual([s.key for s in inside], ["lunes"])
+        self.assertEqual(outside, [])
+        self.assertEqual([s.key for s in recurring], ["especial"])
+
+    def test_tc_09_update_excludes_own_schedule(self):
+        """TC-09: Al modificar un horario no se considera conflicto consigo mismo"""
+        index = ScheduleConflictIndex([self.slot("a", "08:00", "09:00", day_of_week="MONDAY")])
+
+        found = index.conflicts(
+            self.slot("a", "08:30", "09:30", day_of_week="MONDAY"), exclude_key="a"
+        )
+
+        self.assertEqual(found, [])
+
+    def test_tc_10_timetable_conflicts_within_batch(self):
+        """TC-10: La validación por lotes detecta solapamientos entre los nuevos horarios"""
+        self.service.index = lambda: ScheduleConflictIndex(
+            [self.slot("existente", "08:00", "09:00", day_of_week="TUESDAY")]
+        )
+        plan = [
+            self.slot("#0", "10:00", "11:00", day_of_week="WEDNESDAY"),
+            self.slot("#1", "10:30", "11:30", day_of_week="WEDNESDAY"),
+            self.slot("existente", "08:30", "09:30", day_of_week="TUESDAY"),
+        ]
+
+        report = self.service.validate_timetable(plan, replaced_keys={"existente"})
+
+        self.assertEqual(
+            [(position, [s.key for s in found]) for position, found in report],
+            [(1, ["#0"])],
+        )
+
+
+
+@patch("app.controllers.attendance_controller.cache_versions")
+@patch("app.controllers.attendance_controller.schedule_conflicts")
+@patch("app.controllers.attendance_controller.db")
+@patch("app.controllers.attendance_controller.Schedule")
+class TestScheduleUpdate(unittest.TestCase):
+    """Modificación de horarios: validación completa y solapamiento (base de datos simulada)"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+        self.schedule = make_schedule(
+            dayOfWeek="MONDAY", startDate="2020-01-06", status="active", description=None
+        )
+
+    def update(self, mock_schedule, mock_conflicts, data, conflicts=()):
+        mock_schedule.query.filter_by.return_value.first.return_value = self.schedule
+        mock_conflicts.to_slot.side_effect = ScheduleConflictService().to_slot
+        mock_conflicts.find_conflicts.return_value = list(conflicts)
+        return self.controller.update_schedule("sch-1", data)
+
+    def test_tc_11_invalid_time_is_rejected(self, mock_schedule, mock_db, mock_conflicts, _):
+        """TC-11: Una hora inválida se rechaza y no se guarda"""
+        response = self.update(mock_schedule, mock_conflicts, {"startTime": "25:99"})
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("start_time", response["data"])
+        mock_db.session.commit.assert_not_called()
+        mock_db.session.rollback.assert_called()
+
+    def test_tc_12_end_before_start_and_unknown_day(self, mock_schedule, mock_db, mock_conflicts, _):
+        """TC-12: Fin antes del inicio o día desconocido son errores de validación"""
+        response = self.update(
+            mock_schedule, mock_conflicts, {"endTime": "07:00", "dayOfWeek": "FERIADO"}
+        )
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("end_time", response["data"])
+        self.assertIn("day_of_week", response["data"])
+        mock_conflicts.find_conflicts.assert_not_called()
+
+    def test_tc_13_stored_past_start_date_is_kept(self, mock_schedule, mock_db, mock_conflicts, _):
+        """TC-13: Una fecha de inicio ya guardada en el pasado no impide modificar el horario"""
+        response = self.update(mock_schedule, mock_conflicts, {"name": "Funcional Lunes AM"})
+
+        self.assertEqual(response["code"], 200)
+        mock_conflicts.find_conflicts.assert_called_once()
+        mock_db.session.commit.assert_called_once()
+
+    def test_tc_14_overlap_is_checked_on_update(self, mock_schedule, mock_db, mock_conflicts, _):
+        """TC-14: El horario modificado se compara con los demás horarios activos"""
+        other = ScheduleConflictService().to_slot(
+            "sch-2", "Otro", "FUNCIONAL", "08:30", "09:30", "MONDAY"
+        )
+        response = self.update(
+            mock_schedule, mock_conflicts, {"endTime": "10:00"}, conflicts=[other]
+        )
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("schedule", response["data"])
+        mock_db.session.commit.assert_not_called()
+        self.assertEqual(mock_conflicts.find_conflicts.call_args[0][1], "sch-1")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,129 @@
+import io
+import unittest
+from unittest.mock import patch
+from app.controllers.usercontroller import UserController
+from app.services.identity_conflict_service import IdentityConflicts
+from app.services.participant_import_service import ParticipantImportService
+
+HEADER = (
+    "firstName,lastName,dni,age,phone,email,address,program,type,"
+    "responsibleName,responsibleDni,responsiblePhone\n"
+)
+
+
+def make_csv(*lines):
+    return io.BytesIO((HEADER + "".join(line + "\n" for line in lines)).encode("utf-8"))
+
+
+ADULT = "Ana,Loja,{dni},22,0991234568,{email},Calle Test,FUNCIONAL,ESTUDIANTE,,,"
+MINOR = "Leo,Loja,{dni},12,0991234568,{dni}@test.com,Calle Test,INICIACION,ESTUDIANTE,Maria Loja,{resp},0991234560"
+
+
+class TestParticipantImportParser(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_importacion -v
+    """Pruebas de lectura de archivos de importación (sin base de datos)"""
+
+    def setUp(self):
+        self.service = ParticipantImportService()
+
+    def test_tc_01_format_from_extension_or_request(self):
+        """TC-01: El formato se deduce de la extensión o del parámetro"""
+        self.assertEqual(self.service.format_for("alumnos.CSV"), "csv")
+        self.assertEqual(self.service.format_for("alumnos.txt", "xlsx"), "xlsx")
+        self.assertIsNone(self.service.format_for("alumnos.pdf"))
+        self.assertIsNone(self.service.format_for(None))
+
+    def test_tc_02_csv_rows_to_payload(self):
+        """TC-02: Cada fila se convierte al formato de create_participant"""
+        stream = make_csv(
+            ADULT.format(dni="1104567892", email="ana@test.com"),
+            "",
+            MINOR.format(dni="1104567893", resp="1104567894"),
+        )
+        rows = list(self.service.rows(stream, "csv"))
+
+        self.assertEqual([number for number, _ in rows], [2, 4])
+        adult = rows[0][1]
+        self.assertEqual(adult["participant"]["age"], 22)
+        self.assertEqual(adult["participant"]["program"], "FUNCIONAL")
+        self.assertIsNone(adult["responsible"])
+        minor = rows[1][1]
+        self.assertEqual(minor["participant"]["email"], "1104567893@test.com")
+        self.assertEqual(minor["responsible"]["dni"], "1104567894")
+
+    def test_tc_03_numeric_cells_keep_leading_zero(self):
+        """TC-03: DNI y teléfono numéricos (Excel) se completan a 10 dígitos"""
+        self.assertEqual(self.service._clean("dni", 104567892), "0104567892")
+        self.assertEqual(self.service._clean("phone", 987654321.0), "0987654321")
+        self.assertEqual(self.service._clean("age", 22.0), "22")
+        self.assertIsNone(self.service._clean("email", "   "))
+
+
+class TestParticipantImportValidation(unittest.TestCase):
+    """Validación de filas de la importación en modo dry_run (unicidad simulada)"""
+
+    def setUp(self):
+        self.controller = UserController()
+
+    def run_import(self, stream, conflicts=()):
+        with patch("app.controllers.usercontroller.identity_conflicts") as mock_conflicts:
+            mock_conflicts.find.return_value = IdentityConflicts(conflicts)
+            return self.controller.import_participants(stream, "alumnos.csv", dry_run=True)
+
+    def errors_by_row(self, response):
+        return {e["row"]: e["errors"] for e in response["data"]["errors"]}
+
+    def test_tc_04_row_without_dni_does_not_reject_others(self):
+        """TC-04: Una fila sin DNI solo se rechaza a sí misma"""
+        stream = make_csv(
+            ADULT.format(dni="", email="sin@test.com"),
+            ADULT.format(dni="1104567892", email="ana@test.com"),
+        )
+        response = self.run_import(stream)
+
+        self.assertEqual(response["code"], 200)
+        self.assertEqual(response["data"]["valid"], 1)
+        errors = self.errors_by_row(response)
+        self.assertEqual(list(errors), [2])
+        self.assertIn("dni", errors[2])
+
+    def test_tc_05_duplicates_inside_file(self):
+        """TC-05: DNI y correo repetidos en el archivo se reportan en la fila repetida"""
+        stream = make_csv(
+            ADULT.format(dni="1104567892", email="ana@test.com"),
+            ADULT.format(dni="1104567892", email="otra@test.com"),
+            ADULT.format(dni="1104567893", email="ana@test.com"),
+        )
+        response = self.run_import(stream)
+
+        errors = self.errors_by_row(response)
+        self.assertEqual(sorted(errors), [3, 4])
+        self.assertEqual(errors[3]["dni"], "DNI repetido en la fila 2")
+        self.assertEqual(errors[4]["email"], "Correo repetido en la fila 2")
+
+    def test_tc_06_responsible_dni_of_file_participant(self):
+        """TC-06: El DNI del responsable no puede ser de un participante del archivo"""
+        stream = make_csv(
+            ADULT.format(dni="1104567892", email="ana@test.com"),
+            MINOR.format(dni="1104567893", resp="1104567892"),
+            MINOR.format(dni="1104567895", resp="1104567896"),
+        )
+        response = self.run_import(stream)
+
+        errors = self.errors_by_row(response)
+        self.assertEqual(list(errors), [3])
+        self.assertIn("fila 2", errors[3]["responsibleDni"])
+        self.assertEqual(response["data"]["valid"], 2)
+
+    def test_tc_07_existing_dni_in_database(self):
+        """TC-07: Un DNI ya registrado se reporta con la consulta de unicidad en lote"""
+        stream = make_csv(ADULT.format(dni="1104567892", email="ana@test.com"))
+        response = self.run_import(stream, [("dni", "participant", "1104567892", 7)])
+
+        errors = self.errors_by_row(response)
+        self.assertEqual(errors[2]["dni"], "El DNI ya está registrado")
+        self.assertEqual(response["data"]["created"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from app.controllers.usercontroller import UserController
+from app.services.identity_conflict_service import IdentityConflicts
 from app.controllers.auth_controller import AuthController
 
 class TestUserController(unittest.TestCase):
@@ -35,11 +36,13 @@ class TestUserController(unittest.TestCase):
         self.assertIn("msg", response)
 
     @patch("app.controllers.usercontroller.UserController._get_token")
-    @patch("app.controllers.usercontroller.Participant")
-    def test_tc_06_register_duplicate_dni(self, mock_participant, mock_get_token):
+    @patch("app.controllers.usercontroller.identity_conflicts")
+    def test_tc_06_register_duplicate_dni(self, mock_conflicts, mock_get_token):
         """TC-06: Registrar Participante - Verifica validación de DNI duplicado"""
         mock_get_token.return_value = "Bearer mock_token"
-        mock_participant.query.filter_by.return_value.first.return_value = MagicMock()
+        mock_conflicts.find.return_value = IdentityConflicts(
+            [("dni", "participant", "1100000001", 1)]
+        )
         
         data = {
             "firstName": "Ana",
@@ -72,13 +75,15 @@ class TestUserController(unittest.TestCase):
         self.assertEqual(response["code"], 400)
         self.assertIn("msg", response) 
 
+    @patch("app.controllers.usercontroller.identity_conflicts")
     @patch("app.controllers.usercontroller.UserController._get_token")
     @patch("app.controllers.usercontroller.Participant")
     @patch("app.controllers.usercontroller.User")
-    def test_tc_14_dni_invalid_validations(self, mock_user, mock_participant, mock_get_token):
+    def test_tc_14_dni_invalid_validations(self, mock_user, mock_participant, mock_get_token, mock_conflicts):
         """TC-14, TC-15: Validaciones de DNI - Verifica longitud y ceros"""
         mock_get_token.return_value = "Bearer mock_token"
         mock_participant.query.filter_by.return_value.first.return_value = None
+        mock_conflicts.find.return_value = IdentityConflicts()
         
         scenarios = [
             ("12345", "DNI debe tener exactamente 10 dígitos"),
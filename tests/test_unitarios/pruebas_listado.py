@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from app.controllers.usercontroller import (
+    USERS_MAX_PAGE_SIZE,
+    UserController,
+    users_count_cache,
+)
+
+
+class Row(tuple):
+    """Fila de SQLAlchemy simulada: tupla con atributo id."""
+
+    @property
+    def id(self):
+        return self[0]
+
+
+def listing_query(rows, total=None):
+    query = MagicMock()
+    query.filter.return_value = query
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    query.all.return_value = rows
+    query.scalar.return_value = total
+    return query
+
+
+@patch("app.controllers.usercontroller.db")
+class TestUserListing(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_listado -v
+    """Pruebas del listado paginado de participantes (/users) con mocks"""
+
+    def setUp(self):
+        self.controller = UserController()
+        users_count_cache.clear()
+
+    def test_tc_01_invalid_fields(self, mock_db):
+        """TC-01: Un campo fuera de la lista permitida se rechaza sin consultar"""
+        response = self.controller.get_users(fields="firstName,password")
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("fields", response["data"])
+        mock_db.session.query.assert_not_called()
+
+    def test_tc_02_legacy_list_projects_fields(self, mock_db):
+        """TC-02: Sin cursor ni limit se retorna la lista completa con los campos pedidos"""
+        mock_db.session.query.return_value = listing_query([Row((1, "Ana")), Row((2, "Luis"))])
+
+        response = self.controller.get_users(fields="firstName")
+
+        self.assertEqual(response["data"], [{"firstName": "Ana"}, {"firstName": "Luis"}])
+
+    def test_tc_03_limit_above_maximum_is_clamped(self, mock_db):
+        """TC-03: Un limit mayor al máximo se reduce al máximo permitido"""
+        query = listing_query([], total=0)
+        mock_db.session.query.return_value = query
+
+        response = self.controller.get_users(limit=USERS_MAX_PAGE_SIZE * 10)
+
+        self.assertEqual(response["code"], 200)
+        query.limit.assert_called_once_with(USERS_MAX_PAGE_SIZE + 1)
+
+    def test_tc_04_invalid_limit_and_cursor(self, mock_db):
+        """TC-04: limit no positivo y cursor ilegible son errores de validación"""
+        response = self.controller.get_users(limit="0", cursor="no-es-un-cursor")
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("limit", response["data"])
+        self.assertIn("cursor", response["data"])
+
+    def test_tc_05_cursor_round_trip(self, mock_db):
+        """TC-05: next_cursor apunta al último id de la página y continúa desde él"""
+        first_page = listing_query([Row((3, "A")), Row((7, "B")), Row((9, "C"))], total=5)
+        mock_db.session.query.return_value = first_page
+
+        response = self.controller.get_users(fields="firstName", limit=2)
+
+        data = response["data"]
+        self.assertTrue(data["has_more"])
+        self.assertEqual(data["items"], [{"firstName": "A"}, {"firstName": "B"}])
+        self.assertEqual(data["total"], 5)
+        self.assertEqual(self.controller._decode_users_cursor(data["next_cursor"]), 7)
+
+        second_page = listing_query([Row((9, "C"))], total=5)
+        mock_db.session.query.return_value = second_page
+        response = self.controller.get_users(fields="firstName", cursor=data["next_cursor"])
+
+        self.assertFalse(response["data"]["has_more"])
+        self.assertIsNone(response["data"]["next_cursor"])
+        after = [str(arg) for call in second_page.filter.call_args_list for arg in call[0]]
+        self.assertIn("participant.id > :id_1", after)
+
+    def test_tc_06_total_is_cached_per_filters(self, mock_db):
+        """TC-06: El total se cuenta una vez por combinación de filtros"""
+        query = listing_query([], total=12)
+        mock_db.session.query.return_value = query
+
+        self.controller.get_users(status="activo", limit=10)
+        self.controller.get_users(status="ACTIVO", limit=20)
+        self.controller.get_users(status="INACTIVO", limit=10)
+
+        self.assertEqual(query.scalar.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+from app.controllers.attendance_controller import AttendanceController
+from app.services.session_capacity_service import session_capacity
+
+
+def result_of(rows):
+    """Resultado simulado de db.session.execute con all() = rows."""
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+def compile_sql(stmt):
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+@patch.object(session_capacity, "lock")
+@patch("app.controllers.attendance_controller.attendance_partitions")
+@patch("app.controllers.attendance_controller.Schedule")
+@patch("app.controllers.attendance_controller.db")
+class TestSessionTrash(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_papelera -v
+    """Pruebas de eliminación y restauración de sesiones (base de datos simulada)"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+        self.schedule = SimpleNamespace(id=10, external_id="sch-10", maxSlots=10)
+        self.fecha = date(2026, 10, 5)
+
+    def prepare(self, mock_db, mock_schedule, mock_partitions, mock_lock, results, registered=0):
+        mock_db.select.side_effect = sqlalchemy.select
+        mock_db.and_.side_effect = sqlalchemy.and_
+        mock_db.session.execute.side_effect = results
+        mock_schedule.query.filter_by.return_value.first.return_value = self.schedule
+        mock_partitions.is_archived.return_value = False
+        mock_lock.return_value = SimpleNamespace(registered_count=registered, version=1)
+
+    def executed(self, mock_db):
+        return [compile_sql(call[0][0]) for call in mock_db.session.execute.call_args_list]
+
+    def test_tc_01_invalid_mode_is_rejected(self, mock_db, mock_schedule, mock_partitions, mock_lock):
+        """TC-01: Un modo distinto de hard/soft se rechaza sin bloquear ni eliminar"""
+        response = self.controller.delete_session_attendance("sch-10", "2026-10-05", "archive")
+
+        self.assertEqual(response["code"], 400)
+        self.assertIn("hard, soft", response["data"]["mode"])
+        mock_lock.assert_not_called()
+        mock_db.session.execute.assert_not_called()
+
+    def test_tc_02_hard_delete_is_the_default(self, mock_db, mock_schedule, mock_partitions, mock_lock):
+        """TC-02: Sin modo se eliminan definitivamente los registros de la sesión"""
+        self.prepare(
+            mock_db, mock_schedule, mock_partitions, mock_lock,
+            [MagicMock(), result_of([(1, "present")])],
+        )
+        with patch.object(self.controller, "_apply_derived_changes"):
+            response = self.controller.delete_session_attendance("sch-10", "2026-10-05")
+
+        self.assertEqual(response["data"], {"mode": "hard", "deleted": 1})
+        sql = self.executed(mock_db)[1]
+        self.assertTrue(sql.startswith("DELETE FROM attendance"))
+        self.assertNotIn("deleted_attendance", sql)
+
+    def test_tc_03_soft_delete_moves_rows_and_reports_changes(
+        self, mock_db, mock_schedule, mock_partitions, mock_lock
+    ):
+        """TC-03: mode=soft mueve las filas a la papelera y cada una es un cambio a None"""
+        self.prepare(
+            mock_db, mock_schedule, mock_partitions, mock_lock,
+            [MagicMock(), result_of([(1, "present"), (2, "absent")])],
+        )
+        with patch.object(self.controller, "_apply_derived_changes") as mock_derived:
+            response = self.controller.delete_session_attendance("sch-10", "2026-10-05", "soft")
+
+        self.assertEqual(response["data"], {"mode": "soft", "deleted": 2})
+        cleared, moved = self.executed(mock_db)
+        self.assertTrue(cleared.startswith("DELETE FROM deleted_attendance"))
+        self.assertIn("WITH moved AS", moved)
+        self.assertIn("INSERT INTO deleted_attendance", moved)
+        changes = mock_derived.call_args[0][0]
+        self.assertEqual(
+            [(c.participant_id, c.schedule_id, c.date, c.old_status, c.new_status) for c in changes],
+            [(1, 10, self.fecha, "present", None), (2, 10, self.fecha, "absent", None)],
+        )
+        mock_db.session.commit.assert_called_once()
+
+    def test_tc_04_restore_skips_re_registered(self, mock_db, mock_schedule, mock_partitions, mock_lock):
+        """TC-04: Quien volvió a registrarse conserva su registro y no ocupa cupo nuevo"""
+        pending = [
+            SimpleNamespace(external_id="p-1", registered=False),
+            SimpleNamespace(external_id="p-2", registered=True),
+        ]
+        self.prepare(
+            mock_db, mock_schedule, mock_partitions, mock_lock,
+            [result_of(pending), result_of([(1, "present")]), MagicMock()],
+            registered=9,
+        )
+        with patch.object(self.controller, "_apply_derived_changes") as mock_derived:
+            response = self.controller.restore_session_attendance("sch-10", "2026-10-05")
+
+        self.assertEqual(response["data"], {"restored": 1, "skipped": 1})
+        restored = self.executed(mock_db)[1]
+        self.assertIn("WITH restored AS", restored)
+        self.assertIn("NOT (EXISTS", restored)
+        changes = mock_derived.call_args[0][0]
+        self.assertEqual(
+            [(c.participant_id, c.old_status, c.new_status) for c in changes],
+            [(1, None, "present")],
+        )
+
+    def test_tc_05_restore_over_capacity_restores_nothing(
+        self, mock_db, mock_schedule, mock_partitions, mock_lock
+    ):
+        """TC-05: Si los restaurados superan el cupo se retorna 409 sin restaurar"""
+        pending = [
+            SimpleNamespace(external_id="p-1", registered=False),
+            SimpleNamespace(external_id="p-2", registered=False),
+            SimpleNamespace(external_id="p-3", registered=True),
+        ]
+        self.prepare(
+            mock_db, mock_schedule, mock_partitions, mock_lock, [result_of(pending)], registered=9
+        )
+        with patch.object(self.controller, "_apply_derived_changes") as mock_derived:
+            response = self.controller.restore_session_attendance("sch-10", "2026-10-05")
+
+        self.assertEqual(response["code"], 409)
+        self.assertEqual(response["data"]["participants"], ["p-1", "p-2"])
+        self.assertEqual(mock_db.session.execute.call_count, 1)
+        mock_derived.assert_not_called()
+        mock_db.session.rollback.assert_called_once()
+        mock_db.session.commit.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,264 @@
+import unittest
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from sqlalchemy.dialects import postgresql
+from app.controllers.attendance_controller import AttendanceController
+from app.services.attendance_partition_service import AttendancePartitionService
+from app.utils.validations.attendance_validation import (
+    client_write_time,
+    parse_client_timestamp,
+)
+
+
+def query_returning(rows):
+    """Consulta simulada: filter/with_for_update encadenan y all() retorna rows."""
+    query = MagicMock()
+    query.filter.return_value = query
+    query.with_for_update.return_value = query
+    query.all.return_value = rows
+    return query
+
+
+class TestClientTimestamps(unittest.TestCase):
+    #python -m unittest tests.test_unitarios.pruebas_sincronizacion -v
+    """Pruebas de marcas de tiempo del cliente (sin base de datos)"""
+
+    def test_tc_01_parse_utc_and_offsets(self):
+        """TC-01: Z y desplazamientos se convierten a UTC sin zona"""
+        self.assertEqual(
+            parse_client_timestamp("2026-10-05T08:30:00Z"),
+            (datetime(2026, 10, 5, 8, 30), None),
+        )
+        self.assertEqual(
+            parse_client_timestamp("2026-10-05T08:30:00-05:00"),
+            (datetime(2026, 10, 5, 13, 30), None),
+        )
+        self.assertEqual(
+            parse_client_timestamp("2026-10-05T08:30:00"),
+            (datetime(2026, 10, 5, 8, 30), None),
+        )
+
+    def test_tc_02_parse_invalid_or_missing(self):
+        """TC-02: Valores vacíos no son error; formatos inválidos sí"""
+        self.assertEqual(parse_client_timestamp(None), (None, None))
+        parsed, error = parse_client_timestamp("05/10/2026 08:30")
+        self.assertIsNone(parsed)
+        self.assertIsNotNone(error)
+
+    def test_tc_03_future_client_clock_is_clamped(self):
+        """TC-03: Un reloj de cliente adelantado no gana a escrituras posteriores"""
+        now = datetime(2026, 10, 5, 12, 0)
+        self.assertEqual(client_write_time(now + timedelta(days=2), now), now)
+        self.assertEqual(
+            client_write_time(now - timedelta(hours=3), now), now - timedelta(hours=3)
+        )
+        self.assertEqual(client_write_time(None, now), now)
+
+
+@patch("app.controllers.attendance_controller.session_capacity")
+@patch("app.controllers.attendance_controller.db")
+class TestLastWriterWins(unittest.TestCase):
+    """Registro de una sesión con last-writer-wins (base de datos simulada)"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+        self.schedule = SimpleNamespace(id=10, external_id="sch-10")
+        self.fecha = date(2026, 10, 5)
+
+    def run_upsert(self, mock_db, mock_capacity, previous, written, items=None):
+        mock_db.or_.side_effect = lambda *c: c[0] | c[1]
+        mock_db.session.query.side_effect = [
+            query_returning([("p-1", 1), ("p-2", 2), ("p-3", 3)]),
+            query_returning(list(previous.items())),
+        ]
+        mock_db.session.execute.return_value = [
+            SimpleNamespace(participant_id=pid, status=status) for pid, status in written
+        ]
+        mock_capacity.lock.return_value = SimpleNamespace(registered_count=2, version=1)
+        mock_capacity.overflow.return_value = None
+
+        items = items or [
+            {"participant_external_id": "p-1", "status": "present"},
+            {"participant_external_id": "p-2", "status": "present"},
+            {"participant_external_id": "p-3", "status": "present"},
+        ]
+        with patch.object(self.controller, "_apply_derived_changes") as mock_derived:
+            result = self.controller._upsert_session_attendance(
+                self.schedule, self.fecha, items, datetime(2026, 10, 5, 9, 0)
+            )
+        return result, mock_derived.call_args[0][0]
+
+    def test_tc_04_newer_rows_win_and_older_are_stale(self, mock_db, mock_capacity):
+        """TC-04: Las filas con marca posterior en el servidor se reportan como stale"""
+        previous = {1: "absent", 3: "absent"}
+        result, changes = self.run_upsert(
+            mock_db, mock_capacity, previous, [(1, "present"), (2, "present")]
+        )
+
+        self.assertEqual(result["created"], [{"participant_external_id": "p-2", "status": "present"}])
+        self.assertEqual(result["updated"], [{"participant_external_id": "p-1", "status": "present"}])
+        self.assertEqual(result["stale"], [{"participant_external_id": "p-3", "status": "absent"}])
+        self.assertEqual(
+            [(c.participant_id, c.old_status, c.new_status) for c in changes],
+            [(1, "absent", "present"), (2, None, "present")],
+        )
+
+    def test_tc_09_only_known_statuses_are_written(self, mock_db, mock_capacity):
+        """TC-09: El estado se normaliza y los desconocidos se rechazan sin escribirse"""
+        items = [
+            {"participant_external_id": "p-1", "status": " PRESENT "},
+            {"participant_external_id": "p-2", "status": "presente"},
+            {"participant_external_id": "p-3", "status": "x" * 40},
+            {"participant_external_id": "p-4", "status": None},
+        ]
+        result, _ = self.run_upsert(mock_db, mock_capacity, {}, [(1, "present")], items)
+
+        stmt = mock_db.session.execute.call_args[0][0]
+        written = stmt.compile(dialect=postgresql.dialect()).params
+        self.assertEqual(
+            sorted(v for k, v in written.items() if k.startswith("status")), ["present"]
+        )
+        self.assertEqual([r["index"] for r in result["rejected"]], [1, 2, 3])
+        self.assertTrue(all("Estado inválido" in r["reason"] for r in result["rejected"]))
+
+    def test_tc_05_upsert_only_overwrites_older_writes(self, mock_db, mock_capacity):
+        """TC-05: El ON CONFLICT solo actualiza filas sin marca o con marca anterior"""
+        self.run_upsert(mock_db, mock_capacity, {}, [])
+
+        stmt = mock_db.session.execute.call_args[0][0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT ON CONSTRAINT uq_attendance_participant_schedule_date", sql)
+        self.assertIn("attendance.client_updated_at IS NULL", sql)
+        self.assertIn("attendance.client_updated_at <= excluded.client_updated_at", sql)
+
+
+@patch("app.controllers.attendance_controller.attendance_partitions")
+@patch("app.controllers.attendance_controller.Schedule")
+@patch("app.controllers.attendance_controller.db")
+class TestSyncReplay(unittest.TestCase):
+    """Reenvío de lotes de sincronización (idempotencia)"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+
+    def batch(self, key):
+        return {
+            "idempotency_key": key,
+            "client_updated_at": "2026-10-05T08:30:00Z",
+            "schedule_external_id": "sch-10",
+            "date": "2026-10-05",
+            "attendances": [{"participant_external_id": "p-1", "status": "present"}],
+        }
+
+    def test_tc_06_applied_batch_is_not_written_again(self, mock_db, mock_schedule, mock_partitions):
+        """TC-06: Un lote ya aplicado retorna su resultado guardado como duplicate"""
+        stored = {"status": "applied", "created": [{"participant_external_id": "p-1"}]}
+        mock_db.session.query.return_value = query_returning([("k-1", stored)])
+
+        with patch.object(self.controller, "_apply_sync_batch") as mock_apply:
+            response = self.controller.sync_attendance({"batches": [self.batch("k-1")]})
+
+        mock_apply.assert_not_called()
+        result = response["data"]["results"]["k-1"]
+        self.assertEqual(result["status"], "duplicate")
+        self.assertEqual(result["created"], stored["created"])
+
+    def test_tc_07_repeated_key_in_request_applies_once(self, mock_db, mock_schedule, mock_partitions):
+        """TC-07: Una clave repetida en la misma solicitud se aplica una sola vez"""
+        mock_partitions.archived_until.return_value = None
+        mock_db.session.query.return_value = query_returning([])
+        mock_schedule.query.filter.return_value.all.return_value = [
+            SimpleNamespace(id=10, external_id="sch-10")
+        ]
+
+        with patch.object(
+            self.controller, "_apply_sync_batch", return_value={"status": "applied"}
+        ) as mock_apply:
+            response = self.controller.sync_attendance(
+                {"batches": [self.batch("k-1"), self.batch("k-1")]}
+            )
+
+        self.assertEqual(mock_apply.call_count, 1)
+        self.assertEqual(list(response["data"]["results"]), ["k-1"])
+
+    def test_tc_08_batch_without_key_is_rejected(self, mock_db, mock_schedule, mock_partitions):
+        """TC-08: Un lote sin clave de idempotencia se rechaza sin afectar a los demás"""
+        mock_db.session.query.return_value = query_returning([("k-1", {"status": "applied"})])
+        batches = [dict(self.batch("k-1"), idempotency_key=None), self.batch("k-1")]
+
+        response = self.controller.sync_attendance({"batches": batches})
+
+        results = response["data"]["results"]
+        self.assertEqual(results["#0"]["status"], "error")
+        self.assertEqual(results["k-1"]["status"], "duplicate")
+
+    def test_tc_10_batch_of_archived_month_is_rejected(self, mock_db, mock_schedule, mock_partitions):
+        """TC-10: Un lote de un mes archivado es un error y no bloquea a los demás"""
+        mock_partitions.archived_until.return_value = date(2026, 10, 1)
+        mock_db.session.query.return_value = query_returning([])
+        mock_schedule.query.filter.return_value.all.return_value = [
+            SimpleNamespace(id=10, external_id="sch-10")
+        ]
+        batches = [dict(self.batch("k-1"), date="2026-09-30"), self.batch("k-2")]
+
+        with patch.object(
+            self.controller, "_apply_sync_batch", return_value={"status": "applied"}
+        ) as mock_apply:
+            response = self.controller.sync_attendance({"batches": batches})
+
+        results = response["data"]["results"]
+        self.assertEqual(results["k-1"]["status"], "error")
+        self.assertIn("archivado", results["k-1"]["errors"]["date"])
+        self.assertEqual(results["k-2"]["status"], "applied")
+        self.assertEqual(mock_apply.call_args[0][0], "k-2")
+        mock_partitions.ensure_month.assert_called_once_with(date(2026, 10, 5))
+
+
+@patch("app.controllers.attendance_controller.attendance_partitions")
+@patch("app.controllers.attendance_controller.Schedule")
+@patch("app.controllers.attendance_controller.db")
+class TestArchivedMonths(unittest.TestCase):
+    """Registro y eliminación en meses archivados (movidos a attendance_archive)"""
+
+    def setUp(self):
+        self.controller = AttendanceController()
+
+    def test_tc_11_writes_and_deletes_are_rejected(self, mock_db, mock_schedule, mock_partitions):
+        """TC-11: Registrar, restaurar o eliminar en un mes archivado retorna 409 sin escribir"""
+        mock_partitions.is_archived.return_value = True
+        responses = [
+            self.controller.register_bulk_attendance(
+                {
+                    "schedule_external_id": "sch-10",
+                    "date": "2026-09-15",
+                    "attendances": [{"participant_external_id": "p-1", "status": "present"}],
+                }
+            ),
+            self.controller.restore_session_attendance("sch-10", "2026-09-15"),
+            self.controller.delete_session_attendance("sch-10", "2026-09-15", "soft"),
+            self.controller.delete_session_attendance("sch-10", "2026-09-15", "hard"),
+        ]
+
+        self.assertEqual([r["code"] for r in responses], [409, 409, 409, 409])
+        self.assertTrue(all("archivado" in r["data"]["date"] for r in responses))
+        mock_partitions.ensure_month.assert_not_called()
+        mock_db.session.execute.assert_not_called()
+        mock_db.session.commit.assert_not_called()
+
+    @patch("app.services.attendance_partition_service.db")
+    def test_tc_12_ensure_month_refuses_archived_month(self, mock_service_db, *_):
+        """TC-12: ensure_month no crea una partición nueva para un mes archivado aunque lo recuerde"""
+        partitions = AttendancePartitionService()
+        partitions._ensured.add(date(2026, 9, 1))
+
+        with patch.object(partitions, "archived_until", return_value=date(2026, 10, 1)):
+            with self.assertRaises(ValueError):
+                partitions.ensure_month(date(2026, 9, 15))
+            partitions.ensure_month(date(2026, 10, 15))
+
+        mock_service_db.engine.begin.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()